@@ -0,0 +1,111 @@
+"""
+Профили подключения к базе данных.
+
+Профиль выбирается переменной окружения DATABASE_PROFILE:
+
+- sqlite: WAL-журнал и настроенные PRAGMA при каждом подключении,
+  BEGIN IMMEDIATE для транзакций и ожидание блокировки вместо мгновенной
+  ошибки "database is locked" при параллельных оформлениях заказа;
+- postgres: постоянные соединения (CONN_MAX_AGE) с проверкой живости
+  перед повторным использованием (CONN_HEALTH_CHECKS);
+- postgres_pool: встроенный пул соединений Django 5.1+
+  (нужны psycopg 3 и psycopg_pool: pip install "psycopg[binary,pool]").
+
+Если профиль не задан, он выбирается по DATABASE_ENGINE, как и раньше.
+Реплики для чтения каталога (DATABASE_REPLICAS) настраиваются тем же профилем,
+маршрутизацию выполняет store.db_router.ReplicaRouter.
+Сравнить профили под нагрузкой: python manage.py benchmark_db.
+"""
+from decouple import Csv, config
+
+PROFILES = ('sqlite', 'postgres', 'postgres_pool')
+
+# PRAGMA, выполняемые при каждом новом подключении к SQLite
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',      # читатели не блокируют писателя и наоборот
+    'synchronous': 'NORMAL',    # в режиме WAL безопасно и заметно быстрее FULL
+    'temp_store': 'MEMORY',
+    'cache_size': -20000,       # ~20 МБ кэша страниц на соединение
+    'mmap_size': 134217728,     # 128 МБ memory-mapped I/O
+}
+
+
+def _sqlite(name):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {key}={value}' for key, value in SQLITE_PRAGMAS.items()),
+            # Транзакция сразу берёт блокировку записи: без ошибок при "повышении" чтения до записи
+            'transaction_mode': 'IMMEDIATE',
+            # busy_timeout: сколько секунд ждать освобождения блокировки
+            'timeout': config('DATABASE_TIMEOUT', default=20, cast=int),
+        },
+    }
+
+
+def _postgres(engine, name, pool=False):
+    database = {
+        'ENGINE': engine,
+        'NAME': name,
+        'USER': config('DATABASE_USER', default=''),
+        'PASSWORD': config('DATABASE_PASSWORD', default=''),
+        'HOST': config('DATABASE_HOST', default=''),
+        'PORT': config('DATABASE_PORT', default=''),
+    }
+    if pool:
+        # С пулом соединения переиспользует пул, CONN_MAX_AGE должен быть 0
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS'] = {
+            'pool': {
+                'min_size': config('DATABASE_POOL_MIN_SIZE', default=2, cast=int),
+                'max_size': config('DATABASE_POOL_MAX_SIZE', default=10, cast=int),
+                'timeout': config('DATABASE_POOL_TIMEOUT', default=10, cast=int),
+            },
+        }
+    else:
+        database['CONN_MAX_AGE'] = config('DATABASE_CONN_MAX_AGE', default=60, cast=int)
+        database['CONN_HEALTH_CHECKS'] = True
+    return database
+
+
+def database_profile(engine):
+    profile = config('DATABASE_PROFILE', default='')
+    if not profile:
+        profile = 'sqlite' if 'sqlite' in engine else 'postgres'
+    if profile not in PROFILES:
+        raise ValueError(f'Unknown DATABASE_PROFILE {profile!r}, expected one of {", ".join(PROFILES)}')
+    return profile
+
+
+def build_database(base_dir, name=None):
+    """Настройки одной базы данных для DATABASES по текущему профилю"""
+    engine = config('DATABASE_ENGINE', default='django.db.backends.sqlite3')
+    name = name or config('DATABASE_NAME', default='db.sqlite3')
+    profile = database_profile(engine)
+
+    if profile == 'sqlite':
+        # Для SQLite путь к файлу считается от корня проекта
+        return _sqlite(base_dir / name)
+    if 'sqlite' in engine:
+        engine = 'django.db.backends.postgresql'
+    return _postgres(engine, name, pool=profile == 'postgres_pool')
+
+
+def build_replicas(base_dir):
+    """
+    Реплики для чтения: DATABASE_REPLICAS - имена баз через запятую
+    (для SQLite - файлы), DATABASE_REPLICA_HOSTS - их хосты, если отличаются
+    от DATABASE_HOST. Возвращает {'replica1': {...}, 'replica2': {...}}.
+    """
+    names = config('DATABASE_REPLICAS', default='', cast=Csv())
+    hosts = config('DATABASE_REPLICA_HOSTS', default='', cast=Csv())
+    replicas = {}
+    for index, name in enumerate(names, start=1):
+        database = build_database(base_dir, name=name)
+        if index <= len(hosts) and hosts[index - 1] and 'HOST' in database:
+            database['HOST'] = hosts[index - 1]
+        # В тестах реплика - это та же тестовая база
+        database['TEST'] = {'MIRROR': 'default'}
+        replicas[f'replica{index}'] = database
+    return replicas
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 from decouple import config, Csv
 
+from .database import build_database, build_replicas
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -51,7 +53,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'store.instrumentation.RequestMetricsMiddleware',  # Замеры времени, SQL и шаблонов по запросам
     'django.middleware.security.SecurityMiddleware',
+    'store.middleware.ReplicaPinMiddleware',  # Чтение каталога с реплик БД (если настроены)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,7 +70,8 @@ ROOT_URLCONF = 'shop.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки, см. store/instrumentation.py
+        'BACKEND': 'store.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -87,24 +92,85 @@ WSGI_APPLICATION = 'shop.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-db_engine = config('DATABASE_ENGINE', default='django.db.backends.sqlite3')
-db_name = config('DATABASE_NAME', default='db.sqlite3')
+# Профиль подключения (sqlite / postgres / postgres_pool) выбирается
+# переменной DATABASE_PROFILE, см. shop/database.py
+DATABASES = {
+    'default': build_database(BASE_DIR),
+}
 
-# For SQLite, use Path object; for other databases, use string
-if 'sqlite' in db_engine:
-    db_name = BASE_DIR / db_name
+# Необязательные реплики для чтения страниц каталога (DATABASE_REPLICAS), см. store/db_router.py
+DATABASES.update(build_replicas(BASE_DIR))
+if len(DATABASES) > 1:
+    DATABASE_ROUTERS = ['store.db_router.ReplicaRouter']
 
-DATABASES = {
-    'default': {
-        'ENGINE': db_engine,
-        'NAME': db_name,
-        'USER': config('DATABASE_USER', default=''),
-        'PASSWORD': config('DATABASE_PASSWORD', default=''),
-        'HOST': config('DATABASE_HOST', default=''),
-        'PORT': config('DATABASE_PORT', default=''),
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# Общий кэш Redis (нужен пакет redis), чтобы лимиты запросов и кэшированные
+# данные были общими для всех процессов; иначе - кэш в памяти каждого процесса
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
     }
+
+# Замеры по каждому запросу (время, SQL, шаблоны), см. store/instrumentation.py
+INSTRUMENTATION_ENABLED = config('INSTRUMENTATION_ENABLED', default=True, cast=bool)
+# Доля замеряемых запросов, 0..1
+INSTRUMENTATION_SAMPLE_RATE = config('INSTRUMENTATION_SAMPLE_RATE', default=1.0, cast=float)
+# Заголовок Server-Timing раскрывает браузеру время работы сервера - в production включать осторожно
+INSTRUMENTATION_SERVER_TIMING = config('INSTRUMENTATION_SERVER_TIMING', default=DEBUG, cast=bool)
+# Файлы гистограмм каждого процесса, их объединяет команда dump_request_metrics
+INSTRUMENTATION_DIR = config('INSTRUMENTATION_DIR', default=str(BASE_DIR / 'metrics'))
+
+# Журнал медленных и повторяющихся (N+1) SQL-запросов с местом в коде и шаблоне,
+# см. store/query_log.py и страницу "Медленные запросы" в админ-панели
+QUERY_LOG_ENABLED = config('QUERY_LOG_ENABLED', default=True, cast=bool)
+SLOW_QUERY_MS = config('SLOW_QUERY_MS', default=100, cast=int)
+DUPLICATE_QUERY_THRESHOLD = config('DUPLICATE_QUERY_THRESHOLD', default=5, cast=int)
+SLOW_QUERY_LOG = config('SLOW_QUERY_LOG', default=str(BASE_DIR / 'logs' / 'slow_queries.log'))
+
+# Эндпоинт Prometheus /metrics, см. store/metrics.py: доступен с заголовком
+# "Authorization: Bearer <METRICS_TOKEN>" или с IP из METRICS_ALLOWED_IPS (иначе 404)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='', cast=Csv())
+
+# Доставленные и отменённые заказы старше указанного числа дней команда
+# archive_orders переносит в архивные таблицы, см. store/archive.py
+ORDER_ARCHIVE_AFTER_DAYS = config('ORDER_ARCHIVE_AFTER_DAYS', default=180, cast=int)
+
+# Логирование: по строке на каждый замеренный запрос в логгер store.requests (уровень INFO)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'store': {
+            'handlers': ['console'],
+            'level': config('STORE_LOG_LEVEL', default='WARNING'),
+        },
+    },
 }
 
+# Ограничение частоты запросов к форме обратной связи, оформлению заказа и корзине, см. store/ratelimit.py
+RATE_LIMIT_ENABLED = config('RATE_LIMIT_ENABLED', default=True, cast=bool)
+# Заголовок с IP клиента при работе за обратным прокси, например HTTP_X_REAL_IP
+RATE_LIMIT_IP_HEADER = config('RATE_LIMIT_IP_HEADER', default='')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -146,7 +212,7 @@ LOCALE_PATHS = [
     BASE_DIR / 'locale',
 ]
 
-# Настройки для работы с языками через cookie и сессию
+# Настройки для работы с языками через cookie (без записи в сессию)
 LANGUAGE_COOKIE_NAME = 'django_language'
 LANGUAGE_COOKIE_AGE = None  # Cookie истекает при закрытии браузера
 LANGUAGE_COOKIE_PATH = '/'
@@ -154,6 +220,10 @@ LANGUAGE_COOKIE_SECURE = False  # True для HTTPS
 LANGUAGE_COOKIE_HTTPONLY = False
 LANGUAGE_COOKIE_SAMESITE = 'Lax'
 
+# Префикс языка в URL (/en/, /uz/) для страниц магазина; язык по умолчанию
+# остаётся без префикса. Если выключен, язык берётся только из cookie.
+I18N_URL_PREFIX = config('I18N_URL_PREFIX', default=False, cast=bool)
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
@@ -165,6 +235,9 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Публичный адрес сайта для абсолютных ссылок в карте сайта и фиде товаров
+SITE_URL = config('SITE_URL', default='https://luxwood.uz')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -182,4 +255,8 @@ DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='')
 # Telegram Bot settings (optional)
 # Get bot token from @BotFather on Telegram
 TELEGRAM_BOT_TOKEN = config('TELEGRAM_BOT_TOKEN', default='')
-TELEGRAM_CHAT_ID = config('TELEGRAM_CHAT_ID', default='')
\ No newline at end of file
+TELEGRAM_CHAT_ID = config('TELEGRAM_CHAT_ID', default='')
+
+# Хранение корзины: 'db' (строки Cart/CartItem, привязанные к сессии) или
+# 'cookie' (подписанная cookie, к БД обращается только оформление заказа)
+CART_STORAGE = config('CART_STORAGE', default='db')
@@ -23,9 +23,18 @@ from django.conf.urls.i18n import i18n_patterns
 urlpatterns = [
     path('i18n/', include('django.conf.urls.i18n')),
     path('admin/', admin.site.urls),
-    path('', include('store.urls')),
 ]
 
+# С I18N_URL_PREFIX язык задаётся префиксом URL (/en/..., /uz/...; русский - без префикса),
+# поэтому страница и её кэш однозначно определяются адресом
+if getattr(settings, 'I18N_URL_PREFIX', False):
+    urlpatterns += i18n_patterns(
+        path('', include('store.urls')),
+        prefix_default_language=False,
+    )
+else:
+    urlpatterns += [path('', include('store.urls'))]
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -138,13 +138,13 @@ function updateCartItem(itemId, delta) {
             // Update item total
             const itemTotal = document.querySelector(`[data-item-id="${itemId}"] .item-total-price`);
             if (itemTotal) {
-                itemTotal.textContent = data.item_total.toFixed(2) + ' сум';
+                itemTotal.textContent = data.item_total.toFixed(2) + ' ' + (data.currency_label || 'сум');
             }
             
             // Update cart total
             const cartTotal = document.getElementById('cart-total');
             if (cartTotal) {
-                cartTotal.textContent = data.cart_total.toFixed(2) + ' сум';
+                cartTotal.textContent = data.cart_total.toFixed(2) + ' ' + (data.currency_label || 'сум');
             }
             
             // Update total items
@@ -215,7 +215,7 @@ function removeCartItem(itemId) {
             // Update cart total
             const cartTotal = document.getElementById('cart-total');
             if (cartTotal) {
-                cartTotal.textContent = data.cart_total.toFixed(2) + ' сум';
+                cartTotal.textContent = data.cart_total.toFixed(2) + ' ' + (data.currency_label || 'сум');
             }
             
             // Update total items
@@ -265,6 +265,100 @@ function removeCartItem(itemId) {
     });
 }
 
+// Search autocomplete
+document.addEventListener('DOMContentLoaded', function() {
+    const searchInput = document.querySelector('.search-bar input[data-autocomplete-url]');
+    const suggestions = document.getElementById('searchSuggestions');
+    if (!searchInput || !suggestions) {
+        return;
+    }
+    
+    const url = searchInput.getAttribute('data-autocomplete-url');
+    let debounceTimer = null;
+    let lastQuery = '';
+    let activeIndex = -1;
+    
+    function hideSuggestions() {
+        suggestions.hidden = true;
+        suggestions.innerHTML = '';
+        activeIndex = -1;
+    }
+    
+    function renderSuggestions(results) {
+        suggestions.innerHTML = '';
+        activeIndex = -1;
+        if (!results.length) {
+            suggestions.hidden = true;
+            return;
+        }
+        results.forEach(result => {
+            const li = document.createElement('li');
+            const link = document.createElement('a');
+            const icon = document.createElement('i');
+            icon.className = result.type === 'category' ? 'fas fa-folder' : 'fas fa-search';
+            link.href = result.url;
+            link.appendChild(icon);
+            link.appendChild(document.createTextNode(result.name));
+            li.appendChild(link);
+            suggestions.appendChild(li);
+        });
+        suggestions.hidden = false;
+    }
+    
+    function fetchSuggestions(query) {
+        fetch(`${url}?q=${encodeURIComponent(query)}`)
+            .then(response => response.json())
+            .then(data => {
+                // Игнорируем устаревшие ответы
+                if (data.query === searchInput.value.trim()) {
+                    renderSuggestions(data.results || []);
+                }
+            })
+            .catch(() => hideSuggestions());
+    }
+    
+    searchInput.addEventListener('input', function() {
+        const query = this.value.trim();
+        if (query === lastQuery) {
+            return;
+        }
+        lastQuery = query;
+        clearTimeout(debounceTimer);
+        if (!query) {
+            hideSuggestions();
+            return;
+        }
+        debounceTimer = setTimeout(() => fetchSuggestions(query), 150);
+    });
+    
+    searchInput.addEventListener('keydown', function(e) {
+        const items = suggestions.querySelectorAll('li');
+        if (suggestions.hidden || !items.length) {
+            return;
+        }
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            if (activeIndex >= 0) {
+                items[activeIndex].classList.remove('active');
+            }
+            const step = e.key === 'ArrowDown' ? 1 : -1;
+            activeIndex = (activeIndex + step + items.length) % items.length;
+            items[activeIndex].classList.add('active');
+        } else if (e.key === 'Enter' && activeIndex >= 0) {
+            e.preventDefault();
+            window.location.href = items[activeIndex].querySelector('a').href;
+        } else if (e.key === 'Escape') {
+            hideSuggestions();
+        }
+    });
+    
+    document.addEventListener('click', function(e) {
+        if (!searchInput.contains(e.target) && !suggestions.contains(e.target)) {
+            hideSuggestions();
+        }
+    });
+});
+
 // Get CSRF token from cookies
 function getCookie(name) {
     let cookieValue = null;
@@ -0,0 +1,155 @@
+"""
+Статистика брошенных корзин.
+
+Корзина, которая не менялась дольше срока хранения и не превратилась в заказ
+(при оформлении заказа корзина удаляется), считается брошенной. Перед
+удалением такие корзины сворачиваются в две небольшие таблицы: по дням
+(DailyAbandonedCarts) и по товарам за день (DailyAbandonedProducts). Датой
+считается день последнего изменения корзины.
+
+Корзины обрабатываются пачками по CART_CLEANUP_BATCH_SIZE: в одной
+транзакции содержимое пачки агрегируется в БД, прибавляется к статистике
+(bulk_update/bulk_create) и корзины удаляются - прерванная очистка не
+учитывает корзины дважды. Пустые корзины удаляются без учёта.
+
+abandonment_report() сравнивает брошенные корзины с заказами из дневных
+сводок продаж (sales_rollups.py) - конверсия по магазину и по товарам.
+Корзина попадает в статистику только через CART_EXPIRE_DAYS дней после
+последнего изменения, поэтому отчёт доступен с таким же отставанием.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Cart, CartItem, DailyAbandonedCarts, DailyAbandonedProducts, DailyCitySales, DailyProductSales
+
+CART_CLEANUP_BATCH_SIZE = getattr(settings, 'CART_CLEANUP_BATCH_SIZE', 1000)
+# Срок хранения корзины (как у Cart.cleanup_old_carts): статистика за последние
+# CART_EXPIRE_DAYS дней ещё неполна - брошенные тогда корзины пока не удалены
+CART_EXPIRE_DAYS = 30
+
+
+def _merge(model, key_fields, rows, batch_size):
+    """Прибавляет rows ({ключ: {поле: значение}}) к существующим строкам model, недостающие создаёт"""
+    if not rows:
+        return
+    fields = list(next(iter(rows.values())))
+    lookup = {f'{key_fields[0]}__in': {key[0] for key in rows}}
+    existing = {}
+    for obj in model.objects.filter(**lookup).select_for_update():
+        key = tuple(getattr(obj, field) for field in key_fields)
+        if key in rows:
+            existing[key] = obj
+    for key, obj in existing.items():
+        for field in fields:
+            setattr(obj, field, getattr(obj, field) + rows[key][field])
+    model.objects.bulk_update(existing.values(), fields, batch_size=batch_size)
+    model.objects.bulk_create([
+        model(**dict(zip(key_fields, key)), **values)
+        for key, values in rows.items() if key not in existing
+    ], batch_size=batch_size)
+
+
+def summarize_batch(cart_ids, batch_size):
+    """Добавляет корзины cart_ids в статистику. Возвращает количество непустых корзин"""
+    value = ExpressionWrapper(F('product__price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    items = (
+        CartItem.objects.filter(cart_id__in=cart_ids)
+        .annotate(day=TruncDate('cart__updated_at'))
+        .order_by()
+    )
+    products = {
+        (row['day'], row['product_id']): {'carts': row['carts'], 'quantity': row['units'], 'value': row['value']}
+        for row in items.values('day', 'product_id').annotate(
+            value=Sum(value), carts=Count('cart_id', distinct=True), units=Sum('quantity'),
+        )
+    }
+    days = {
+        (row['day'],): {'carts': row['carts'], 'quantity': row['units'], 'value': row['value']}
+        for row in items.values('day').annotate(
+            value=Sum(value), carts=Count('cart_id', distinct=True), units=Sum('quantity'),
+        )
+    }
+    _merge(DailyAbandonedProducts, ('date', 'product_id'), products, batch_size)
+    _merge(DailyAbandonedCarts, ('date',), days, batch_size)
+    return sum(row['carts'] for row in days.values())
+
+
+def reap_carts(days=CART_EXPIRE_DAYS, batch_size=None):
+    """
+    Удаляет корзины, не менявшиеся больше days дней, предварительно добавив
+    непустые в статистику брошенных корзин. Возвращает количество удалённых корзин.
+    """
+    batch_size = batch_size or CART_CLEANUP_BATCH_SIZE
+    expired = Cart.objects.filter(updated_at__lt=timezone.now() - timedelta(days=days))
+    deleted = 0
+    last_id = 0
+    while True:
+        cart_ids = list(expired.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not cart_ids:
+            break
+        last_id = cart_ids[-1]
+        with transaction.atomic():
+            # Корзину могли изменить после выборки - она больше не устаревшая
+            cart_ids = list(expired.filter(pk__in=cart_ids).select_for_update().values_list('pk', flat=True))
+            summarize_batch(cart_ids, batch_size)
+            Cart.objects.filter(pk__in=cart_ids).delete()
+        deleted += len(cart_ids)
+    return deleted
+
+
+def abandonment_report(date_from, date_to, limit=20):
+    """
+    Брошенные корзины за период и конверсия: доля заказов среди заказов и
+    брошенных корзин, всего и по товарам (заказы - во всех валютах).
+    Период обрезается до data_until: за более поздние дни корзины ещё не
+    учтены, и конверсия была бы завышена. Если данных за период нет совсем,
+    period_ready=False.
+    """
+    data_until = timezone.localdate() - timedelta(days=CART_EXPIRE_DAYS)
+    date_to = min(date_to, data_until)
+    report = {'date_from': date_from, 'date_to': date_to, 'data_until': data_until, 'lag_days': CART_EXPIRE_DAYS}
+    if date_from > date_to:
+        return dict(report, period_ready=False, carts=0, products=[])
+    period = {'date__gte': date_from, 'date__lte': date_to}
+    totals = DailyAbandonedCarts.objects.filter(**period).aggregate(
+        carts=Sum('carts'), quantity=Sum('quantity'), value=Sum('value'),
+    )
+    carts = totals['carts'] or 0
+    orders = DailyCitySales.objects.filter(**period).aggregate(orders=Sum('orders'))['orders'] or 0
+
+    products = list(
+        DailyAbandonedProducts.objects.filter(**period)
+        .values('product_id', 'product__name_ru')
+        .annotate(carts=Sum('carts'), quantity=Sum('quantity'), value=Sum('value'))
+        .order_by('-carts')[:limit]
+    )
+    ordered = dict(
+        DailyProductSales.objects.filter(**period, product_id__in=[row['product_id'] for row in products])
+        .values('product_id').annotate(orders=Sum('orders')).values_list('product_id', 'orders')
+    )
+    for row in products:
+        row['orders'] = ordered.get(row['product_id'], 0)
+        row['conversion'] = _conversion(row['orders'], row['carts'])
+    return {
+        **report,
+        'period_ready': True,
+        'carts': carts,
+        'quantity': totals['quantity'] or 0,
+        'value': totals['value'] or Decimal(0),
+        'orders': orders,
+        'conversion': _conversion(orders, carts),
+        'products': products,
+    }
+
+
+def _conversion(orders, carts):
+    """Процент корзин, ставших заказами (None - если нет ни тех, ни других)"""
+    if not orders + carts:
+        return None
+    return round(orders * 100 / (orders + carts), 1)
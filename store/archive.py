@@ -0,0 +1,102 @@
+"""
+Архивирование заказов (горячие и холодные данные).
+
+Доставленные и отменённые заказы старше ORDER_ARCHIVE_AFTER_DAYS переносятся
+из Order/OrderItem в ArchivedOrder/ArchivedOrderItem с теми же номерами.
+Рабочие таблицы остаются небольшими: список заказов в админ-панели, сводка на
+главной странице админки и соединения с OrderItem (рекомендации, рейтинг
+продаж) не просматривают всю историю. Архив доступен в админ-панели только
+для чтения.
+
+Перенос идёт пачками по ORDER_ARCHIVE_BATCH_SIZE заказов, каждая пачка - в
+своей транзакции (копирование и удаление вместе), поэтому прерванный запуск
+можно просто повторить. Запускается командой archive_orders раз в месяц.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, StockMovement
+from .sales_rank import SALES_WINDOWS
+
+ORDER_ARCHIVE_AFTER_DAYS = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 180)
+ORDER_ARCHIVE_STATUSES = tuple(getattr(settings, 'ORDER_ARCHIVE_STATUSES', ('delivered', 'cancelled')))
+ORDER_ARCHIVE_BATCH_SIZE = getattr(settings, 'ORDER_ARCHIVE_BATCH_SIZE', 1000)
+
+# Рейтинг продаж считается по OrderItem: заказы из его окон архивировать нельзя
+MIN_ARCHIVE_AGE_DAYS = max(SALES_WINDOWS.values())
+
+ORDER_FIELDS = [field.attname for field in Order._meta.concrete_fields]
+
+
+def archivable_orders(older_than_days=None):
+    if older_than_days is None:
+        older_than_days = ORDER_ARCHIVE_AFTER_DAYS
+    if older_than_days < MIN_ARCHIVE_AGE_DAYS:
+        raise ValueError(
+            f'Заказы моложе {MIN_ARCHIVE_AGE_DAYS} дней нужны для рейтинга продаж и не архивируются'
+        )
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return Order.objects.filter(status__in=ORDER_ARCHIVE_STATUSES, created_at__lt=cutoff)
+
+
+def archive_batch(queryset, order_ids):
+    """
+    Переносит в архив заказы order_ids (из тех, что ещё подходят под queryset).
+    Возвращает (количество заказов, количество позиций).
+    """
+    with transaction.atomic():
+        orders = list(queryset.filter(pk__in=order_ids).select_for_update().values(*ORDER_FIELDS))
+        if not orders:
+            return 0, 0
+        ids = [order['id'] for order in orders]
+        items = list(
+            OrderItem.objects.filter(order_id__in=ids)
+            .values_list('id', 'order_id', 'product_id', 'product__name_ru', 'quantity', 'price')
+        )
+
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**order) for order in orders])
+        ArchivedOrderItem.objects.bulk_create([
+            ArchivedOrderItem(
+                id=item_id, order_id=order_id, product_id=product_id,
+                product_name=product_name, quantity=quantity, price=price,
+            )
+            for item_id, order_id, product_id, product_name, quantity, price in items
+        ])
+
+        # Ссылка на заказ в журнале остатков обнулится при удалении - номер остаётся в комментарии
+        StockMovement.objects.filter(order_id__in=ids, comment='').update(
+            comment=Concat(Value('Заказ #'), Cast('order_id', CharField()))
+        )
+        OrderItem.objects.filter(order_id__in=ids).delete()
+        Order.objects.filter(pk__in=ids).delete()
+    return len(orders), len(items)
+
+
+def archive_orders(older_than_days=None, batch_size=None, limit=None, progress=None):
+    """
+    Переносит в архив все подходящие заказы (не больше limit).
+    Возвращает (количество заказов, количество позиций).
+    """
+    queryset = archivable_orders(older_than_days)
+    batch_size = batch_size or ORDER_ARCHIVE_BATCH_SIZE
+    orders_total = items_total = 0
+    last_id = 0
+    while limit is None or orders_total < limit:
+        size = batch_size if limit is None else min(batch_size, limit - orders_total)
+        order_ids = list(
+            queryset.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:size]
+        )
+        if not order_ids:
+            break
+        last_id = order_ids[-1]
+        orders_count, items_count = archive_batch(queryset, order_ids)
+        orders_total += orders_count
+        items_total += items_count
+        if progress:
+            progress(orders_total, items_total)
+    return orders_total, items_total
@@ -0,0 +1,445 @@
+"""
+Хранилища корзины покупателя.
+
+Представления, контекстный процессор и шаблоны работают с корзиной через
+общий API (items.all, total_items, total_price, apply, materialize),
+а где хранятся позиции, определяет настройка CART_STORAGE:
+
+- 'db' (по умолчанию): позиции лежат в Cart/CartItem, корзина привязана к сессии;
+- 'cookie': позиции (id товара, количество) хранятся в подписанной сжатой cookie.
+  Сессия и строки в БД не создаются, цены и остатки подгружаются одним запросом
+  при отображении, а Cart материализуется в БД только при оформлении заказа.
+
+Цены позиций берутся в регионе посетителя (pricing.py) одним запросом на корзину.
+
+Все изменения корзины идут через apply(operations): пакет операций
+add/set/remove применяется целиком или не применяется вовсе.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.translation import gettext as _
+
+from . import metrics
+from .models import Cart, CartItem, Product
+from .pricing import attach_prices, get_region, unit_price
+
+# Хранилище корзины: 'db' или 'cookie'
+CART_STORAGE = getattr(settings, 'CART_STORAGE', 'db')
+CART_COOKIE_NAME = getattr(settings, 'CART_COOKIE_NAME', 'cart')
+# Время жизни корзины в днях (как и у Cart.cleanup_old_carts)
+CART_COOKIE_DAYS = getattr(settings, 'CART_COOKIE_DAYS', 30)
+# Максимальное количество позиций в cookie-корзине (ограничение размера cookie)
+CART_MAX_LINES = getattr(settings, 'CART_MAX_LINES', 50)
+# Максимальное количество операций в одном пакетном запросе
+CART_MAX_OPERATIONS = getattr(settings, 'CART_MAX_OPERATIONS', 50)
+
+_COOKIE_SALT = 'store.cart'
+
+
+CART_OPERATIONS = ('add', 'set', 'remove')
+
+CartOperation = namedtuple('CartOperation', ['op', 'product_id', 'item_id', 'quantity'])
+
+
+class CartOperationError(Exception):
+    """Операция пакета не может быть применена; весь пакет откатывается"""
+
+    def __init__(self, message, index=None, status=400, max_quantity=None):
+        self.message = message
+        self.index = index
+        self.status = status
+        self.max_quantity = max_quantity
+        super().__init__(message)
+
+
+def _not_found(index):
+    return CartOperationError(_('Товар не найден в корзине'), index=index, status=404)
+
+
+def _stock_error(index, stock, in_cart=0):
+    """Ошибка превышения остатка с теми же текстами, что и у прежних эндпоинтов"""
+    if stock <= 0:
+        message = _('Товар отсутствует на складе')
+    elif in_cart:
+        message = _('На складе доступно только %(stock)s шт. этого товара. В корзине уже %(quantity)s шт.') % {
+            'stock': stock,
+            'quantity': in_cart
+        }
+    else:
+        message = _('На складе доступно только %(stock)s шт. этого товара') % {'stock': stock}
+    return CartOperationError(message, index=index, max_quantity=max(stock, 0))
+
+
+def parse_operations(raw_operations):
+    """
+    Проверяет пакет операций вида
+    {"op": "add"|"set"|"remove", "product_id" или "item_id": int, "quantity": int}
+    и возвращает список CartOperation. set с quantity <= 0 равносилен remove.
+    """
+    if not isinstance(raw_operations, list) or not raw_operations:
+        raise CartOperationError(_('Неверный формат запроса'))
+    if len(raw_operations) > CART_MAX_OPERATIONS:
+        raise CartOperationError(_('Слишком много операций в одном запросе'))
+
+    operations = []
+    for index, raw in enumerate(raw_operations):
+        try:
+            op = raw['op']
+            product_id = raw.get('product_id')
+            item_id = raw.get('item_id')
+            product_id = int(product_id) if product_id is not None else None
+            item_id = int(item_id) if item_id is not None else None
+            quantity = int(raw.get('quantity', 1 if op == 'add' else 0))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise CartOperationError(_('Неверный формат запроса'), index=index)
+        if op not in CART_OPERATIONS or (product_id is None) == (item_id is None):
+            raise CartOperationError(_('Неверный формат запроса'), index=index)
+        if op == 'add' and (quantity <= 0 or product_id is None):
+            raise CartOperationError(_('Неверный формат запроса'), index=index)
+        if op == 'set' and quantity <= 0:
+            op = 'remove'
+        operations.append(CartOperation(op, product_id, item_id, quantity))
+    return operations
+
+
+def _record_operations(operations):
+    for operation in operations:
+        metrics.inc('store_cart_operations_total', op=operation.op)
+
+
+class CartLine:
+    """Позиция корзины с тем же интерфейсом, что и CartItem в шаблонах"""
+
+    __slots__ = ('id', 'product', 'quantity')
+
+    def __init__(self, id, product, quantity):
+        self.id = id
+        self.product = product
+        self.quantity = quantity
+
+    @property
+    def product_id(self):
+        return self.product.pk
+
+    @property
+    def unit_price(self):
+        return unit_price(self.product)
+
+    @property
+    def total_price(self):
+        return self.unit_price * self.quantity
+
+
+class CartLines:
+    """Список позиций, совместимый с {% for item in cart.items.all %}"""
+
+    def __init__(self, lines):
+        self._lines = lines
+
+    def all(self):
+        return self._lines
+
+    def count(self):
+        return len(self._lines)
+
+    def __iter__(self):
+        return iter(self._lines)
+
+    def __len__(self):
+        return len(self._lines)
+
+
+class BaseCart:
+    """Общая часть хранилищ: итоги считаются по уже загруженным позициям"""
+
+    def __init__(self, request):
+        self.request = request
+
+    @cached_property
+    def region(self):
+        return get_region(self.request)
+
+    @cached_property
+    def lines(self):
+        return self._priced(self._load_lines())
+
+    def _priced(self, lines):
+        attach_prices([line.product for line in lines], self.region)
+        return lines
+
+    def _load_lines(self):
+        raise NotImplementedError
+
+    def _invalidate(self):
+        self.__dict__.pop('lines', None)
+
+    @property
+    def items(self):
+        return CartLines(self.lines)
+
+    @property
+    def total_price(self):
+        return sum(line.total_price for line in self.lines)
+
+    @property
+    def total_items(self):
+        return sum(line.quantity for line in self.lines)
+
+    def is_empty(self):
+        return not self.lines
+
+    def get_line(self, item_id):
+        """Позиция по id (CartItem.id или id товара) или None, если её нет в этой корзине"""
+        for line in self.lines:
+            if line.id == item_id:
+                return line
+        return None
+
+    def apply(self, operations):
+        """
+        Применяет пакет операций (список словарей, см. parse_operations)
+        в одной транзакции. При ошибке выбрасывает CartOperationError,
+        и корзина остаётся без изменений.
+        """
+        raise NotImplementedError
+
+    def materialize(self):
+        """Возвращает корзину в виде строки Cart в БД (для оформления заказа)"""
+        raise NotImplementedError
+
+    def clear(self):
+        """Очищает корзину после оформления заказа"""
+        raise NotImplementedError
+
+    def save(self, response):
+        """Сохраняет изменения в ответ (нужно только cookie-хранилищу)"""
+        return response
+
+
+class DatabaseCart(BaseCart):
+    """Корзина в таблицах Cart/CartItem, привязанная к ключу сессии"""
+
+    def __init__(self, request):
+        super().__init__(request)
+        self._cart = None
+        self._cart_loaded = False
+
+    def _get_cart(self, create=False):
+        if not self._cart_loaded:
+            self._cart_loaded = True
+            session_key = self.request.session.session_key
+            if session_key:
+                self._cart = Cart.objects.filter(session_key=session_key).first()
+                # Истёкшую корзину удаляем, как и раньше
+                if self._cart is not None and self._cart.is_expired():
+                    self._cart.delete()
+                    self._cart = None
+        if self._cart is None and create:
+            if not self.request.session.session_key:
+                self.request.session.create()
+            self._cart, _created = Cart.objects.get_or_create(session_key=self.request.session.session_key)
+        return self._cart
+
+    def _load_lines(self):
+        cart = self._get_cart()
+        if cart is None:
+            return []
+        return [
+            CartLine(item.id, item.product, item.quantity)
+            for item in cart.items.select_related('product').order_by('id')
+        ]
+
+    def apply(self, operations):
+        operations = parse_operations(operations)
+        with transaction.atomic():
+            cart = self._get_cart(create=any(operation.op != 'remove' for operation in operations))
+            if cart is None:
+                raise _not_found(0)
+            for index, operation in enumerate(operations):
+                self._apply_one(cart, index, operation)
+            # Корзина активна - сдвигаем срок её очистки
+            Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now())
+        self._invalidate()
+        _record_operations(operations)
+
+    def _apply_one(self, cart, index, operation):
+        items = CartItem.objects.filter(cart=cart)
+        if operation.item_id is not None:
+            items = items.filter(id=operation.item_id)
+        else:
+            items = items.filter(product_id=operation.product_id)
+
+        if operation.op == 'remove':
+            deleted, _rows = items.delete()
+            if not deleted:
+                raise _not_found(index)
+            return
+
+        # Количество меняется одним условным UPDATE: без чтения-изменения-записи
+        # и только если результат не превышает текущий остаток товара
+        if operation.op == 'add':
+            new_quantity = F('quantity') + operation.quantity
+        else:
+            new_quantity = operation.quantity
+        if items.filter(product__stock__gte=new_quantity).update(quantity=new_quantity):
+            return
+
+        current = items.values_list('quantity', 'product__stock').first()
+        if current is not None:
+            quantity, stock = current
+            raise _stock_error(index, stock, quantity if operation.op == 'add' else 0)
+        if operation.product_id is None:
+            raise _not_found(index)
+
+        stock = Product.objects.filter(pk=operation.product_id).values_list('stock', flat=True).first()
+        if stock is None:
+            raise _not_found(index)
+        if operation.quantity > stock:
+            raise _stock_error(index, stock)
+        try:
+            with transaction.atomic():
+                CartItem.objects.create(cart=cart, product_id=operation.product_id, quantity=operation.quantity)
+        except IntegrityError:
+            # Позицию одновременно создал параллельный запрос - повторяем условный UPDATE
+            if not items.filter(product__stock__gte=new_quantity).update(quantity=new_quantity):
+                raise _stock_error(index, stock)
+
+    def materialize(self):
+        return self._get_cart(create=True)
+
+    def clear(self):
+        cart = self._get_cart()
+        if cart is not None and cart.pk:
+            cart.delete()
+        self._cart = None
+        self._invalidate()
+
+
+class CookieCart(BaseCart):
+    """
+    Корзина в подписанной cookie: список пар [id товара, количество].
+    В этом режиме id позиции совпадает с id товара.
+    """
+
+    def __init__(self, request):
+        super().__init__(request)
+        self._quantities = self._read_cookie()
+        self._modified = False
+
+    def _read_cookie(self):
+        value = self.request.COOKIES.get(CART_COOKIE_NAME)
+        if not value:
+            return {}
+        try:
+            payload = signing.loads(value, salt=_COOKIE_SALT, max_age=CART_COOKIE_DAYS * 86400)
+            return {int(product_id): int(quantity) for product_id, quantity in payload if int(quantity) > 0}
+        except (signing.BadSignature, TypeError, ValueError):
+            # Подделанная, устаревшая или повреждённая cookie - начинаем с пустой корзины
+            return {}
+
+    def _load_lines(self):
+        if not self._quantities:
+            return []
+        # Цены и остатки всех позиций - одним запросом
+        products = Product.objects.filter(is_available=True).in_bulk(list(self._quantities))
+        self._drop_missing(products)
+        return [CartLine(product_id, products[product_id], quantity) for product_id, quantity in self._quantities.items()]
+
+    def _drop_missing(self, products):
+        """Убирает из cookie товары, которые удалены или недоступны (сняты с продажи, закончились)"""
+        missing = [product_id for product_id in self._quantities if product_id not in products]
+        for product_id in missing:
+            del self._quantities[product_id]
+        if missing:
+            self._modified = True
+
+    def apply(self, operations):
+        operations = parse_operations(operations)
+        quantities = dict(self._quantities)
+        product_ids = set(quantities)
+        product_ids.update(operation.product_id or operation.item_id for operation in operations)
+        # Остатки всех затронутых товаров и цены позиций - одним запросом
+        products = Product.objects.filter(is_available=True).in_bulk(list(product_ids))
+
+        for index, operation in enumerate(operations):
+            product_id = operation.product_id or operation.item_id
+            if operation.op == 'remove':
+                if quantities.pop(product_id, None) is None:
+                    raise _not_found(index)
+                continue
+
+            product = products.get(product_id)
+            if product is None or (operation.item_id is not None and product_id not in quantities):
+                raise _not_found(index)
+            current = quantities.get(product_id, 0)
+            new_quantity = current + operation.quantity if operation.op == 'add' else operation.quantity
+            if new_quantity > product.stock:
+                raise _stock_error(index, product.stock, current if operation.op == 'add' else 0)
+            if not current and len(quantities) >= CART_MAX_LINES:
+                raise CartOperationError(_('В корзине слишком много позиций'), index=index)
+            quantities[product_id] = new_quantity
+
+        self._quantities = quantities
+        self._modified = True
+        self._drop_missing(products)
+        _record_operations(operations)
+        self.__dict__['lines'] = self._priced([
+            CartLine(product_id, products[product_id], quantity)
+            for product_id, quantity in self._quantities.items()
+        ])
+
+    @transaction.atomic
+    def materialize(self):
+        cart = Cart.objects.create(session_key=self.request.session.session_key or '')
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=line.product, quantity=line.quantity)
+            for line in self.lines
+        ])
+        return cart
+
+    def clear(self):
+        self._quantities = {}
+        self._modified = True
+        self._invalidate()
+
+    def save(self, response):
+        if not self._modified:
+            return response
+        if self._quantities:
+            value = signing.dumps(list(self._quantities.items()), salt=_COOKIE_SALT, compress=True)
+            response.set_cookie(
+                CART_COOKIE_NAME,
+                value,
+                max_age=CART_COOKIE_DAYS * 86400,
+                httponly=True,
+                samesite='Lax',
+                secure=getattr(settings, 'SESSION_COOKIE_SECURE', False),
+            )
+        else:
+            response.delete_cookie(CART_COOKIE_NAME, samesite='Lax')
+        self._modified = False
+        return response
+
+
+_BACKENDS = {
+    'db': DatabaseCart,
+    'cookie': CookieCart,
+}
+
+
+def get_cart(request):
+    """
+    Корзина текущего запроса (одна на запрос, общая для представления
+    и контекстного процессора).
+    """
+    cart = getattr(request, '_store_cart', None)
+    if cart is None:
+        cart = _BACKENDS[CART_STORAGE](request)
+        request._store_cart = cart
+    return cart
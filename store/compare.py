@@ -0,0 +1,96 @@
+"""
+Сравнение товаров.
+
+Список сравнения (не больше COMPARE_MAX_PRODUCTS товаров) хранится в
+подписанной cookie, как cookie-корзина: сессия не создаётся. Страница
+сравнения загружает товары одним запросом (вместе с ценами региона) и
+характеристики всех товаров вторым, после чего разворачивает их в таблицу
+"характеристика x товар". Строки сопоставляются по русскому названию
+характеристики, строки с разными значениями отмечаются.
+
+Таблица кэшируется по набору товаров и языку. Любое изменение
+характеристик меняет версию кэша (invalidate_matrices, сигналы
+ProductAttribute) - устаревшие таблицы больше не читаются и истекают сами.
+"""
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+from . import metrics
+from .models import ProductAttribute
+
+COMPARE_COOKIE_NAME = getattr(settings, 'COMPARE_COOKIE_NAME', 'compare')
+COMPARE_MAX_PRODUCTS = getattr(settings, 'COMPARE_MAX_PRODUCTS', 4)
+COMPARE_COOKIE_DAYS = 30
+COMPARE_CACHE_TIMEOUT = 60 * 60
+
+MATRIX_VERSION_KEY = 'store_compare_version'
+
+_COOKIE_SALT = 'store.compare'
+
+
+def get_compare_ids(request):
+    """id товаров в списке сравнения (в порядке добавления)"""
+    value = request.COOKIES.get(COMPARE_COOKIE_NAME)
+    if not value:
+        return []
+    try:
+        product_ids = [int(product_id) for product_id in signing.loads(value, salt=_COOKIE_SALT)]
+    except (signing.BadSignature, TypeError, ValueError):
+        # Подделанная или повреждённая cookie - список пуст
+        return []
+    return list(dict.fromkeys(product_ids))[:COMPARE_MAX_PRODUCTS]
+
+
+def save_compare_ids(response, product_ids):
+    if product_ids:
+        response.set_cookie(
+            COMPARE_COOKIE_NAME,
+            signing.dumps(product_ids, salt=_COOKIE_SALT),
+            max_age=COMPARE_COOKIE_DAYS * 86400,
+            httponly=True,
+            samesite='Lax',
+            secure=getattr(settings, 'SESSION_COOKIE_SECURE', False),
+        )
+    else:
+        response.delete_cookie(COMPARE_COOKIE_NAME, samesite='Lax')
+    return response
+
+
+def invalidate_matrices():
+    cache.set(MATRIX_VERSION_KEY, time.time_ns(), None)
+
+
+def _matrix_key(product_ids, language):
+    version = cache.get_or_set(MATRIX_VERSION_KEY, time.time_ns, None)
+    return f'store_compare:{version}:{language}:{",".join(map(str, product_ids))}'
+
+
+def build_matrix(product_ids, language):
+    """
+    Строки таблицы сравнения для товаров product_ids (в этом порядке):
+    [{'name': ..., 'values': [значение по каждому товару или ''], 'differs': bool}]
+    """
+    rows = {}
+    attributes = ProductAttribute.objects.filter(product_id__in=product_ids).order_by('order', 'name_ru')
+    for attribute in attributes:
+        row = rows.setdefault(attribute.name_ru, {'name': attribute.get_name(language), 'values': {}})
+        row['values'].setdefault(attribute.product_id, attribute.get_value(language))
+
+    matrix = []
+    for row in rows.values():
+        values = [row['values'].get(product_id, '') for product_id in product_ids]
+        matrix.append({'name': row['name'], 'values': values, 'differs': len(set(values)) > 1})
+    return matrix
+
+
+def get_matrix(product_ids, language):
+    key = _matrix_key(product_ids, language)
+    matrix = cache.get(key)
+    metrics.inc('store_cache_requests_total', cache='compare', result='miss' if matrix is None else 'hit')
+    if matrix is None:
+        matrix = build_matrix(product_ids, language)
+        cache.set(key, matrix, COMPARE_CACHE_TIMEOUT)
+    return matrix
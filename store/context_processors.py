@@ -1,25 +1,24 @@
 from django.utils.translation import get_language
-from .models import Cart, Category, CompanyInfo
+from django.utils.functional import SimpleLazyObject
+from .cart import get_cart
+from .compare import get_compare_ids
+from .models import Category, CompanyInfo
+from .pricing import get_region, get_regions
 
 
 def cart(request):
-    cart_items_count = 0
-    cart_total = 0
-    
-    if request.session.session_key:
-        try:
-            cart = Cart.objects.get(session_key=request.session.session_key)
-            cart_items_count = cart.total_items
-            cart_total = cart.total_price
-        except Cart.DoesNotExist:
-            pass
+    # Хранилище корзины общее с представлением; сумма считается, только если её выводит шаблон
+    store_cart = get_cart(request)
+    cart_items_count = store_cart.total_items
+    cart_total = SimpleLazyObject(lambda: store_cart.total_price)
     
     # Получаем категории для навигации (только с slug, первые 5)
     categories = Category.objects.filter(parent=None).exclude(slug='')[:5]
     
     # Получаем текущий язык используя стандартный Django подход
     current_language = get_language()
-    current_region = request.session.get('region', 'RU')
+    # Регион цен - из cookie (без создания сессии)
+    price_region = get_region(request)
     
     # Получаем информацию о компании
     try:
@@ -30,8 +29,12 @@ def cart(request):
     return {
         'cart_items_count': cart_items_count,
         'cart_total': cart_total,
+        # Список сравнения - из cookie, без запроса к БД
+        'compare_count': len(get_compare_ids(request)),
         'categories': categories,
         'current_language': current_language,
-        'current_region': current_region,
+        'current_region': price_region.code,
+        'price_region': price_region,
+        'price_regions': get_regions(),
         'company_info': company_info,
     }
@@ -0,0 +1,515 @@
+"""
+Генератор больших наборов тестовых данных (create_full_test_data --scale).
+
+Данные пишутся через bulk_create пачками по batch_size, с заранее назначенными
+первичными ключами: каждый кусок (chunk) товаров, заказов или корзин
+генерируется независимо, в том числе в отдельном процессе (--workers).
+Случайность задаётся зерном: один и тот же --seed на пустой базе даёт
+одинаковые данные, в том числе при другом количестве процессов - у каждого
+куска свой генератор random.Random(f'{seed}:{kind}:{chunk}').
+
+Распределения приближены к реальному магазину:
+
+- размеры категорий по закону Ципфа: несколько крупных категорий и длинный хвост;
+- цены - логнормальные вокруг базовой цены категории, часть товаров со скидкой;
+- названия и описания на русском всегда, на английском и узбекском - не у всех
+  товаров и разной длины;
+- популярность товаров в заказах и корзинах тоже по Ципфу; большинство
+  покупателей заказывает один раз, у постоянных (десятая часть) - история заказов;
+- статус заказа зависит от его возраста, корзины - свежие и брошенные.
+
+Изображения не рисуются для каждого объекта: один раз создаётся пул
+заглушек (products/pool/), и товары ссылаются на файлы из него.
+"""
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from multiprocessing import Pool
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import slugify
+
+IMAGE_POOL_DIR = 'products/pool'
+
+# (ru, en, uz) - одна и та же сущность на трёх языках
+CATEGORY_ROOTS = [
+    ('Гостиная', 'Living room', 'Mehmonxona'),
+    ('Спальня', 'Bedroom', 'Yotoqxona'),
+    ('Кухня', 'Kitchen', 'Oshxona'),
+    ('Офис', 'Office', 'Ofis'),
+    ('Детская', 'Kids room', 'Bolalar xonasi'),
+    ('Прихожая', 'Hallway', 'Dahliz'),
+    ('Декор', 'Decor', 'Dekor'),
+    ('Освещение', 'Lighting', 'Yoritish'),
+]
+# (ru, en, uz, ru мн. ч., en мн. ч., uz мн. ч.)
+NOUNS = [
+    ('Стол', 'table', 'stol', 'Столы', 'Tables', 'Stollar'),
+    ('Стул', 'chair', 'stul', 'Стулья', 'Chairs', 'Stullar'),
+    ('Шкаф', 'wardrobe', 'shkaf', 'Шкафы', 'Wardrobes', 'Shkaflar'),
+    ('Комод', 'chest of drawers', 'komod', 'Комоды', 'Chests of drawers', 'Komodlar'),
+    ('Кресло', 'armchair', 'kreslo', 'Кресла', 'Armchairs', 'Kreslolar'),
+    ('Диван', 'sofa', 'divan', 'Диваны', 'Sofas', 'Divanlar'),
+    ('Кровать', 'bed', 'karavot', 'Кровати', 'Beds', 'Karavotlar'),
+    ('Полка', 'shelf', 'javon', 'Полки', 'Shelves', 'Javonlar'),
+    ('Тумба', 'cabinet', 'tumba', 'Тумбы', 'Cabinets', 'Tumbalar'),
+    ('Стеллаж', 'bookcase', 'stellaj', 'Стеллажи', 'Bookcases', 'Stellajlar'),
+    ('Зеркало', 'mirror', "ko'zgu", 'Зеркала', 'Mirrors', "Ko'zgular"),
+    ('Светильник', 'lamp', 'chiroq', 'Светильники', 'Lamps', 'Chiroqlar'),
+    ('Табурет', 'stool', 'taburet', 'Табуреты', 'Stools', 'Taburetlar'),
+    ('Скамья', 'bench', "o'rindiq", 'Скамьи', 'Benches', "O'rindiqlar"),
+]
+COLLECTIONS = [
+    ('Верона', 'Verona'), ('Милан', 'Milan'), ('Осло', 'Oslo'), ('Бергамо', 'Bergamo'),
+    ('Лофт', 'Loft'), ('Сканди', 'Scandi'), ('Прованс', 'Provence'), ('Модерн', 'Modern'),
+    ('Классик', 'Classic'), ('Бохо', 'Boho'), ('Токио', 'Tokyo'), ('Вена', 'Vienna'),
+    ('Самарканд', 'Samarkand'), ('Бухара', 'Bukhara'), ('Хива', 'Khiva'), ('Арт', 'Art'),
+]
+MATERIALS = [
+    ('из дуба', 'oak', 'eman', 'Дуб', 'Oak', 'Eman'),
+    ('из ясеня', 'ash', 'shumtol', 'Ясень', 'Ash', 'Shumtol'),
+    ('из сосны', 'pine', "qarag'ay", 'Сосна', 'Pine', "Qarag'ay"),
+    ('из ореха', 'walnut', "yong'oq", 'Орех', 'Walnut', "Yong'oq"),
+    ('из бука', 'beech', 'qoraqayin', 'Бук', 'Beech', 'Qoraqayin'),
+    ('из МДФ', 'MDF', 'MDF', 'МДФ', 'MDF', 'MDF'),
+]
+COLORS = [
+    ('Натуральный', 'Natural', 'Tabiiy'), ('Белый', 'White', 'Oq'), ('Чёрный', 'Black', 'Qora'),
+    ('Венге', 'Wenge', 'Venge'), ('Серый', 'Grey', 'Kulrang'), ('Медовый', 'Honey', 'Asal rang'),
+]
+COUNTRIES = [
+    ('Узбекистан', 'Uzbekistan', "O'zbekiston"), ('Россия', 'Russia', 'Rossiya'),
+    ('Турция', 'Turkey', 'Turkiya'), ('Италия', 'Italy', 'Italiya'), ('Китай', 'China', 'Xitoy'),
+]
+SENTENCES = {
+    'ru': [
+        'Изделие выполнено из массива дерева и покрыто экологичным маслом.',
+        'Подходит для ежедневного использования в квартире и загородном доме.',
+        'Все углы скруглены, поверхность отшлифована вручную.',
+        'Фурнитура с доводчиками обеспечивает плавное и тихое закрывание.',
+        'Мебель поставляется в разобранном виде с подробной инструкцией.',
+        'Мастерская LuxWood даёт гарантию на каждое изделие.',
+        'Натуральный рисунок древесины делает каждый экземпляр уникальным.',
+        'Уход: протирать сухой или слегка влажной мягкой тканью.',
+        'Конструкция рассчитана на высокую нагрузку и не расшатывается со временем.',
+        'Размеры и оттенок можно изменить под заказ.',
+    ],
+    'en': [
+        'Made of solid wood finished with eco-friendly oil.',
+        'Suitable for everyday use in an apartment or a country house.',
+        'All corners are rounded and the surface is hand-sanded.',
+        'Soft-close hardware keeps it quiet.',
+        'Delivered flat-packed with detailed assembly instructions.',
+        'Every LuxWood piece comes with a workshop warranty.',
+        'The natural wood grain makes every item unique.',
+        'Care: wipe with a dry or slightly damp soft cloth.',
+    ],
+    'uz': [
+        "Mahsulot yog'ochdan tayyorlangan va ekologik moy bilan qoplangan.",
+        'Kvartira va hovli uyida har kuni foydalanish uchun mos.',
+        "Barcha burchaklar yumaloqlangan, sirti qo'lda silliqlangan.",
+        "LuxWood ustaxonasi har bir mahsulotga kafolat beradi.",
+        "Tabiiy yog'och naqshi har bir buyumni noyob qiladi.",
+        "Parvarish: quruq yoki biroz nam yumshoq mato bilan arting.",
+    ],
+}
+# Медиана и разброс количества слов описания; доля товаров с переводом
+DESCRIPTION_WORDS = {'ru': (3.6, 0.6), 'en': (3.3, 0.6), 'uz': (3.1, 0.7)}
+TRANSLATED_NAMES = {'en': 0.85, 'uz': 0.6}
+TRANSLATED_DESCRIPTIONS = {'en': 0.6, 'uz': 0.4}
+
+FIRST_NAMES = ['Азиз', 'Дилноза', 'Иван', 'Мария', 'Бахтиёр', 'Нигора', 'Алексей', 'Шахло', 'Тимур', 'Елена', 'Рустам', 'Малика']
+LAST_NAMES = ['Каримов', 'Усманова', 'Петров', 'Ким', 'Юсупов', 'Рахимова', 'Иванов', 'Ахмедова', 'Ли', 'Сидорова']
+# Города с весами (доля заказов, %)
+CITIES = [('Ташкент', 50), ('Самарканд', 12), ('Бухара', 8), ('Наманган', 7), ('Андижан', 7), ('Фергана', 6), ('Нукус', 4), ('Карши', 3), ('Термез', 3)]
+_CITY_BY_PERCENT = [city for city, weight in CITIES for _percent in range(weight)]
+# Верхняя граница цены товара: сумма заказа должна помещаться в Order.total_price
+MAX_PRICE = 4_000_000
+
+
+def _rng(seed, kind, chunk):
+    return random.Random(f'{seed}:{kind}:{chunk}')
+
+
+def zipf_cum_weights(count, exponent=1.0):
+    """Накопленные веса распределения Ципфа для random.choices(cum_weights=...)"""
+    total = 0.0
+    cum_weights = []
+    for rank in range(1, count + 1):
+        total += 1 / rank ** exponent
+        cum_weights.append(total)
+    return cum_weights
+
+
+def _money(value):
+    return Decimal(value).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+
+
+def _session_key(rng):
+    return f'{rng.getrandbits(128):032x}'
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Отключает auto_now/auto_now_add у полей дат, чтобы bulk_create сохранил
+    сгенерированные даты, а не текущее время.
+    """
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def build_image_pool(size, seed):
+    """
+    Пул заглушек для изображений товаров. Уже созданные файлы пула
+    используются повторно. Возвращает имена файлов в хранилище.
+    """
+    from PIL import Image, ImageDraw
+
+    rng = _rng(seed, 'images', 0)
+    names = []
+    for index in range(size):
+        name = f'{IMAGE_POOL_DIR}/placeholder-{index:03d}.jpg'
+        color = tuple(rng.randint(150, 235) for _channel in range(3))
+        if not default_storage.exists(name):
+            image = Image.new('RGB', (800, 600), color=color)
+            draw = ImageDraw.Draw(image)
+            draw.rectangle((200, 150, 600, 450), outline=tuple(channel - 60 for channel in color), width=8)
+            draw.text((370, 290), f'LuxWood #{index + 1}', fill=(90, 90, 90))
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=80)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+        names.append(name)
+    return names
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def create_categories(seed, leaf_count):
+    """
+    Корневые категории и leaf_count дочерних. Возвращает id дочерних категорий,
+    накопленные веса их размеров (Ципф в случайном порядке) и базовые цены.
+    """
+    from .models import Category
+
+    rng = _rng(seed, 'categories', 0)
+    root_id = next_id(Category)
+    roots = []
+    for offset, (ru, en, uz) in enumerate(CATEGORY_ROOTS):
+        pk = root_id + offset
+        roots.append(Category(pk=pk, name_ru=ru, name_en=en, name_uz=uz, slug=f'{slugify(en)}-{pk}'))
+    Category.objects.bulk_create(roots)
+
+    leaves = []
+    leaf_id = root_id + len(roots)
+    for index in range(leaf_count):
+        noun = NOUNS[index % len(NOUNS)]
+        suffix = f' {index // len(NOUNS) + 1}' if index >= len(NOUNS) else ''
+        pk = leaf_id + index
+        leaves.append(Category(
+            pk=pk,
+            name_ru=f'{noun[3]}{suffix}',
+            name_en=f'{noun[4]}{suffix}',
+            name_uz=f'{noun[5]}{suffix}',
+            slug=f'{slugify(noun[4])}-{pk}',
+            parent_id=roots[rng.randrange(len(roots))].pk,
+        ))
+    Category.objects.bulk_create(leaves)
+
+    leaf_ids = [leaf.pk for leaf in leaves]
+    rng.shuffle(leaf_ids)
+    base_prices = {pk: rng.lognormvariate(13.0, 0.7) for pk in leaf_ids}
+    return leaf_ids, zipf_cum_weights(len(leaf_ids)), base_prices
+
+
+def _description(rng, language):
+    median, spread = DESCRIPTION_WORDS[language]
+    target = max(5, int(rng.lognormvariate(median, spread)))
+    words = []
+    while len(words) < target:
+        words.extend(rng.choice(SENTENCES[language]).split())
+    return ' '.join(words[:target]).rstrip(',.') + '.'
+
+
+def _attributes(rng, product_id):
+    from .models import ProductAttribute
+
+    material, color, country = rng.choice(MATERIALS), rng.choice(COLORS), rng.choice(COUNTRIES)
+    width, height = rng.randrange(30, 240, 5), rng.randrange(40, 220, 5)
+    warranty = rng.choice([12, 18, 24, 36])
+    values = [
+        (('Материал', 'Material', 'Material'), material[3:]),
+        (('Цвет', 'Color', 'Rang'), color),
+        (('Ширина, см', 'Width, cm', 'Kengligi, sm'), (str(width),) * 3),
+        (('Высота, см', 'Height, cm', 'Balandligi, sm'), (str(height),) * 3),
+        (('Гарантия', 'Warranty', 'Kafolat'), (f'{warranty} мес.', f'{warranty} months', f'{warranty} oy')),
+        (('Страна производства', 'Country of origin', 'Ishlab chiqarilgan mamlakat'), country),
+    ]
+    count = rng.randint(3, len(values))
+    return [
+        ProductAttribute(
+            product_id=product_id, order=order,
+            name_ru=names[0], name_en=names[1], name_uz=names[2],
+            value_ru=value[0], value_en=value[1], value_uz=value[2],
+        )
+        for order, (names, value) in enumerate(values[:count])
+    ]
+
+
+def generate_products(plan, chunk, start, count):
+    from .models import Product, ProductAttribute, ProductImage
+
+    rng = _rng(plan['seed'], 'products', chunk)
+    now = plan['now']
+    products, images, attributes = [], [], []
+    for pk in range(start, start + count):
+        noun, (collection_ru, collection_en), material = rng.choice(NOUNS), rng.choice(COLLECTIONS), rng.choice(MATERIALS)
+        model = f'LW-{pk}'
+        names = {
+            'ru': f'{noun[0]} «{collection_ru}» {material[0]} {model}',
+            'en': f'{collection_en} {material[1]} {noun[1]} {model}',
+            'uz': f'{collection_en} {noun[2]}, {material[2]} {model}',
+        }
+        category_id = rng.choices(plan['category_ids'], cum_weights=plan['category_weights'])[0]
+        price = min(_money(plan['base_prices'][category_id] * rng.lognormvariate(0, 0.45) / 10) * 10, MAX_PRICE)
+        old_price = _money(price * Decimal(rng.uniform(1.1, 1.6))) if rng.random() < 0.3 else None
+        stock = 0 if rng.random() < 0.12 else int(rng.expovariate(1 / 40)) + 1
+        is_active = rng.random() < 0.97
+        reviews_count = int(rng.paretovariate(1.2)) - 1 if rng.random() < 0.6 else 0
+        reviews_count = min(reviews_count, 5000)
+        rating_total = round(reviews_count * rng.uniform(3.2, 5.0))
+        created_at = now - timedelta(days=plan['history_days'] * 3 * rng.random())
+
+        product = Product(
+            pk=pk,
+            name_ru=names['ru'],
+            description_ru=_description(rng, 'ru'),
+            # Номер модели LW-<id> в названии делает slug уникальным
+            slug=slugify(names['en']),
+            price=price,
+            old_price=old_price,
+            category_id=category_id,
+            image=rng.choice(plan['images']),
+            stock=stock,
+            is_active=is_active,
+            is_available=is_active and stock > 0,
+            featured=rng.random() < 0.02,
+            # Сгенерированные оценки - начальные: пересчёт рейтингов их сохраняет
+            reviews_count=reviews_count,
+            rating_total=rating_total,
+            seeded_reviews_count=reviews_count,
+            seeded_rating_total=rating_total,
+            rating=(Decimal(rating_total) / reviews_count).quantize(Decimal('0.01')) if reviews_count else 0,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+        for language, share in TRANSLATED_NAMES.items():
+            if rng.random() < share:
+                setattr(product, f'name_{language}', names[language])
+        for language, share in TRANSLATED_DESCRIPTIONS.items():
+            if rng.random() < share:
+                setattr(product, f'description_{language}', _description(rng, language))
+        products.append(product)
+
+        for _index in range(rng.choice([0, 0, 1, 2, 3])):
+            images.append(ProductImage(product_id=pk, image=rng.choice(plan['images'])))
+        product_attributes = _attributes(rng, pk)
+        product.attributes_data = ProductAttribute.compile(product_attributes)
+        attributes.extend(product_attributes)
+
+    batch_size = plan['batch_size']
+    with transaction.atomic():
+        Product.objects.bulk_create(products, batch_size=batch_size)
+        ProductImage.objects.bulk_create(images, batch_size=batch_size)
+        ProductAttribute.objects.bulk_create(attributes, batch_size=batch_size)
+    return count
+
+
+def _pick_products(rng, plan, count):
+    positions = set()
+    while len(positions) < count:
+        positions.add(rng.choices(plan['popularity'], cum_weights=plan['popularity_weights'])[0])
+    return sorted(positions)
+
+
+def _customer(index):
+    return {
+        'first_name': FIRST_NAMES[index % len(FIRST_NAMES)],
+        'last_name': LAST_NAMES[(index * 31) % len(LAST_NAMES)],
+        'email': f'customer{index}@example.com',
+        'phone': f'+99890{index % 10_000_000:07d}',
+        'address': f'ул. Тестовая, д. {index % 200 + 1}, кв. {index % 90 + 1}',
+        'city': _CITY_BY_PERCENT[(index * 7919) % len(_CITY_BY_PERCENT)],
+        'postal_code': f'{100000 + index % 90000}',
+    }
+
+
+def _order_status(rng, age_days):
+    if rng.random() < 0.06:
+        return 'cancelled'
+    if age_days < 2:
+        return rng.choice(['pending', 'processing'])
+    if age_days < 7:
+        return rng.choice(['processing', 'shipped'])
+    if age_days < 14:
+        return rng.choice(['shipped', 'delivered'])
+    return 'delivered'
+
+
+def generate_orders(plan, chunk, start, count):
+    from .models import Order, OrderItem
+
+    rng = _rng(plan['seed'], 'orders', chunk)
+    now = plan['now']
+    first_product, prices = plan['first_product'], plan['prices']
+    orders, items = [], []
+    for pk in range(start, start + count):
+        if rng.random() < 0.6:
+            # Разовый покупатель
+            customer = len(plan['customers']) + pk
+        else:
+            customer = rng.choices(plan['customers'], cum_weights=plan['customer_weights'])[0]
+        # Заказов становится больше ближе к текущей дате (рост магазина)
+        age_days = plan['history_days'] * rng.random() ** 1.5
+        total = Decimal(0)
+        for position in _pick_products(rng, plan, min(6, 1 + int(rng.expovariate(1.2)))):
+            price = prices[position]
+            quantity = 1 if rng.random() < 0.8 or price > MAX_PRICE / 4 else rng.randint(2, 3)
+            total += price * quantity
+            items.append(OrderItem(order_id=pk, product_id=first_product + position, quantity=quantity, price=price))
+        orders.append(Order(
+            pk=pk,
+            session_key=_session_key(rng),
+            status=_order_status(rng, age_days),
+            total_price=total,
+            currency=plan['currency'],
+            created_at=now - timedelta(days=age_days),
+            **_customer(customer),
+        ))
+
+    batch_size = plan['batch_size']
+    with transaction.atomic():
+        Order.objects.bulk_create(orders, batch_size=batch_size)
+        OrderItem.objects.bulk_create(items, batch_size=batch_size)
+    return count
+
+
+def generate_carts(plan, chunk, start, count):
+    from .models import Cart, CartItem
+
+    rng = _rng(plan['seed'], 'carts', chunk)
+    now = plan['now']
+    carts, items = [], []
+    for pk in range(start, start + count):
+        # 70% корзин активны в последние два дня, остальные брошены до трёх месяцев назад
+        idle_days = rng.uniform(0, 2) if rng.random() < 0.7 else rng.uniform(2, 90)
+        updated_at = now - timedelta(days=idle_days)
+        carts.append(Cart(
+            pk=pk,
+            session_key=_session_key(rng),
+            created_at=updated_at - timedelta(hours=rng.expovariate(1 / 12)),
+            updated_at=updated_at,
+        ))
+        for position in _pick_products(rng, plan, min(6, 1 + int(rng.expovariate(0.9)))):
+            items.append(CartItem(cart_id=pk, product_id=plan['first_product'] + position, quantity=rng.choice([1, 1, 1, 2, 3])))
+
+    batch_size = plan['batch_size']
+    with transaction.atomic():
+        Cart.objects.bulk_create(carts, batch_size=batch_size)
+        CartItem.objects.bulk_create(items, batch_size=batch_size)
+    return count
+
+
+GENERATORS = {
+    'products': generate_products,
+    'orders': generate_orders,
+    'carts': generate_carts,
+}
+
+_plan = None
+
+
+def _init_worker(plan):
+    global _plan
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        # Процесс запущен через spawn (Windows, macOS): Django ещё не настроен
+        django.setup()
+    _plan = plan
+    if 'popularity' not in plan and 'prices' in plan:
+        # Порядок популярности - случайная перестановка товаров, одинаковая для всех процессов
+        popularity = list(range(len(plan['prices'])))
+        _rng(plan['seed'], 'popularity', 0).shuffle(popularity)
+        plan['popularity'] = popularity
+        plan['popularity_weights'] = zipf_cum_weights(len(popularity), 1.05)
+    if 'customers' in plan:
+        plan['customer_weights'] = zipf_cum_weights(len(plan['customers']), 0.8)
+
+
+def _run_chunk(task):
+    from .models import Cart, Order, Product
+
+    kind, chunk, start, count = task
+    with explicit_timestamps(Product, Order, Cart):
+        return GENERATORS[kind](_plan, chunk, start, count)
+
+
+def generate(kind, total, plan, workers=1, chunk_size=10000, progress=None):
+    """
+    Создаёт total объектов вида kind ('products', 'orders', 'carts') кусками
+    по chunk_size, начиная с plan['start'], в workers процессах.
+    """
+    tasks = [
+        (kind, chunk, plan['start'] + offset, min(chunk_size, total - offset))
+        for chunk, offset in enumerate(range(0, total, chunk_size))
+    ]
+    done = 0
+    if workers > 1 and len(tasks) > 1:
+        # Соединение родителя не должно попасть в дочерние процессы
+        connections.close_all()
+        with Pool(workers, initializer=_init_worker, initargs=(plan,)) as pool:
+            for created in pool.imap_unordered(_run_chunk, tasks):
+                done += created
+                if progress:
+                    progress(done, total)
+    else:
+        _init_worker(dict(plan))
+        for task in tasks:
+            done += _run_chunk(task)
+            if progress:
+                progress(done, total)
+    return done
+
+
+def reset_sequences(*models):
+    """После вставки с явными id: PostgreSQL-последовательности продолжают с max(id)"""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def generation_start():
+    # Отсчёт дат от начала текущих суток: повторный запуск в тот же день даёт те же данные
+    return timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
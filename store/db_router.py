@@ -0,0 +1,110 @@
+"""
+Маршрутизация чтения каталога на реплики БД.
+
+Реплики описываются в settings.DATABASES под алиасами replica1, replica2, ...
+(см. DATABASE_REPLICAS в shop/settings.py). На реплики уходят только запросы
+на чтение внутри представлений, помеченных декоратором replica_reads
+(главная, каталог, карточка товара, FAQ, "О нас"). Корзина, оформление заказа,
+админ-панель и management-команды всегда работают с основной базой; корзина
+и сессия читаются оттуда и на страницах каталога (PRIMARY_ONLY_MODELS).
+
+Read-your-writes: если запрос выполнил INSERT/UPDATE/DELETE в основной базе,
+его дальнейшие чтения идут туда же, а ReplicaPinMiddleware (middleware.py) ставит
+посетителю cookie на REPLICA_STICKY_SECONDS, и пока она жива, все его
+чтения идут в основную базу - он сразу видит свои изменения, даже если
+реплика отстаёт.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Сколько секунд после записи читать из основной базы
+REPLICA_STICKY_SECONDS = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+REPLICA_PIN_COOKIE = 'db_primary'
+# Состояние посетителя всегда читается из основной базы: контекстный процессор
+# корзины и сессия выполняются и внутри replica_reads-представлений (при render)
+PRIMARY_ONLY_MODELS = {'store.cart', 'store.cartitem', 'sessions.session'}
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+class RoutingState:
+    """Состояние маршрутизации текущего запроса"""
+
+    __slots__ = ('replica_reads', 'pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.replica_reads = False
+        self.pinned = pinned
+        self.wrote = False
+
+    def record_write(self, execute, sql, params, many, context):
+        """execute_wrapper основной базы: отмечает реально выполненную запись"""
+        if not self.wrote and sql.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            self.wrote = True
+        return execute(sql, params, many, context)
+
+
+_state = ContextVar('store_db_routing', default=None)
+
+
+@contextmanager
+def request_routing(pinned=False):
+    """Состояние маршрутизации на время обработки одного запроса"""
+    state = RoutingState(pinned=pinned)
+    token = _state.set(state)
+    try:
+        with connections[DEFAULT_DB_ALIAS].execute_wrapper(state.record_write):
+            yield state
+    finally:
+        _state.reset(token)
+
+
+def replica_reads(view):
+    """Разрешает представлению читать из реплик (если посетитель не закреплён за основной базой)"""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = _state.get()
+        if state is None:
+            return view(request, *args, **kwargs)
+        previous = state.replica_reads
+        state.replica_reads = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state.replica_reads = previous
+
+    return wrapper
+
+
+class ReplicaRouter:
+    """Чтение в replica_reads-представлениях - со случайной реплики, всё остальное - в default"""
+
+    def __init__(self):
+        self.replicas = replica_aliases()
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return DEFAULT_DB_ALIAS
+        state = _state.get()
+        if self.replicas and state is not None and state.replica_reads and not (state.pinned or state.wrote):
+            return random.choice(self.replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик повторяет основную базу через репликацию (или sync_replicas локально)
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,81 @@
+"""
+Страница FAQ.
+
+Активные вопросы загружаются одним запросом вместе с категориями
+(select_related), уже переведёнными на язык страницы, и группируются по
+категориям в памяти. Результат - простые словари - кэшируется по языку и
+сбрасывается при сохранении и удалении FAQ и FAQCategory (сигналы) и при
+массовой (де)активации в админ-панели. Сброс доходит до других процессов
+только через общий кэш (REDIS_URL); с кэшем в памяти процесса остальные
+воркеры gunicorn увидят изменения не позже чем через FAQ_CACHE_TIMEOUT,
+который в этом случае по умолчанию короткий.
+
+Те же данные отдаются странице как JSON-индекс (id, категория, текст в
+нижнем регистре): выбор категории и поиск по тексту работают в браузере
+без запросов к серверу.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+from .models import FAQ
+
+# Кэш в памяти процесса не сбрасывается в других воркерах - храним недолго
+_PROCESS_LOCAL_CACHE = settings.CACHES['default']['BACKEND'].endswith(('LocMemCache', 'DummyCache'))
+FAQ_CACHE_TIMEOUT = getattr(settings, 'FAQ_CACHE_TIMEOUT', 60 if _PROCESS_LOCAL_CACHE else 24 * 60 * 60)
+
+
+def _cache_key(language):
+    return f'store_faq:{language}'
+
+
+def invalidate_faq():
+    cache.delete_many([_cache_key(language) for language, _name in settings.LANGUAGES])
+
+
+def build_faq(language):
+    """
+    {'categories': [{'id', 'name', 'count'}], 'items': [{'id', 'category', 'question', 'answer'}]}
+    Вопросы - в порядке (order, question_ru), категории - в порядке (order, name_ru).
+    """
+    categories = {}
+    items = []
+    for faq in FAQ.objects.filter(is_active=True).select_related('category'):
+        category = faq.category
+        if category is not None:
+            if category.pk not in categories:
+                categories[category.pk] = {
+                    'id': category.pk,
+                    'name': category.get_name(language),
+                    'count': 0,
+                    'sort': (category.order, category.name_ru),
+                }
+            categories[category.pk]['count'] += 1
+        items.append({
+            'id': faq.pk,
+            'category': faq.category_id,
+            'question': faq.get_question(language),
+            'answer': faq.get_answer(language),
+        })
+    categories = sorted(categories.values(), key=lambda category: category['sort'])
+    for category in categories:
+        del category['sort']
+    return {'categories': categories, 'items': items}
+
+
+def get_faq(language):
+    key = _cache_key(language)
+    data = cache.get(key)
+    metrics.inc('store_cache_requests_total', cache='faq', result='miss' if data is None else 'hit')
+    if data is None:
+        data = build_faq(language)
+        cache.set(key, data, FAQ_CACHE_TIMEOUT)
+    return data
+
+
+def search_index(data):
+    """JSON-индекс для фильтрации на странице: категория и текст вопроса с ответом"""
+    return [
+        {'id': item['id'], 'category': item['category'], 'text': f"{item['question']} {item['answer']}".lower()}
+        for item in data['items']
+    ]
@@ -0,0 +1,287 @@
+"""
+Карта сайта (sitemap) и товарный фид для маркетплейсов (формат YML).
+
+Файлы генерируются командой generate_feeds в FEEDS_ROOT (по умолчанию
+MEDIA_ROOT/feeds) и раздаются как статика, без обращений к БД:
+
+- sitemap.xml - индекс, ссылается на остальные карты;
+- sitemap-pages-<lang>.xml.gz - основные страницы и категории;
+- sitemap-products-<lang>-<shard>.xml.gz - товары, по FEED_SHARD_SIZE id на шард;
+- products.yml.gz - фид товаров в наличии.
+
+Товары разбиты на шарды по диапазонам id. Для каждого шарда одним агрегирующим
+запросом считается подпись (максимальный updated_at и количество товаров),
+и при повторном запуске перестраиваются только шарды с изменившейся подписью.
+Строки читаются через iterator() и сразу пишутся в gzip, так что память
+ограничена размером шарда, а не каталога. Отдельные языковые карты строятся,
+только если включены языковые префиксы URL (I18N_URL_PREFIX).
+"""
+import gzip
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.db.models import Count, F, Max
+from django.urls import reverse
+from django.utils import timezone, translation
+
+from .models import Category, CompanyInfo, Product
+
+FEEDS_ROOT = Path(getattr(settings, 'FEEDS_ROOT', Path(settings.MEDIA_ROOT) / 'feeds'))
+FEEDS_URL = getattr(settings, 'FEEDS_URL', settings.MEDIA_URL + 'feeds/')
+SITE_URL = getattr(settings, 'SITE_URL', 'http://localhost:8000').rstrip('/')
+# Количество id товаров в одном шарде (sitemap допускает до 50 000 адресов на файл)
+FEED_SHARD_SIZE = getattr(settings, 'FEED_SHARD_SIZE', 5000)
+FEED_CURRENCY = 'UZS'
+
+SITEMAP_INDEX = 'sitemap.xml'
+PRODUCT_FEED = 'products.yml.gz'
+MANIFEST = 'manifest.json'
+PARTS_DIR = '.parts'
+
+_SITEMAP_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+    'xmlns:xhtml="http://www.w3.org/1999/xhtml">\n'
+)
+_SITEMAP_FOOTER = '</urlset>\n'
+# Страницы сайта, попадающие в карту вместе с категориями
+_PAGES = ['home', 'product_list_all', 'about', 'contact', 'faq']
+_SLUG = '__slug__'
+
+
+def feed_url(filename):
+    return f'{SITE_URL}/{FEEDS_URL.lstrip("/")}{filename}'
+
+
+def _languages():
+    if getattr(settings, 'I18N_URL_PREFIX', False):
+        return [code for code, _name in settings.LANGUAGES]
+    return [settings.LANGUAGE_CODE]
+
+
+def _url_patterns():
+    """Шаблоны адресов для каждого языка: reverse один раз, дальше - подстановка slug"""
+    patterns = {}
+    for language in _languages():
+        with translation.override(language):
+            patterns[language] = {
+                'product': SITE_URL + reverse('product_detail', args=[_SLUG]),
+                'category': SITE_URL + reverse('product_list', args=[_SLUG]),
+                'pages': [SITE_URL + reverse(name) for name in _PAGES],
+            }
+    return patterns
+
+
+@contextmanager
+def _gzip_writer(path):
+    """Пишет gzip во временный файл и атомарно подменяет им path"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as fh:
+        yield fh
+    os.replace(tmp_path, path)
+
+
+def _url_entry(fh, loc, lastmod=None, alternates=None):
+    fh.write(f'<url><loc>{escape(loc)}</loc>')
+    if lastmod:
+        fh.write(f'<lastmod>{lastmod.date().isoformat()}</lastmod>')
+    for language, href in alternates or ():
+        fh.write(f'<xhtml:link rel="alternate" hreflang="{language}" href={quoteattr(href)}/>')
+    fh.write('</url>\n')
+
+
+def _alternates(patterns, kind, slug):
+    if len(patterns) < 2:
+        return None
+    return [(language, urls[kind].replace(_SLUG, slug)) for language, urls in patterns.items()]
+
+
+def shard_signatures():
+    """{номер шарда: подпись} для всех товаров одним агрегирующим запросом"""
+    rows = (
+        Product.objects.order_by()
+        .annotate(shard=F('id') / FEED_SHARD_SIZE)
+        .values('shard')
+        .annotate(last_updated=Max('updated_at'), products=Count('id'))
+    )
+    return {
+        row['shard']: f'{row["last_updated"].isoformat()}|{row["products"]}'
+        for row in rows
+    }
+
+
+def _shard_products(shard, fields):
+    return (
+        Product.objects.filter(
+            id__gte=shard * FEED_SHARD_SIZE,
+            id__lt=(shard + 1) * FEED_SHARD_SIZE,
+            is_available=True,
+        )
+        .exclude(slug='')
+        .order_by('id')
+        .values_list(*fields)
+        .iterator(chunk_size=2000)
+    )
+
+
+def _product_sitemap_name(language, shard):
+    return f'sitemap-products-{language}-{shard:04d}.xml.gz'
+
+
+def write_product_sitemaps(shard, patterns):
+    """Карты товаров шарда для всех языков; возвращает количество адресов"""
+    rows = list(_shard_products(shard, ['slug', 'updated_at']))
+    for language, urls in patterns.items():
+        path = FEEDS_ROOT / _product_sitemap_name(language, shard)
+        if not rows:
+            path.unlink(missing_ok=True)
+            continue
+        with _gzip_writer(path) as fh:
+            fh.write(_SITEMAP_HEADER)
+            for slug, updated_at in rows:
+                _url_entry(
+                    fh,
+                    urls['product'].replace(_SLUG, slug),
+                    updated_at,
+                    _alternates(patterns, 'product', slug),
+                )
+            fh.write(_SITEMAP_FOOTER)
+    return len(rows)
+
+
+def _offers_part(shard):
+    return FEEDS_ROOT / PARTS_DIR / f'offers-{shard:04d}.xml.gz'
+
+
+def write_offers_part(shard, product_url):
+    """Фрагмент <offer> элементов шарда для фида; возвращает количество товаров"""
+    fields = ['id', 'slug', 'name_ru', 'description_ru', 'price', 'old_price', 'category_id', 'image', 'stock']
+    media_url = f'{SITE_URL}/{settings.MEDIA_URL.lstrip("/")}'
+    count = 0
+    with _gzip_writer(_offers_part(shard)) as fh:
+        for pk, slug, name, description, price, old_price, category_id, image, stock in _shard_products(shard, fields):
+            fh.write(f'<offer id="{pk}" available="true">')
+            fh.write(f'<url>{escape(product_url.replace(_SLUG, slug))}</url>')
+            fh.write(f'<price>{price}</price>')
+            if old_price and old_price > price:
+                fh.write(f'<oldprice>{old_price}</oldprice>')
+            fh.write(f'<currencyId>{FEED_CURRENCY}</currencyId><categoryId>{category_id}</categoryId>')
+            if image:
+                fh.write(f'<picture>{escape(media_url + image)}</picture>')
+            fh.write(f'<name>{escape(name)}</name>')
+            fh.write(f'<description>{escape(description[:3000])}</description>')
+            fh.write(f'<count>{stock}</count></offer>\n')
+            count += 1
+    return count
+
+
+def write_pages_sitemaps(patterns):
+    """Основные страницы и категории (небольшие, перестраиваются каждый раз)"""
+    categories = list(Category.objects.exclude(slug='').order_by('id').values_list('slug', flat=True))
+    for language, urls in patterns.items():
+        with _gzip_writer(FEEDS_ROOT / f'sitemap-pages-{language}.xml.gz') as fh:
+            fh.write(_SITEMAP_HEADER)
+            for loc in urls['pages']:
+                _url_entry(fh, loc)
+            for slug in categories:
+                _url_entry(fh, urls['category'].replace(_SLUG, slug), alternates=_alternates(patterns, 'category', slug))
+            fh.write(_SITEMAP_FOOTER)
+
+
+def write_product_feed(shards):
+    """Собирает products.yml.gz из заголовка, категорий и готовых фрагментов шардов"""
+    company = CompanyInfo.objects.filter(pk=1).first()
+    company_name = company.name_ru if company else 'LuxWood'
+    with _gzip_writer(FEEDS_ROOT / PRODUCT_FEED) as fh:
+        fh.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        fh.write(f'<yml_catalog date="{timezone.now().strftime("%Y-%m-%dT%H:%M:%S%z")}"><shop>\n')
+        fh.write(f'<name>{escape(company_name)}</name><company>{escape(company_name)}</company>')
+        fh.write(f'<url>{escape(SITE_URL)}/</url>\n')
+        fh.write(f'<currencies><currency id="{FEED_CURRENCY}" rate="1"/></currencies>\n<categories>\n')
+        categories = Category.objects.order_by('id').values_list('id', 'parent_id', 'name_ru').iterator(chunk_size=2000)
+        for pk, parent_id, name in categories:
+            parent = f' parentId="{parent_id}"' if parent_id else ''
+            fh.write(f'<category id="{pk}"{parent}>{escape(name)}</category>\n')
+        fh.write('</categories>\n<offers>\n')
+        for shard in sorted(shards):
+            part = _offers_part(shard)
+            if part.exists():
+                with gzip.open(part, 'rt', encoding='utf-8') as part_fh:
+                    shutil.copyfileobj(part_fh, fh)
+        fh.write('</offers>\n</shop></yml_catalog>\n')
+
+
+def write_sitemap_index(shards, languages):
+    now = timezone.now().date().isoformat()
+    names = [f'sitemap-pages-{language}.xml.gz' for language in languages]
+    for shard in sorted(shards):
+        for language in languages:
+            if (FEEDS_ROOT / _product_sitemap_name(language, shard)).exists():
+                names.append(_product_sitemap_name(language, shard))
+
+    tmp_path = FEEDS_ROOT / (SITEMAP_INDEX + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        fh.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        fh.write('<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for name in names:
+            fh.write(f'<sitemap><loc>{escape(feed_url(name))}</loc><lastmod>{now}</lastmod></sitemap>\n')
+        fh.write('</sitemapindex>\n')
+    os.replace(tmp_path, FEEDS_ROOT / SITEMAP_INDEX)
+
+
+def _load_manifest():
+    try:
+        return json.loads((FEEDS_ROOT / MANIFEST).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def generate_feeds(force=False):
+    """
+    Обновляет карту сайта и фид. Возвращает (перестроено шардов, пропущено шардов).
+    Перестраиваются только шарды с изменившейся подписью; force - все шарды.
+    """
+    (FEEDS_ROOT / PARTS_DIR).mkdir(parents=True, exist_ok=True)
+    patterns = _url_patterns()
+    languages = list(patterns)
+    # Фид строится на языке по умолчанию (без языкового префикса)
+    product_url = patterns.get(settings.LANGUAGE_CODE, patterns[languages[0]])['product']
+    config = {'site_url': SITE_URL, 'shard_size': FEED_SHARD_SIZE, 'languages': languages}
+
+    manifest = _load_manifest()
+    if manifest.get('config') != config:
+        force = True
+    previous = {} if force else manifest.get('shards', {})
+    signatures = shard_signatures()
+
+    rebuilt = skipped = 0
+    for shard, signature in sorted(signatures.items()):
+        if previous.get(str(shard)) == signature:
+            skipped += 1
+            continue
+        write_product_sitemaps(shard, patterns)
+        write_offers_part(shard, product_url)
+        rebuilt += 1
+
+    # Шарды, в которых не осталось товаров
+    for shard in {int(key) for key in manifest.get('shards', {})} - set(signatures):
+        for language in languages:
+            (FEEDS_ROOT / _product_sitemap_name(language, shard)).unlink(missing_ok=True)
+        _offers_part(shard).unlink(missing_ok=True)
+
+    write_pages_sitemaps(patterns)
+    write_product_feed(signatures)
+    write_sitemap_index(signatures, languages)
+
+    manifest = {
+        'config': config,
+        'generated_at': timezone.now().isoformat(),
+        'shards': {str(shard): signature for shard, signature in signatures.items()},
+    }
+    (FEEDS_ROOT / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    return rebuilt, skipped
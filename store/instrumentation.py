@@ -0,0 +1,287 @@
+"""
+Замеры производительности запросов.
+
+RequestMetricsMiddleware для каждого (выборочно, INSTRUMENTATION_SAMPLE_RATE)
+запроса замеряет:
+
+- имя представления (URL name), статус и полное время ответа;
+- количество SQL-запросов и их суммарное время (execute_wrapper на всех базах);
+- время отрисовки шаблонов (бэкенд шаблонов InstrumentedDjangoTemplates);
+- размер ответа.
+
+Медленные и повторяющиеся SQL-запросы этих же запросов попадают в журнал
+query_log.py.
+
+Замеры добавляются в заголовок Server-Timing, пишутся в лог store.requests
+и собираются в гистограммы по представлениям. Каждый процесс сайта хранит свои
+гистограммы в памяти и раз в INSTRUMENTATION_FLUSH_SECONDS сохраняет их в
+свой файл в INSTRUMENTATION_DIR, поэтому данные всех воркеров gunicorn
+доступны команде dump_request_metrics, которая их объединяет. Гистограммы
+завершившихся процессов объединяются в DEAD_FILE (process_files.py).
+"""
+import atexit
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import query_log
+from .process_files import ProcessFiles
+
+INSTRUMENTATION_ENABLED = getattr(settings, 'INSTRUMENTATION_ENABLED', True)
+# Доля замеряемых запросов (0..1)
+INSTRUMENTATION_SAMPLE_RATE = getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 1.0)
+# Заголовок Server-Timing раскрывает время работы сервера - по умолчанию только в DEBUG
+INSTRUMENTATION_SERVER_TIMING = getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', settings.DEBUG)
+INSTRUMENTATION_DIR = Path(getattr(settings, 'INSTRUMENTATION_DIR', Path(settings.BASE_DIR) / 'metrics'))
+INSTRUMENTATION_FLUSH_SECONDS = getattr(settings, 'INSTRUMENTATION_FLUSH_SECONDS', 10)
+
+# Верхние границы корзин гистограммы времени ответа, мс
+DURATION_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+FILE_PREFIX = 'requests-'
+# Гистограммы завершившихся процессов
+DEAD_FILE = 'dead-requests.json'
+
+logger = logging.getLogger('store.requests')
+
+
+class RequestMetrics:
+    """Замеры одного запроса"""
+
+    __slots__ = ('sql_count', 'sql_time', 'template_time', 'queries')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.queries = query_log.QueryCollector() if query_log.QUERY_LOG_ENABLED else None
+
+    def record_query(self, execute, sql, params, many, context):
+        """execute_wrapper: время каждого SQL-запроса"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.sql_time += duration
+            self.sql_count += 1
+            if self.queries is not None:
+                self.queries.record(sql, duration)
+
+
+_current = ContextVar('store_request_metrics', default=None)
+
+
+def current_metrics():
+    """Замеры текущего запроса или None, если запрос не замеряется"""
+    return _current.get()
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Бэкенд DjangoTemplates, замеряющий время отрисовки шаблонов.
+    Вложенные {% include %} и {% extends %} отрисовываются внутри основного
+    шаблона, поэтому время не считается дважды.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
+
+
+def _empty_endpoint():
+    return {
+        'count': 0,
+        'duration_sum': 0.0,
+        'duration_max': 0.0,
+        'buckets': [0] * (len(DURATION_BUCKETS) + 1),
+        'sql_count': 0,
+        'sql_time': 0.0,
+        'template_time': 0.0,
+        'response_size': 0,
+        'statuses': {},
+    }
+
+
+def merge_endpoint(target, source):
+    target['count'] += source['count']
+    target['duration_sum'] += source['duration_sum']
+    target['duration_max'] = max(target['duration_max'], source['duration_max'])
+    target['buckets'] = [a + b for a, b in zip(target['buckets'], source['buckets'])]
+    for field in ('sql_count', 'sql_time', 'template_time', 'response_size'):
+        target[field] += source[field]
+    for status, count in source['statuses'].items():
+        target['statuses'][status] = target['statuses'].get(status, 0) + count
+    return target
+
+
+class Histograms:
+    """Гистограммы процесса по представлениям с периодическим сохранением в файл"""
+
+    def __init__(self, directory, flush_seconds):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.endpoints = {}
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        self.files = _histogram_files(directory)
+
+    def record(self, view_name, status, duration, metrics, size):
+        duration_ms = duration * 1000
+        bucket = next(
+            (index for index, bound in enumerate(DURATION_BUCKETS) if duration_ms <= bound),
+            len(DURATION_BUCKETS),
+        )
+        status_class = f'{status // 100}xx'
+        with self.lock:
+            endpoint = self.endpoints.setdefault(view_name, _empty_endpoint())
+            endpoint['count'] += 1
+            endpoint['duration_sum'] += duration_ms
+            endpoint['duration_max'] = max(endpoint['duration_max'], duration_ms)
+            endpoint['buckets'][bucket] += 1
+            endpoint['sql_count'] += metrics.sql_count
+            endpoint['sql_time'] += metrics.sql_time * 1000
+            endpoint['template_time'] += metrics.template_time * 1000
+            endpoint['response_size'] += size
+            endpoint['statuses'][status_class] = endpoint['statuses'].get(status_class, 0) + 1
+            due = time.monotonic() - self.last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Сохраняет накопленное в файл процесса (атомарная замена файла)"""
+        with self.lock:
+            self.last_flush = time.monotonic()
+            if not self.endpoints:
+                return
+            payload = json.dumps({'buckets': DURATION_BUCKETS, 'endpoints': self.endpoints})
+        try:
+            self.files.write(payload)
+        except OSError:
+            # Замеры не должны мешать работе сайта
+            pass
+
+
+def _merge_histograms(total, data):
+    """Сумма гистограмм двух файлов (файлы с другими границами корзин отбрасываются)"""
+    if total is None or tuple(total.get('buckets', ())) != DURATION_BUCKETS:
+        total = {'buckets': DURATION_BUCKETS, 'endpoints': {}}
+    if tuple(data.get('buckets', ())) == DURATION_BUCKETS:
+        for view_name, endpoint in data['endpoints'].items():
+            merge_endpoint(total['endpoints'].setdefault(view_name, _empty_endpoint()), endpoint)
+    return total
+
+
+def _histogram_files(directory):
+    return ProcessFiles(Path(directory), FILE_PREFIX, DEAD_FILE, _merge_histograms)
+
+
+def load_histograms(directory=None):
+    """Гистограммы всех процессов, объединённые по представлениям"""
+    dead, files = _histogram_files(directory or INSTRUMENTATION_DIR).read()
+    total = None
+    for data in ([dead] if dead else []) + list(files.values()):
+        total = _merge_histograms(total, data)
+    return total['endpoints'] if total else {}
+
+
+def reset_histograms(directory=None):
+    _histogram_files(directory or INSTRUMENTATION_DIR).reset()
+
+
+def percentile(endpoint, fraction):
+    """Оценка перцентиля по гистограмме (верхняя граница корзины), мс"""
+    if not endpoint['count']:
+        return 0
+    rank = endpoint['count'] * fraction
+    seen = 0
+    for index, count in enumerate(endpoint['buckets']):
+        seen += count
+        if seen >= rank:
+            if index < len(DURATION_BUCKETS):
+                return min(DURATION_BUCKETS[index], endpoint['duration_max'])
+            return endpoint['duration_max']
+    return endpoint['duration_max']
+
+
+histograms = Histograms(INSTRUMENTATION_DIR, INSTRUMENTATION_FLUSH_SECONDS)
+atexit.register(histograms.flush)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match._func_path
+
+
+class RequestMetricsMiddleware:
+    """
+    Замеры производительности запроса (см. модуль). Должен стоять первым
+    в MIDDLEWARE, чтобы время ответа включало все остальные middleware.
+    """
+
+    def __init__(self, get_response):
+        if not INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= INSTRUMENTATION_SAMPLE_RATE:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+
+        size = 0 if response.streaming else len(response.content)
+        name = view_name(request)
+        histograms.record(name, response.status_code, duration, metrics, size)
+        if metrics.queries is not None:
+            metrics.queries.flush(request, name)
+
+        logger.info(
+            '%s %s %s %.1fms sql=%d/%.1fms templates=%.1fms size=%d',
+            request.method, name, response.status_code, duration * 1000,
+            metrics.sql_count, metrics.sql_time * 1000, metrics.template_time * 1000, size,
+        )
+        if INSTRUMENTATION_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'total;dur={duration * 1000:.1f}, '
+                f'sql;dur={metrics.sql_time * 1000:.1f};desc="{metrics.sql_count} queries", '
+                f'tpl;dur={metrics.template_time * 1000:.1f}'
+            )
+        return response
@@ -0,0 +1,145 @@
+"""
+Учёт остатков товаров.
+
+Каждое изменение остатка - это запись в журнал StockMovement и атомарный
+UPDATE кэша Product.stock (вместе с производным флагом is_available)
+в одной транзакции. Пересечение порогов "мало на складе" и "нет на складе"
+публикуется сигналом stock_level_changed; уведомления подписаны на него
+в signals.py и отправляются только после фиксации транзакции.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Product, StockMovement
+
+# Порог "мало на складе" (используется и на дашборде админ-панели)
+LOW_STOCK_THRESHOLD = getattr(settings, 'LOW_STOCK_THRESHOLD', 10)
+
+EVENT_LOW_STOCK = 'low_stock'
+EVENT_OUT_OF_STOCK = 'out_of_stock'
+EVENT_BACK_IN_STOCK = 'back_in_stock'
+
+# Аргументы: product_id, event, stock_before, stock_after
+stock_level_changed = Signal()
+
+
+class InsufficientStock(Exception):
+    """На складе недостаточно товара для списания"""
+
+    def __init__(self, product_id, requested):
+        self.product_id = product_id
+        self.requested = requested
+        super().__init__(f'Недостаточно товара #{product_id} на складе (запрошено {requested})')
+
+
+def _stock_event(stock_before, stock_after):
+    if stock_after <= 0 < stock_before:
+        return EVENT_OUT_OF_STOCK
+    if stock_after < LOW_STOCK_THRESHOLD <= stock_before and stock_after > 0:
+        return EVENT_LOW_STOCK
+    if stock_before <= 0 < stock_after:
+        return EVENT_BACK_IN_STOCK
+    return None
+
+
+def _emit(product_id, stock_before, stock_after):
+    event = _stock_event(stock_before, stock_after)
+    if event is None:
+        return
+    transaction.on_commit(lambda: stock_level_changed.send(
+        sender=Product,
+        product_id=product_id,
+        event=event,
+        stock_before=stock_before,
+        stock_after=stock_after,
+    ))
+
+
+def apply_movement(product_id, delta, reason, order=None, comment='', allow_negative=False):
+    """
+    Изменяет остаток товара на delta и записывает движение в журнал.
+    При списании без allow_negative проверяет остаток в том же UPDATE
+    (stock >= -delta) и выбрасывает InsufficientStock, если товара не хватает.
+    Возвращает новый остаток.
+    """
+    with transaction.atomic():
+        queryset = Product.objects.filter(pk=product_id)
+        if delta < 0 and not allow_negative:
+            queryset = queryset.filter(stock__gte=-delta)
+        updated = queryset.update(
+            stock=F('stock') + delta,
+            is_available=Case(
+                When(Q(is_active=True) & Q(stock__gt=-delta), then=Value(True)),
+                default=Value(False),
+            ),
+            # queryset.update() не трогает auto_now, а по updated_at перестраиваются фиды
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            raise InsufficientStock(product_id, -delta)
+
+        stock_after = Product.objects.filter(pk=product_id).values_list('stock', flat=True).get()
+        StockMovement.objects.create(
+            product_id=product_id,
+            delta=delta,
+            stock_after=stock_after,
+            reason=reason,
+            order=order,
+            comment=comment,
+        )
+        _emit(product_id, stock_after - delta, stock_after)
+    return stock_after
+
+
+def set_stock(product_id, quantity, reason, comment=''):
+    """Устанавливает абсолютный остаток (корректировка, импорт) через журнал движений"""
+    with transaction.atomic():
+        current = (
+            Product.objects.select_for_update()
+            .filter(pk=product_id)
+            .values_list('stock', flat=True)
+            .get()
+        )
+        if quantity == current:
+            return current
+        return apply_movement(product_id, quantity - current, reason, comment=comment, allow_negative=True)
+
+
+def record_admin_change(product, stock_before, comment=''):
+    """
+    Записывает в журнал изменение остатка, уже сохранённое формой админ-панели.
+    Остаток не меняется повторно - только фиксируется движение и события.
+    """
+    delta = product.stock - stock_before
+    if not delta:
+        return
+    StockMovement.objects.create(
+        product=product,
+        delta=delta,
+        stock_after=product.stock,
+        reason='admin',
+        comment=comment,
+    )
+    _emit(product.pk, stock_before, product.stock)
+
+
+def refresh_availability(product_id):
+    """Пересчитывает is_available по is_active и остатку в БД (после сохранения товара без остатка)"""
+    Product.objects.filter(pk=product_id).update(
+        is_available=Case(
+            When(Q(is_active=True) & Q(stock__gt=0), then=Value(True)),
+            default=Value(False),
+        ),
+    )
+
+
+def stock_summary():
+    """Счётчики для дашборда админ-панели одним агрегирующим запросом"""
+    return Product.objects.aggregate(
+        low_stock=Count('id', filter=Q(stock__gt=0, stock__lt=LOW_STOCK_THRESHOLD)),
+        out_of_stock=Count('id', filter=Q(stock__lte=0)),
+        available=Count('id', filter=Q(is_available=True)),
+    )
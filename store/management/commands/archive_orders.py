@@ -0,0 +1,54 @@
+"""
+Management command для переноса старых заказов в архив
+Использование: python manage.py archive_orders [--days 180] [--batch-size 1000] [--limit N] [--dry-run]
+
+Доставленные и отменённые заказы старше --days (по умолчанию ORDER_ARCHIVE_AFTER_DAYS)
+переносятся в ArchivedOrder/ArchivedOrderItem пачками, каждая в своей транзакции
+(см. store/archive.py). Рекомендуется запускать раз в месяц.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from store import archive
+
+
+class Command(BaseCommand):
+    help = 'Переносит доставленные и отменённые заказы старше заданного возраста в архив'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=archive.ORDER_ARCHIVE_AFTER_DAYS,
+            help=f'Архивировать заказы старше N дней (по умолчанию {archive.ORDER_ARCHIVE_AFTER_DAYS})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=archive.ORDER_ARCHIVE_BATCH_SIZE,
+            help=f'Заказов в одной транзакции (по умолчанию {archive.ORDER_ARCHIVE_BATCH_SIZE})',
+        )
+        parser.add_argument('--limit', type=int, help='Перенести не больше N заказов за запуск')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, сколько заказов будет перенесено')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or (options['limit'] is not None and options['limit'] < 1):
+            raise CommandError('Некорректные параметры архивации')
+        try:
+            queryset = archive.archivable_orders(options['days'])
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        statuses = ', '.join(archive.ORDER_ARCHIVE_STATUSES)
+        if options['dry_run']:
+            self.stdout.write(f'Заказов для архивации (статусы: {statuses}, старше {options["days"]} дней): {queryset.count()}')
+            return
+
+        self.stdout.write(f'Архивация заказов со статусами {statuses} старше {options["days"]} дней...')
+        orders_count, items_count = archive.archive_orders(
+            older_than_days=options['days'],
+            batch_size=options['batch_size'],
+            limit=options['limit'],
+            progress=lambda orders, items: self.stdout.write(f'  перенесено заказов: {orders}, позиций: {items}'),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Готово! В архив перенесено заказов: {orders_count}, позиций: {items_count}.')
+        )
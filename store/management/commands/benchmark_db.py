@@ -0,0 +1,135 @@
+"""
+Management command для сравнения профилей подключения к БД под параллельной нагрузкой
+Использование: python manage.py benchmark_db [--threads 8] [--duration 10] [--write-ratio 0.2]
+
+Запросы идут через тестовый клиент Django в несколько потоков (весь стек
+middleware, открытие/закрытие соединений по CONN_MAX_AGE), поэтому для
+сравнения профилей достаточно запускать команду с разными DATABASE_PROFILE:
+
+    DATABASE_PROFILE=sqlite python manage.py benchmark_db
+    DATABASE_PROFILE=postgres python manage.py benchmark_db
+    DATABASE_PROFILE=postgres_pool python manage.py benchmark_db
+
+Записи - это изменения корзины (добавление и удаление позиции);
+созданные командой корзины удаляются в конце.
+"""
+import random
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from shop.database import database_profile
+from store.models import Cart, Category, Product
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(len(values) * percent / 100))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = 'Измеряет запросы в секунду для текущего профиля подключения к БД (DATABASE_PROFILE)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Количество параллельных клиентов (по умолчанию 8)')
+        parser.add_argument('--duration', type=float, default=10, help='Длительность замера в секундах (по умолчанию 10)')
+        parser.add_argument(
+            '--write-ratio',
+            type=float,
+            default=0.2,
+            help='Доля запросов, изменяющих корзину (по умолчанию 0.2)',
+        )
+
+    def handle(self, *args, **options):
+        threads_count = options['threads']
+        duration = options['duration']
+        write_ratio = options['write_ratio']
+        if threads_count < 1 or duration <= 0 or not 0 <= write_ratio <= 1:
+            raise CommandError('Некорректные параметры замера')
+
+        product_ids = list(Product.objects.filter(is_available=True).exclude(slug='').values_list('id', 'slug')[:200])
+        category_slugs = list(Category.objects.exclude(slug='').values_list('slug', flat=True)[:50])
+        if not product_ids:
+            raise CommandError('Нет товаров в наличии. Сначала выполните: python manage.py create_test_data')
+
+        read_urls = ['/', '/products/'] + [f'/category/{slug}/' for slug in category_slugs]
+        read_urls += [f'/product/{slug}/' for _pk, slug in product_ids]
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+
+        database = connection.settings_dict
+        engine = database['ENGINE']
+        self.stdout.write(
+            f'Профиль: {database_profile(engine)} ({connection.vendor}), '
+            f'CONN_MAX_AGE={database.get("CONN_MAX_AGE", 0)}, '
+            f'потоков: {threads_count}, длительность: {duration:g} с, доля записи: {write_ratio:g}'
+        )
+
+        latencies = []
+        errors = Counter()
+        session_keys = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def worker(seed):
+            rng = random.Random(seed)
+            client = Client(HTTP_HOST=host)
+            local_latencies = []
+            local_errors = Counter()
+            try:
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        if rng.random() < write_ratio:
+                            product_id, _slug = rng.choice(product_ids)
+                            response = client.post(f'/cart/add/{product_id}/')
+                            if response.status_code == 200:
+                                client.post(
+                                    '/cart/batch/',
+                                    {'operations': [{'op': 'remove', 'product_id': product_id}]},
+                                    content_type='application/json',
+                                )
+                        else:
+                            response = client.get(rng.choice(read_urls))
+                        if response.status_code >= 500:
+                            local_errors[f'HTTP {response.status_code}'] += 1
+                    except Exception as e:
+                        local_errors[f'{type(e).__name__}: {str(e)[:60]}'] += 1
+                    local_latencies.append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+                with lock:
+                    latencies.extend(local_latencies)
+                    errors.update(local_errors)
+                    if client.session.session_key:
+                        session_keys.append(client.session.session_key)
+
+        started_at = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started_at
+
+        # Убираем корзины, созданные замером (в режиме CART_STORAGE=db)
+        if session_keys:
+            Cart.objects.filter(session_key__in=session_keys).delete()
+
+        latencies.sort()
+        total = len(latencies)
+        self.stdout.write(
+            f'Запросов: {total}, ошибок: {sum(errors.values())}\n'
+            f'Запросов в секунду: {total / elapsed:.1f}\n'
+            f'Задержка, мс: p50={_percentile(latencies, 50) * 1000:.1f} '
+            f'p95={_percentile(latencies, 95) * 1000:.1f} '
+            f'p99={_percentile(latencies, 99) * 1000:.1f}'
+        )
+        for error, count in errors.most_common(5):
+            self.stdout.write(self.style.WARNING(f'  {count} x {error}'))
+        self.stdout.write(self.style.SUCCESS('Замер завершён.'))
@@ -0,0 +1,39 @@
+"""
+Management command для пересчёта рекомендаций "Похожие товары"
+Использование: python manage.py build_recommendations [--top-k=12] [--max-products-per-attribute=500]
+"""
+from django.core.management.base import BaseCommand
+from store.recommendations import DEFAULT_TOP_K, MAX_PRODUCTS_PER_ATTRIBUTE, build_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает похожие товары по совместным покупкам и общим характеристикам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=DEFAULT_TOP_K,
+            help=f'Количество похожих товаров, сохраняемых для каждого товара (по умолчанию: {DEFAULT_TOP_K})',
+        )
+        parser.add_argument(
+            '--max-products-per-attribute',
+            type=int,
+            default=MAX_PRODUCTS_PER_ATTRIBUTE,
+            help=(
+                'Характеристики, общие для большего числа товаров, не учитываются '
+                f'(по умолчанию: {MAX_PRODUCTS_PER_ATTRIBUTE}, настройка RECOMMENDATIONS_MAX_PRODUCTS_PER_ATTRIBUTE)'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        top_k = options['top_k']
+        self.stdout.write('Расчёт похожих товаров...')
+        products_count = build_recommendations(
+            top_k=top_k, max_products_per_attribute=options['max_products_per_attribute']
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Готово! Рекомендации рассчитаны для {products_count} товаров (до {top_k} на товар).'
+            )
+        )
@@ -1,6 +1,9 @@
 """
 Management command для очистки старых корзин (старше 30 дней)
 Использование: python manage.py cleanup_old_carts [--days=30]
+
+Содержимое непустых корзин перед удалением учитывается в статистике
+брошенных корзин (store/abandoned_carts.py).
 """
 from django.core.management.base import BaseCommand
 from store.models import Cart
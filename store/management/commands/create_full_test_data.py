@@ -1,18 +1,48 @@
-from django.core.management.base import BaseCommand
-from store.models import (
-    Category, Product, ProductAttribute, ProductImage,
-    Banner, Sponsor, FAQCategory, FAQ,
-    CompanyInfo, Advantage, ContactMessage
-)
+"""
+Management command для заполнения магазина тестовыми данными
+Использование: python manage.py create_full_test_data
+               [--scale 100000] [--orders N] [--carts N] [--seed 42]
+               [--batch-size 2000] [--workers 4] [--image-pool 24] [--history-days 365]
+
+Без --scale создаёт фиксированный набор: информацию о компании, баннеры,
+спонсоров, преимущества, FAQ, характеристики и изображения первых товаров.
+С --scale дополнительно генерирует заданное количество товаров (по умолчанию
+заказов - половина от него, корзин - пятая часть) для нагрузочного тестирования,
+см. store/data_generator.py. Одинаковый --seed на пустой базе даёт одинаковые данные.
+"""
+import time
 from decimal import Decimal
-import os
+
 from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 from PIL import Image
 import io
 
+from store import data_generator
+from store.models import (
+    Category, Product, ProductAttribute, ProductImage,
+    Banner, Sponsor, FAQCategory, FAQ,
+    CompanyInfo, Advantage, ContactMessage,
+    Cart, CartItem, Order, OrderItem, PriceRegion,
+)
+from store.pricing import default_region, rebuild_region_prices
+from store.sales_rank import rebuild_sales_counters
+from store.sales_rollups import rebuild_rollups
+
 
 class Command(BaseCommand):
-    help = 'Создает полные тестовые данные для всех моделей магазина'
+    help = 'Создает полные тестовые данные для всех моделей магазина (с --scale - большой набор для нагрузочных тестов)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=0, help='Сгенерировать столько товаров (до миллионов)')
+        parser.add_argument('--orders', type=int, help='Количество заказов (по умолчанию scale / 2)')
+        parser.add_argument('--carts', type=int, help='Количество корзин (по умолчанию scale / 5)')
+        parser.add_argument('--seed', type=int, default=42, help='Зерно генератора (по умолчанию 42)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Размер пачки bulk_create (по умолчанию 2000)')
+        parser.add_argument('--workers', type=int, default=1, help='Количество процессов генерации (по умолчанию 1)')
+        parser.add_argument('--image-pool', type=int, default=24, help='Количество изображений-заглушек (по умолчанию 24)')
+        parser.add_argument('--history-days', type=int, default=365, help='Глубина истории заказов в днях (по умолчанию 365)')
 
     def create_image_file(self, width=800, height=600, color=(200, 200, 200), text=''):
         """Создает тестовое изображение"""
@@ -371,6 +401,10 @@ class Command(BaseCommand):
             ContactMessage.objects.create(**msg_data)
             self.stdout.write(f'✓ Создано сообщение от: {msg_data["name"]}')
 
+        # 10. Большой набор данных для нагрузочных тестов
+        if options['scale']:
+            self.create_scaled_data(options)
+
         self.stdout.write('')
         self.stdout.write(self.style.SUCCESS('=' * 60))
         self.stdout.write(self.style.SUCCESS('✓ Все тестовые данные успешно созданы!'))
@@ -386,9 +420,81 @@ class Command(BaseCommand):
         self.stdout.write(f'  - Характеристики товаров: {ProductAttribute.objects.count()}')
         self.stdout.write(f'  - Дополнительные изображения: {ProductImage.objects.count()}')
         self.stdout.write(f'  - Сообщения: {ContactMessage.objects.count()}')
+        if options['scale']:
+            self.stdout.write(f'  - Товары: {Product.objects.count()}')
+            self.stdout.write(f'  - Заказы: {Order.objects.count()}')
+            self.stdout.write(f'  - Корзины: {Cart.objects.count()}')
         self.stdout.write('')
         self.stdout.write('Теперь вы можете:')
         self.stdout.write('  1. Зайти в админ-панель и проверить созданные данные')
         self.stdout.write('  2. Добавить реальные изображения вместо тестовых')
         self.stdout.write('  3. Отредактировать информацию о компании')
 
+    def create_scaled_data(self, options):
+        """Генерация --scale товаров с заказами и корзинами (см. store/data_generator.py)"""
+        products_count = options['scale']
+        orders_count = products_count // 2 if options['orders'] is None else options['orders']
+        carts_count = products_count // 5 if options['carts'] is None else options['carts']
+        workers = options['workers']
+        if min(products_count, orders_count, carts_count, options['batch_size'] - 1, workers - 1) < 0:
+            raise CommandError('Некорректные параметры генерации')
+        if workers > 1 and connection.vendor == 'sqlite':
+            # SQLite допускает одного писателя: процессы только ждали бы блокировку друг друга
+            self.stdout.write(self.style.WARNING('SQLite: генерация в одном процессе, --workers игнорируется'))
+            workers = 1
+
+        seed = options['seed']
+        self.stdout.write(f'Генерация данных: товаров {products_count}, заказов {orders_count}, корзин {carts_count} (seed {seed})...')
+        images = data_generator.build_image_pool(options['image_pool'], seed)
+        leaf_count = max(8, min(2000, int(products_count ** 0.5)))
+        category_ids, category_weights, base_prices = data_generator.create_categories(seed, leaf_count)
+        self.stdout.write(f'✓ Категории: {leaf_count} в {len(data_generator.CATEGORY_ROOTS)} разделах, изображений в пуле: {len(images)}')
+
+        plan = {
+            'seed': seed,
+            'now': data_generator.generation_start(),
+            'batch_size': options['batch_size'],
+            'history_days': options['history_days'],
+            'currency': default_region().currency,
+        }
+        chunk_size = max(options['batch_size'], 10000)
+
+        first_product = data_generator.next_id(Product)
+        self._generate('products', products_count, dict(
+            plan, start=first_product, images=images,
+            category_ids=category_ids, category_weights=category_weights, base_prices=base_prices,
+        ), workers, chunk_size)
+
+        prices = list(
+            Product.objects.filter(pk__gte=first_product).order_by('pk').values_list('price', flat=True)
+        )
+        if prices:
+            sales_plan = dict(plan, first_product=first_product, prices=prices)
+            customers = max(1, orders_count // 10)
+            self._generate('orders', orders_count, dict(
+                sales_plan, start=data_generator.next_id(Order), customers=list(range(customers)),
+            ), workers, chunk_size)
+            self._generate('carts', carts_count, dict(
+                sales_plan, start=data_generator.next_id(Cart),
+            ), workers, chunk_size)
+
+        data_generator.reset_sequences(Category, Product, ProductImage, ProductAttribute, Order, OrderItem, Cart, CartItem)
+
+        # bulk_create не вызывает сигналы: производные данные пересчитываются целиком
+        self.stdout.write('Пересчет продаж, сводок продаж и региональных цен...')
+        rebuild_sales_counters()
+        rebuild_rollups()
+        for region in PriceRegion.objects.filter(is_default=False):
+            rebuild_region_prices(region)
+        self.stdout.write(self.style.SUCCESS('✓ Большой набор данных создан'))
+        self.stdout.write('  Рекомендации пересчитываются отдельно: python manage.py build_recommendations')
+
+    def _generate(self, kind, total, plan, workers, chunk_size):
+        started = time.monotonic()
+
+        def progress(done, total):
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'  {kind}: {done}/{total} ({done / elapsed if elapsed else 0:.0f} в секунду)')
+
+        data_generator.generate(kind, total, plan, workers=workers, chunk_size=chunk_size, progress=progress)
+        self.stdout.write(f'✓ {kind}: {total} за {time.monotonic() - started:.1f} с')
@@ -125,6 +125,9 @@ class Command(BaseCommand):
                 stock=prod_data['stock'],
                 rating=Decimal(str(prod_data['rating'])),
                 reviews_count=prod_data['reviews'],
+                rating_total=round(Decimal(str(prod_data['rating'])) * prod_data['reviews']),
+                seeded_reviews_count=prod_data['reviews'],
+                seeded_rating_total=round(Decimal(str(prod_data['rating'])) * prod_data['reviews']),
                 featured=prod_data.get('featured', False)
             )
             
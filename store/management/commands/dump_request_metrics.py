@@ -0,0 +1,71 @@
+"""
+Management command для вывода замеров производительности по представлениям
+Использование: python manage.py dump_request_metrics [--sort p95] [--json] [--reset]
+
+Объединяет гистограммы всех процессов сайта из INSTRUMENTATION_DIR
+(см. store/instrumentation.py). Перцентили оцениваются по границам корзин
+гистограммы. После --reset работающие процессы запишут свои накопленные
+данные заново при следующем сохранении - для чистого замера перезапустите сайт.
+"""
+import json
+
+from django.core.management.base import BaseCommand
+from store.instrumentation import DURATION_BUCKETS, load_histograms, percentile, reset_histograms
+
+SORT_FIELDS = ('count', 'mean', 'p95', 'p99', 'max', 'sql')
+
+
+class Command(BaseCommand):
+    help = 'Выводит время ответа, SQL-запросы, время шаблонов и размер ответа по представлениям'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=SORT_FIELDS, default='p95', help='Поле сортировки (по умолчанию p95)')
+        parser.add_argument('--json', action='store_true', help='Вывести гистограммы в JSON')
+        parser.add_argument('--reset', action='store_true', help='Удалить накопленные файлы после вывода')
+
+    def handle(self, *args, **options):
+        endpoints = load_histograms()
+        if options['json']:
+            self.stdout.write(json.dumps({'buckets': DURATION_BUCKETS, 'endpoints': endpoints}, indent=2))
+        elif not endpoints:
+            self.stdout.write('Замеров пока нет.')
+        else:
+            self._print_table(endpoints, options['sort'])
+
+        if options['reset']:
+            reset_histograms()
+        if not options['json']:
+            self.stdout.write(self.style.SUCCESS(f'Готово! Представлений: {len(endpoints)}.'))
+
+    def _print_table(self, endpoints, sort):
+        rows = []
+        for name, endpoint in endpoints.items():
+            count = endpoint['count'] or 1
+            rows.append({
+                'name': name,
+                'count': endpoint['count'],
+                'mean': endpoint['duration_sum'] / count,
+                'p50': percentile(endpoint, 0.5),
+                'p95': percentile(endpoint, 0.95),
+                'p99': percentile(endpoint, 0.99),
+                'max': endpoint['duration_max'],
+                'sql': endpoint['sql_count'] / count,
+                'sql_ms': endpoint['sql_time'] / count,
+                'tpl_ms': endpoint['template_time'] / count,
+                'size': endpoint['response_size'] / count / 1024,
+                'statuses': ' '.join(f'{status}:{n}' for status, n in sorted(endpoint['statuses'].items())),
+            })
+        rows.sort(key=lambda row: row[sort], reverse=True)
+
+        header = (
+            f'{"Представление":<32} {"Запросов":>8} {"Сред.мс":>8} {"p50":>7} {"p95":>7} {"p99":>7} '
+            f'{"Макс.":>8} {"SQL":>6} {"SQL мс":>8} {"Шабл.мс":>8} {"КБ":>7}  Статусы'
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in rows:
+            self.stdout.write(
+                f'{row["name"][:32]:<32} {row["count"]:>8} {row["mean"]:>8.1f} {row["p50"]:>7.0f} '
+                f'{row["p95"]:>7.0f} {row["p99"]:>7.0f} {row["max"]:>8.1f} {row["sql"]:>6.1f} '
+                f'{row["sql_ms"]:>8.1f} {row["tpl_ms"]:>8.1f} {row["size"]:>7.1f}  {row["statuses"]}'
+            )
@@ -0,0 +1,28 @@
+"""
+Management command для генерации карты сайта и товарного фида
+Использование: python manage.py generate_feeds [--force]
+
+Перестраивает только шарды товаров, изменившиеся с прошлого запуска
+(по Product.updated_at); --force перестраивает всё.
+"""
+from django.core.management.base import BaseCommand
+from store.feeds import FEEDS_ROOT, PRODUCT_FEED, SITEMAP_INDEX, feed_url, generate_feeds
+
+
+class Command(BaseCommand):
+    help = 'Генерирует sitemap и YML-фид товаров (gzip) в каталог FEEDS_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Перестроить все шарды, даже если товары не менялись',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Генерация фидов в {FEEDS_ROOT}...')
+        rebuilt, skipped = generate_feeds(force=options['force'])
+        self.stdout.write(f'Шардов перестроено: {rebuilt}, без изменений: {skipped}')
+        self.stdout.write(f'Карта сайта: {feed_url(SITEMAP_INDEX)}')
+        self.stdout.write(f'Фид товаров: {feed_url(PRODUCT_FEED)}')
+        self.stdout.write(self.style.SUCCESS('Готово!'))
@@ -0,0 +1,58 @@
+"""
+Management command для импорта остатков из CSV
+Использование: python manage.py import_stock stock.csv [--set]
+
+Формат CSV (с заголовком): product,quantity
+где product - id или slug товара. По умолчанию quantity добавляется к остатку,
+с --set остаток устанавливается равным quantity.
+"""
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from store.inventory import apply_movement, set_stock
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Импортирует остатки товаров из CSV с записью в журнал движений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к CSV файлу (колонки: product, quantity)')
+        parser.add_argument(
+            '--set',
+            action='store_true',
+            help='Устанавливать остаток равным quantity вместо добавления',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            csv_file = open(options['path'], newline='', encoding='utf-8-sig')
+        except OSError as e:
+            raise CommandError(f'Не удалось открыть файл: {e}')
+
+        imported, skipped = 0, 0
+        with csv_file:
+            for line_number, row in enumerate(csv.DictReader(csv_file), start=2):
+                key = (row.get('product') or '').strip()
+                try:
+                    quantity = int(row.get('quantity') or '')
+                except ValueError:
+                    self.stdout.write(self.style.WARNING(f'Строка {line_number}: некорректное количество, пропущено'))
+                    skipped += 1
+                    continue
+
+                lookup = {'pk': int(key)} if key.isdigit() else {'slug': key}
+                product_id = Product.objects.filter(**lookup).values_list('pk', flat=True).first()
+                if product_id is None:
+                    self.stdout.write(self.style.WARNING(f'Строка {line_number}: товар "{key}" не найден, пропущено'))
+                    skipped += 1
+                    continue
+
+                comment = f'{options["path"]}:{line_number}'
+                if options['set']:
+                    set_stock(product_id, quantity, 'import', comment=comment)
+                else:
+                    apply_movement(product_id, quantity, 'import', comment=comment, allow_negative=True)
+                imported += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Импортировано строк: {imported}, пропущено: {skipped}.'))
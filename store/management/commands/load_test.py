@@ -0,0 +1,371 @@
+"""
+Management command для нагрузочного тестирования магазина
+Использование: python manage.py load_test [--url http://127.0.0.1:8000] [--users 10] [--duration 30]
+               [--mix browse=40,search=10,detail=25,cart=20,checkout=5] [--seed 1]
+               [--start-server runserver|gunicorn] [--json results.json] [--baseline old.json]
+
+Виртуальные покупатели ходят по настоящему HTTP-серверу, каждый со своими
+cookie (сессия, CSRF, корзина), и выполняют сценарии в заданной пропорции:
+
+- browse: главная и каталог (категории, фильтр по цене, сортировка);
+- search: автодополнение и поиск по каталогу;
+- detail: карточка товара;
+- cart: добавление в корзину, просмотр, пакетное изменение, изменение и удаление позиции;
+- checkout: добавление в корзину и оформление заказа.
+
+Товары и категории для сценариев берутся из той же БД, что и у сервера, а выбор
+действий определяется --seed, поэтому замеры на одном и том же наборе данных
+(например, create_full_test_data --scale ... --seed ...) можно сравнивать: --json
+сохраняет результат, --baseline показывает разницу с прошлым замером.
+Оформление заказа списывает остатки - перед сравнительным замером заново
+заполните базу.
+
+Ограничение частоты (ratelimit.py) рассчитано на посетителей, а не на нагрузочный
+тест с одного IP: ответы 429 показываются отдельно. Сервер, запущенный через
+--start-server, работает с RATE_LIMIT_ENABLED=False.
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode, urlsplit
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from store.models import Category, Product
+
+DEFAULT_MIX = 'browse=40,search=10,detail=25,cart=20,checkout=5'
+SEARCH_TERMS = ['стол', 'шкаф', 'кресло', 'дуб', 'chair', 'table', 'stol', 'полка', 'ла', 'ур']
+SORTS = ['newest', 'price_low', 'price_high', 'rating']
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(len(values) * percent / 100))
+    return values[index]
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    """Редиректы не выполняются: замеряется сам ответ страницы"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class _LocalCookiePolicy(DefaultCookiePolicy):
+    """Secure-cookie (CSRF_COOKIE_SECURE, SESSION_COOKIE_SECURE) отправляются и по http"""
+
+    def return_ok_secure(self, cookie, request):
+        return True
+
+
+class VirtualUser:
+    """Покупатель со своими cookie; все ответы записываются в общие результаты"""
+
+    def __init__(self, base_url, rng, catalog, results, lock):
+        self.base_url = base_url.rstrip('/')
+        self.rng = rng
+        self.catalog = catalog
+        self.results = results
+        self.lock = lock
+        self.cookies = CookieJar(policy=_LocalCookiePolicy())
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def _csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == settings.CSRF_COOKIE_NAME), '')
+
+    def request(self, name, path, data=None, json_body=None):
+        headers = {'User-Agent': 'luxwood-load-test'}
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            body = urlencode(data).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if body is not None:
+            headers['X-CSRFToken'] = self._csrf_token()
+            headers['X-Requested-With'] = 'XMLHttpRequest'
+
+        started = time.perf_counter()
+        payload = b''
+        try:
+            with self.opener.open(Request(self.base_url + path, data=body, headers=headers), timeout=30) as response:
+                status = response.status
+                payload = response.read()
+        except HTTPError as error:
+            status = error.code
+            error.read()
+        except (URLError, OSError):
+            status = 0
+        latency = time.perf_counter() - started
+
+        with self.lock:
+            self.results[name].append((latency, status))
+        if status == 200 and json_body is not None:
+            try:
+                return json.loads(payload)
+            except ValueError:
+                return None
+        return None
+
+    # Сценарии
+
+    def browse(self):
+        self.request('home', '/')
+        params = {'sort': self.rng.choice(SORTS)}
+        if self.rng.random() < 0.3:
+            params['price_min'] = self.rng.choice([0, 1000, 5000])
+            params['price_max'] = params['price_min'] + self.rng.choice([5000, 50000, 500000])
+        slug = self.rng.choice(self.catalog['categories']) if self.catalog['categories'] else None
+        if slug and self.rng.random() < 0.7:
+            self.request('product_list', f'/category/{slug}/?{urlencode(params)}')
+        else:
+            self.request('product_list_all', f'/products/?{urlencode(params)}')
+
+    def search(self):
+        term = self.rng.choice(SEARCH_TERMS)
+        for length in range(2, len(term) + 1):
+            self.request('search_autocomplete', f'/search/autocomplete/?{urlencode({"q": term[:length]})}')
+        self.request('search', f'/products/?{urlencode({"q": term})}')
+
+    def detail(self):
+        _product_id, slug = self.rng.choice(self.catalog['products'])
+        self.request('product_detail', f'/product/{slug}/')
+
+    def cart(self):
+        product_id, slug = self.rng.choice(self.catalog['products'])
+        self.request('product_detail', f'/product/{slug}/')
+        self.request('add_to_cart', f'/cart/add/{product_id}/', data={'quantity': 1})
+        self.request('cart', '/cart/')
+        data = self.request('cart_batch', '/cart/batch/', json_body={
+            'operations': [{'op': 'set', 'product_id': product_id, 'quantity': 2}],
+        })
+        item_id = next(
+            (item['item_id'] for item in (data or {}).get('items', []) if item['product_id'] == product_id),
+            None,
+        )
+        if item_id is None:
+            return
+        self.request('update_cart_item', f'/cart/update/{item_id}/', data={'quantity': 1})
+        if self.rng.random() < 0.5:
+            self.request('remove_from_cart', f'/cart/remove/{item_id}/', data={})
+
+    def checkout(self):
+        product_id, slug = self.rng.choice(self.catalog['products'])
+        # Страница товара выдаёт CSRF-cookie, без неё POST получил бы 403
+        self.request('product_detail', f'/product/{slug}/')
+        self.request('add_to_cart', f'/cart/add/{product_id}/', data={'quantity': 1})
+        self.request('checkout', '/checkout/')
+        self.request('checkout_submit', '/checkout/', data={
+            'first_name': 'Load',
+            'last_name': 'Test',
+            'email': 'loadtest@example.com',
+            'phone': '+998900000000',
+            'address': 'Load test',
+            'city': 'Tashkent',
+            'postal_code': '100000',
+            'comment': 'load_test',
+        })
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест магазина: смесь сценариев покупателей, RPS, p50/p95/p99 и ошибки по страницам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Адрес сервера (по умолчанию http://127.0.0.1:8000)')
+        parser.add_argument('--users', type=int, default=10, help='Параллельных покупателей (по умолчанию 10)')
+        parser.add_argument('--duration', type=float, default=30, help='Длительность в секундах (по умолчанию 30)')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Веса сценариев (по умолчанию {DEFAULT_MIX})')
+        parser.add_argument('--seed', type=int, default=1, help='Зерно случайного выбора действий (по умолчанию 1)')
+        parser.add_argument('--think-time', type=float, default=0, help='Пауза между сценариями в секундах')
+        parser.add_argument(
+            '--start-server',
+            choices=['runserver', 'gunicorn'],
+            help='Запустить сервер на время теста (адрес и порт из --url)',
+        )
+        parser.add_argument('--workers', type=int, default=4, help='Воркеров gunicorn для --start-server gunicorn')
+        parser.add_argument('--json', dest='json_path', help='Сохранить результат в JSON-файл')
+        parser.add_argument('--baseline', help='JSON-файл прошлого замера для сравнения')
+
+    def handle(self, *args, **options):
+        mix = self._parse_mix(options['mix'])
+        if options['users'] < 1 or options['duration'] <= 0:
+            raise CommandError('Некорректные параметры теста')
+
+        catalog = {
+            'products': list(Product.objects.filter(is_available=True).exclude(slug='').order_by('id').values_list('id', 'slug')[:1000]),
+            'categories': list(Category.objects.exclude(slug='').order_by('id').values_list('slug', flat=True)),
+        }
+        if not catalog['products']:
+            raise CommandError('Нет товаров в наличии. Сначала выполните: python manage.py create_test_data')
+
+        server = self._start_server(options) if options['start_server'] else None
+        try:
+            self._wait_for_server(options['url'], timeout=30 if server else 5)
+            results, elapsed = self._run(options, mix, catalog)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+
+        report = self._report(results, elapsed)
+        self._print_report(report, options)
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результат сохранён в {options["json_path"]}')
+        self.stdout.write(self.style.SUCCESS('Готово!'))
+
+    def _parse_mix(self, value):
+        mix = {}
+        for part in value.split(','):
+            name, _sep, weight = part.partition('=')
+            name = name.strip()
+            if not hasattr(VirtualUser, name) or name == 'request':
+                raise CommandError(f'Неизвестный сценарий: {name}')
+            try:
+                mix[name] = float(weight)
+            except ValueError:
+                raise CommandError(f'Некорректный вес сценария {name}: {weight}')
+        if not any(mix.values()):
+            raise CommandError('Все веса сценариев равны нулю')
+        return mix
+
+    def _start_server(self, options):
+        address = urlsplit(options['url'])
+        bind = f'{address.hostname}:{address.port or 80}'
+        if options['start_server'] == 'gunicorn':
+            command = ['gunicorn', 'shop.wsgi', '--workers', str(options['workers']), '--bind', bind]
+        else:
+            command = [sys.executable, 'manage.py', 'runserver', bind, '--noreload']
+        env = dict(os.environ, RATE_LIMIT_ENABLED='False')
+        self.stdout.write(f'Запуск сервера: {" ".join(command)}')
+        try:
+            return subprocess.Popen(
+                command, cwd=settings.BASE_DIR, env=env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        except FileNotFoundError:
+            raise CommandError(f'Не найдено: {command[0]}')
+
+    def _wait_for_server(self, url, timeout):
+        deadline = time.monotonic() + timeout
+        opener = build_opener(_NoRedirect)
+        while True:
+            try:
+                with opener.open(url.rstrip('/') + '/robots.txt', timeout=5):
+                    return
+            except HTTPError:
+                return
+            except (URLError, OSError):
+                if time.monotonic() > deadline:
+                    raise CommandError(f'Сервер {url} не отвечает')
+                time.sleep(0.5)
+
+    def _run(self, options, mix, catalog):
+        results = defaultdict(list)
+        lock = threading.Lock()
+        names, weights = list(mix), list(mix.values())
+        deadline = time.perf_counter() + options['duration']
+        self.stdout.write(
+            f'Сервер: {options["url"]}, покупателей: {options["users"]}, '
+            f'длительность: {options["duration"]:g} с, сценарии: {options["mix"]}'
+        )
+
+        def worker(index):
+            rng = random.Random(options['seed'] * 1000 + index)
+            user = VirtualUser(options['url'], rng, catalog, results, lock)
+            while time.perf_counter() < deadline:
+                getattr(user, rng.choices(names, weights)[0])()
+                if options['think_time']:
+                    time.sleep(rng.uniform(0, options['think_time'] * 2))
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(options['users'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, time.perf_counter() - started
+
+    def _report(self, results, elapsed):
+        endpoints = {}
+        for name, samples in sorted(results.items()):
+            latencies = sorted(latency for latency, _status in samples)
+            errors = sum(1 for _latency, status in samples if status == 0 or (status >= 400 and status != 429))
+            statuses = defaultdict(int)
+            for _latency, status in samples:
+                statuses[str(status or 'error')] += 1
+            endpoints[name] = {
+                'requests': len(samples),
+                'rps': len(samples) / elapsed,
+                'p50_ms': _percentile(latencies, 50) * 1000,
+                'p95_ms': _percentile(latencies, 95) * 1000,
+                'p99_ms': _percentile(latencies, 99) * 1000,
+                'errors': errors,
+                'error_rate': errors / len(samples),
+                'rate_limited': sum(1 for _latency, status in samples if status == 429),
+                'statuses': dict(sorted(statuses.items())),
+            }
+        all_latencies = sorted(latency for samples in results.values() for latency, _status in samples)
+        total = len(all_latencies)
+        errors = sum(endpoint['errors'] for endpoint in endpoints.values())
+        return {
+            'elapsed': elapsed,
+            'total': {
+                'requests': total,
+                'rps': total / elapsed,
+                'p50_ms': _percentile(all_latencies, 50) * 1000,
+                'p95_ms': _percentile(all_latencies, 95) * 1000,
+                'p99_ms': _percentile(all_latencies, 99) * 1000,
+                'errors': errors,
+                'error_rate': errors / total if total else 0,
+                'rate_limited': sum(endpoint['rate_limited'] for endpoint in endpoints.values()),
+            },
+            'endpoints': endpoints,
+        }
+
+    def _print_report(self, report, options):
+        baseline = {}
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as baseline_file:
+                    previous = json.load(baseline_file)
+                baseline = dict(previous['endpoints'], ВСЕГО=previous['total'])
+            except (OSError, ValueError, KeyError):
+                raise CommandError(f'Не удалось прочитать {options["baseline"]}')
+
+        header = f'{"Страница":<22} {"Запросов":>8} {"RPS":>8} {"p50 мс":>8} {"p95 мс":>8} {"p99 мс":>8} {"Ошибки":>8} {"429":>6}'
+        if baseline:
+            header += f' {"Δ RPS":>8} {"Δ p95":>8}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        rows = list(report['endpoints'].items()) + [('ВСЕГО', report['total'])]
+        for name, row in rows:
+            line = (
+                f'{name[:22]:<22} {row["requests"]:>8} {row["rps"]:>8.1f} {row["p50_ms"]:>8.1f} '
+                f'{row["p95_ms"]:>8.1f} {row["p99_ms"]:>8.1f} {row["error_rate"]:>7.1%} {row["rate_limited"]:>6}'
+            )
+            previous = baseline.get(name)
+            if previous:
+                line += f' {row["rps"] / previous["rps"] - 1 if previous["rps"] else 0:>+8.0%}'
+                line += f' {row["p95_ms"] / previous["p95_ms"] - 1 if previous["p95_ms"] else 0:>+8.0%}'
+            self.stdout.write(self.style.ERROR(line) if row['error_rate'] > 0.01 else line)
+
+        failed = {
+            name: ', '.join(f'{status}: {count}' for status, count in row['statuses'].items() if status != '200')
+            for name, row in report['endpoints'].items() if row['errors']
+        }
+        if failed:
+            self.stdout.write('\nКоды ответов с ошибками:')
+            for name, statuses in failed.items():
+                self.stdout.write(f'  {name}: {statuses}')
@@ -0,0 +1,28 @@
+"""
+Management command для просмотра счётчиков ограничения частоты запросов
+Использование: python manage.py rate_limit_stats [--reset]
+
+Счётчики хранятся в общем кэше (RATE_LIMIT_CACHE), поэтому при Redis
+команда показывает данные всех процессов сайта.
+"""
+from django.core.management.base import BaseCommand
+from store import views  # noqa: F401 - регистрирует ограничения представлений
+from store.ratelimit import registry, reset_stats, stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает, сколько запросов пропущено и отклонено каждым ограничением частоты'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Обнулить счётчики после вывода')
+
+    def handle(self, *args, **options):
+        for name, counters in stats().items():
+            limit = registry[name]
+            self.stdout.write(
+                f'{name} ({limit.rate} за {limit.period} с, запас {limit.burst}): '
+                f'пропущено {counters["allowed"]}, отклонено {counters["blocked"]}'
+            )
+        if options['reset']:
+            reset_stats()
+        self.stdout.write(self.style.SUCCESS('Готово!'))
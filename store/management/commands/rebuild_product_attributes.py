@@ -0,0 +1,20 @@
+"""
+Management command для пересборки характеристик товаров по языкам (Product.attributes_data)
+Использование: python manage.py rebuild_product_attributes
+"""
+from django.core.management.base import BaseCommand
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает переведённые характеристики всех товаров для страницы товара '
+        '(после массовых изменений ProductAttribute в обход сигналов)'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Пересборка характеристик товаров...')
+        products_count = Product.rebuild_attributes_data()
+        self.stdout.write(
+            self.style.SUCCESS(f'Готово! Товаров: {products_count}.')
+        )
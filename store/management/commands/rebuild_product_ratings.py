@@ -0,0 +1,20 @@
+"""
+Management command для пересчёта рейтинга и количества отзывов товаров
+Использование: python manage.py rebuild_product_ratings
+"""
+from django.core.management.base import BaseCommand
+from store.models import ProductReview
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг и количество отзывов всех товаров: начальные оценки '
+        'плюс одобренные отзывы (восстановление согласованности агрегатов)'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Пересчёт рейтингов товаров...')
+        products_count = ProductReview.rebuild_product_ratings()
+        self.stdout.write(
+            self.style.SUCCESS(f'Готово! Пересчитано товаров: {products_count}.')
+        )
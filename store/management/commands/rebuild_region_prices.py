@@ -0,0 +1,33 @@
+"""
+Management command для пересчёта цен регионов по курсу
+Использование: python manage.py rebuild_region_prices [--region KZ]
+
+Цены из прайс-листов (RegionalPrice.is_manual) не меняются. Запускать после
+массового изменения цен (import, update() в обход сигналов) или по cron после
+обновления курсов.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from store.models import PriceRegion
+from store.pricing import rebuild_region_prices
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает предрассчитанные цены товаров в регионах по курсу (кроме цен из прайс-листов)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--region', help='Код региона (по умолчанию - все активные)')
+
+    def handle(self, *args, **options):
+        regions = PriceRegion.objects.filter(is_active=True)
+        if options['region']:
+            regions = regions.filter(code=options['region'])
+            if not regions:
+                raise CommandError(f'Регион {options["region"]} не найден или не активен')
+
+        total = 0
+        for region in regions:
+            count = rebuild_region_prices(region)
+            total += count
+            self.stdout.write(f'{region.code} ({region.currency}): {count}')
+
+        self.stdout.write(self.style.SUCCESS(f'Готово! Пересчитано цен: {total}.'))
@@ -0,0 +1,18 @@
+"""
+Management command для пересчёта счётчиков продаж (блок "Хиты продаж")
+Использование: python manage.py rebuild_sales_rank
+"""
+from django.core.management.base import BaseCommand
+from store.sales_rank import SALES_WINDOWS, rebuild_sales_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает продажи товаров за 7/30/90 дней по истории заказов (без отменённых)'
+
+    def handle(self, *args, **options):
+        windows = '/'.join(str(days) for days in SALES_WINDOWS.values())
+        self.stdout.write(f'Пересчёт продаж за {windows} дней...')
+        products_count = rebuild_sales_counters()
+        self.stdout.write(
+            self.style.SUCCESS(f'Готово! Товаров с продажами: {products_count}.')
+        )
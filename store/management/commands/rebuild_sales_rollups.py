@@ -0,0 +1,46 @@
+"""
+Management command для пересчёта дневных сводок продаж
+Использование: python manage.py rebuild_sales_rollups [--from 2025-01-01] [--to 2025-12-31] [--days 7]
+
+Без параметров пересчитывает всю историю (заполнение сводок после установки).
+Сводки строятся из рабочих и архивных заказов, см. store/sales_rollups.py.
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from store.sales_rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает дневные сводки продаж (по товарам, категориям и городам) за период'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='Начальная дата (ГГГГ-ММ-ДД)')
+        parser.add_argument('--to', dest='date_to', help='Конечная дата включительно (ГГГГ-ММ-ДД)')
+        parser.add_argument('--days', type=int, help='Пересчитать последние N дней (вместо --from/--to)')
+
+    def handle(self, *args, **options):
+        try:
+            date_from = date.fromisoformat(options['date_from']) if options['date_from'] else None
+            date_to = date.fromisoformat(options['date_to']) if options['date_to'] else None
+        except ValueError:
+            raise CommandError('Дата должна быть в формате ГГГГ-ММ-ДД')
+        if options['days'] is not None:
+            if options['days'] < 1:
+                raise CommandError('--days должно быть положительным')
+            date_to = timezone.localdate()
+            date_from = date_to - timedelta(days=options['days'] - 1)
+        if date_from and date_to and date_from > date_to:
+            raise CommandError('Начальная дата позже конечной')
+
+        if date_from or date_to:
+            period = f'период {date_from or "..."} - {date_to or "..."}'
+        else:
+            period = 'всю историю'
+        self.stdout.write(f'Пересчёт сводок продаж за {period}...')
+        counts = rebuild_rollups(date_from, date_to)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово! Строк сводок: по товарам {counts["products"]}, '
+            f'по категориям {counts["categories"]}, по городам {counts["cities"]}.'
+        ))
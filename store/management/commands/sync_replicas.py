@@ -0,0 +1,36 @@
+"""
+Management command для локальной проверки реплик на SQLite
+Использование: python manage.py sync_replicas
+
+Копирует основную базу SQLite во все файлы из DATABASE_REPLICAS через
+backup API SQLite (консистентный снимок без остановки сайта). Реплики
+PostgreSQL наполняются штатной репликацией, для них команда не нужна.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from store.db_router import replica_aliases
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в файлы реплик (DATABASE_REPLICAS) для локальной проверки'
+
+    def handle(self, *args, **options):
+        aliases = replica_aliases()
+        if not aliases:
+            raise CommandError('Реплики не настроены: задайте DATABASE_REPLICAS в .env')
+
+        source = connections['default']
+        if source.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite; реплики PostgreSQL наполняет репликация')
+
+        source.ensure_connection()
+        for alias in aliases:
+            target = connections[alias]
+            if target.vendor != 'sqlite':
+                raise CommandError(f'{alias}: ожидается SQLite')
+            target.ensure_connection()
+            source.connection.backup(target.connection)
+            target.close()
+            self.stdout.write(f'{alias}: {target.settings_dict["NAME"]}')
+
+        self.stdout.write(self.style.SUCCESS(f'Готово! Обновлено реплик: {len(aliases)}.'))
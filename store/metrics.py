@@ -0,0 +1,251 @@
+"""
+Метрики магазина в текстовом формате Prometheus (эндпоинт /metrics).
+
+Внешние сервисы и библиотеки не нужны. Счётчики (inc) и показатели (gauge_add)
+каждый процесс держит в памяти и периодически сохраняет в свой файл в общем
+каталоге INSTRUMENTATION_DIR - рядом с гистограммами запросов из
+instrumentation.py. Эндпоинт суммирует файлы всех воркеров gunicorn, поэтому
+какой бы воркер ни обработал запрос Prometheus, ответ один и тот же.
+Показатели (например, очередь уведомлений) берутся только у живых процессов.
+
+Счётчики завершившихся процессов объединяются в DEAD_FILE (process_files.py).
+
+Экспортируются:
+
+- store_http_request_duration_seconds - гистограмма времени ответа по URL name;
+- store_http_responses_total, store_db_queries_total, store_db_query_seconds_total,
+  store_template_render_seconds_total, store_http_response_bytes_total;
+- store_cache_requests_total и store_cache_hit_ratio по кэшам;
+- store_cart_operations_total, store_cart_errors_total, store_checkout_total,
+  store_orders_total, store_order_value_total;
+- store_telegram_notifications_total и store_telegram_queue_depth;
+- store_rate_limit_requests_total (счётчики ratelimit.py).
+
+Доступ: заголовок "Authorization: Bearer <METRICS_TOKEN>" или IP из
+METRICS_ALLOWED_IPS. Если не задано ни то, ни другое, эндпоинт отвечает 404.
+"""
+import atexit
+import hmac
+import json
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from . import instrumentation
+from .process_files import ProcessFiles, alive
+from .ratelimit import client_ip, stats as rate_limit_stats
+
+METRICS_TOKEN = getattr(settings, 'METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = getattr(settings, 'METRICS_ALLOWED_IPS', [])
+METRICS_DIR = instrumentation.INSTRUMENTATION_DIR
+
+FILE_PREFIX = 'counters-'
+# Счётчики завершившихся процессов
+DEAD_FILE = 'dead-counters.json'
+
+# Описания метрик для # HELP
+HELP = {
+    'store_cache_requests_total': 'Cache lookups by cache and result (hit/miss)',
+    'store_cart_operations_total': 'Applied cart operations by type',
+    'store_cart_errors_total': 'Rejected cart operations by HTTP status',
+    'store_checkout_total': 'Checkout attempts by result',
+    'store_orders_total': 'Created orders',
+    'store_order_value_total': 'Total value of created orders by currency',
+    'store_telegram_notifications_total': 'Telegram notifications by result',
+    'store_telegram_queue_depth': 'Telegram notifications being sent right now',
+}
+
+
+def _add_counters(counters, rows):
+    for name, labels, value in rows:
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0) + value
+
+
+def _merge_counters(total, data):
+    """Сумма счётчиков двух файлов (показатели завершившихся процессов не нужны)"""
+    counters = {}
+    _add_counters(counters, (total or {}).get('counters', []))
+    _add_counters(counters, data.get('counters', []))
+    return {'counters': [[name, dict(labels), value] for (name, labels), value in counters.items()]}
+
+
+def _counter_files(directory):
+    return ProcessFiles(Path(directory), FILE_PREFIX, DEAD_FILE, _merge_counters)
+
+
+class Registry:
+    """Счётчики и показатели процесса с периодическим сохранением в файл"""
+
+    def __init__(self, directory, flush_seconds):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        self.files = _counter_files(directory)
+
+    def _add(self, values, name, amount, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            values[key] = values.get(key, 0) + amount
+            due = time.monotonic() - self.last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def inc(self, name, amount=1, **labels):
+        self._add(self.counters, name, amount, labels)
+
+    def gauge_add(self, name, amount, **labels):
+        self._add(self.gauges, name, amount, labels)
+
+    def flush(self):
+        with self.lock:
+            self.last_flush = time.monotonic()
+            if not (self.counters or self.gauges):
+                return
+            payload = json.dumps({
+                'counters': [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+                'gauges': [[name, dict(labels), value] for (name, labels), value in self.gauges.items()],
+            })
+        try:
+            self.files.write(payload)
+        except OSError:
+            pass
+
+
+registry = Registry(METRICS_DIR, instrumentation.INSTRUMENTATION_FLUSH_SECONDS)
+atexit.register(registry.flush)
+
+
+def inc(name, amount=1, **labels):
+    registry.inc(name, amount, **labels)
+
+
+def gauge_add(name, amount, **labels):
+    registry.gauge_add(name, amount, **labels)
+
+
+def load_counters(directory=None):
+    """Счётчики всех процессов (суммой) и показатели живых процессов"""
+    dead, files = _counter_files(directory or METRICS_DIR).read()
+    counters, gauges = {}, {}
+    if dead:
+        _add_counters(counters, dead.get('counters', []))
+    for pid, data in files.items():
+        _add_counters(counters, data.get('counters', []))
+        if alive(pid):
+            _add_counters(gauges, data.get('gauges', []))
+    return counters, gauges
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sample(name, labels, value):
+    value = repr(float(value)) if isinstance(value, float) else str(value)
+    if labels:
+        rendered = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+        return f'{name}{{{rendered}}} {value}'
+    return f'{name} {value}'
+
+
+class Exposition:
+    """Сборка ответа в текстовом формате Prometheus 0.0.4"""
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name, kind, help_text, samples):
+        if not samples:
+            return
+        self.lines.append(f'# HELP {name} {help_text}')
+        self.lines.append(f'# TYPE {name} {kind}')
+        for sample_name, labels, value in samples:
+            self.lines.append(_sample(sample_name, labels, value))
+
+    def render(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def _request_families(exposition, endpoints):
+    duration, responses, queries, query_seconds, template_seconds, response_bytes = [], [], [], [], [], []
+    for view, endpoint in sorted(endpoints.items()):
+        labels = (('view', view),)
+        cumulative = 0
+        for bound, count in zip(instrumentation.DURATION_BUCKETS, endpoint['buckets']):
+            cumulative += count
+            duration.append(('store_http_request_duration_seconds_bucket', labels + (('le', f'{bound / 1000:g}'),), cumulative))
+        duration.append(('store_http_request_duration_seconds_bucket', labels + (('le', '+Inf'),), endpoint['count']))
+        duration.append(('store_http_request_duration_seconds_sum', labels, endpoint['duration_sum'] / 1000))
+        duration.append(('store_http_request_duration_seconds_count', labels, endpoint['count']))
+        for status, count in sorted(endpoint['statuses'].items()):
+            responses.append(('store_http_responses_total', labels + (('status', status),), count))
+        queries.append(('store_db_queries_total', labels, endpoint['sql_count']))
+        query_seconds.append(('store_db_query_seconds_total', labels, endpoint['sql_time'] / 1000))
+        template_seconds.append(('store_template_render_seconds_total', labels, endpoint['template_time'] / 1000))
+        response_bytes.append(('store_http_response_bytes_total', labels, endpoint['response_size']))
+
+    exposition.family('store_http_request_duration_seconds', 'histogram', 'Response time by URL name', duration)
+    exposition.family('store_http_responses_total', 'counter', 'Responses by URL name and status class', responses)
+    exposition.family('store_db_queries_total', 'counter', 'SQL queries by URL name', queries)
+    exposition.family('store_db_query_seconds_total', 'counter', 'Time spent in SQL by URL name', query_seconds)
+    exposition.family('store_template_render_seconds_total', 'counter', 'Template render time by URL name', template_seconds)
+    exposition.family('store_http_response_bytes_total', 'counter', 'Response body size by URL name', response_bytes)
+
+
+def _grouped(values):
+    families = {}
+    for (name, labels), value in sorted(values.items()):
+        families.setdefault(name, []).append((name, labels, value))
+    return families
+
+
+def render_metrics():
+    """Текст ответа /metrics по данным всех процессов"""
+    # Данные текущего процесса - самые свежие
+    instrumentation.histograms.flush()
+    registry.flush()
+
+    exposition = Exposition()
+    _request_families(exposition, instrumentation.load_histograms())
+
+    counters, gauges = load_counters()
+    for name, samples in _grouped(counters).items():
+        exposition.family(name, 'counter', HELP.get(name, name), samples)
+    for name, samples in _grouped(gauges).items():
+        exposition.family(name, 'gauge', HELP.get(name, name), samples)
+
+    # Доля попаданий в кэш - для дашбордов без PromQL
+    lookups = {}
+    for (name, labels), value in counters.items():
+        if name == 'store_cache_requests_total':
+            labels = dict(labels)
+            hits, total = lookups.get(labels['cache'], (0, 0))
+            lookups[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), total + value)
+    exposition.family('store_cache_hit_ratio', 'gauge', 'Cache hit ratio by cache', [
+        ('store_cache_hit_ratio', (('cache', cache),), hits / total)
+        for cache, (hits, total) in sorted(lookups.items()) if total
+    ])
+
+    # Счётчики ограничения частоты уже общие (лежат в кэше)
+    try:
+        rate_limits = rate_limit_stats()
+    except Exception:
+        rate_limits = {}
+    exposition.family('store_rate_limit_requests_total', 'counter', 'Rate-limited requests by limit and result', [
+        ('store_rate_limit_requests_total', (('limit', name), ('result', result)), value)
+        for name, results in sorted(rate_limits.items())
+        for result, value in sorted(results.items())
+    ])
+    return exposition.render()
+
+
+def is_authorized(request):
+    if METRICS_TOKEN and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {METRICS_TOKEN}'):
+        return True
+    return bool(METRICS_ALLOWED_IPS) and client_ip(request) in METRICS_ALLOWED_IPS
@@ -1,11 +1,14 @@
 """
 Middleware для автоматической очистки старых корзин
+и закрепления посетителя за основной базой после записи
 """
 from pathlib import Path
 from datetime import datetime
 from django.utils import timezone
 from django.core.cache import cache
 from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from .db_router import REPLICA_PIN_COOKIE, REPLICA_STICKY_SECONDS, replica_aliases, request_routing
 from .models import Cart
 
 
@@ -106,3 +109,30 @@ class CartCleanupMiddleware:
             # Игнорируем ошибки, чтобы не нарушать работу сайта
             pass
 
+
+class ReplicaPinMiddleware:
+    """
+    Заводит состояние маршрутизации БД на каждый запрос (см. db_router.py)
+    и после записи закрепляет посетителя за основной базой
+    на REPLICA_STICKY_SECONDS через cookie (без записи в сессию).
+    """
+    
+    def __init__(self, get_response):
+        # Без реплик middleware не нужен
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        with request_routing(pinned=REPLICA_PIN_COOKIE in request.COOKIES) as state:
+            response = self.get_response(request)
+        
+        if state.wrote:
+            response.set_cookie(
+                REPLICA_PIN_COOKIE,
+                '1',
+                max_age=REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(default=0, verbose_name='Степень похожести')),
+                ('rank', models.PositiveSmallIntegerField(default=0, verbose_name='Позиция')),
+            ],
+            options={
+                'verbose_name': 'Рекомендация товара',
+                'verbose_name_plural': 'Рекомендации товаров',
+                'ordering': ['product', 'rank'],
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='is_active',
+            field=models.BooleanField(db_index=True, default=True, help_text='Неактивные товары не отображаются на сайте', verbose_name='Активен'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active'], name='store_produ_is_acti_d3da42_idx'),
+        ),
+        migrations.AddField(
+            model_name='productrecommendation',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='store.product', verbose_name='Товар'),
+        ),
+        migrations.AddField(
+            model_name='productrecommendation',
+            name='recommended',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_for', to='store.product', verbose_name='Рекомендуемый товар'),
+        ),
+        migrations.AddIndex(
+            model_name='productrecommendation',
+            index=models.Index(fields=['product', 'rank'], name='store_produ_product_81579b_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='productrecommendation',
+            unique_together={('product', 'recommended')},
+        ),
+    ]
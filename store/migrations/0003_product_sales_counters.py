@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_productrecommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sales_30d',
+            field=models.PositiveIntegerField(default=0, verbose_name='Продано за 30 дней'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sales_7d',
+            field=models.PositiveIntegerField(default=0, verbose_name='Продано за 7 дней'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sales_90d',
+            field=models.PositiveIntegerField(default=0, verbose_name='Продано за 90 дней'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-sales_30d', '-sales_90d'], name='store_produ_sales_3_e403cf_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_rating_total(apps, schema_editor):
+    """
+    Сохраняет существующие (введённые вручную) рейтинги: rating_total
+    заполняется так, чтобы rating_total / reviews_count == rating.
+    """
+    Product = apps.get_model('store', 'Product')
+    products = []
+    for product in Product.objects.filter(reviews_count__gt=0).only('rating', 'reviews_count').iterator():
+        product.rating_total = int(round(product.rating * product.reviews_count))
+        products.append(product)
+    Product.objects.bulk_update(products, ['rating_total'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_product_sales_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_total',
+            field=models.PositiveIntegerField(default=0, verbose_name='Сумма оценок'),
+        ),
+        migrations.CreateModel(
+            name='ProductReview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Имя')),
+                ('rating', models.PositiveSmallIntegerField(choices=[(1, '1'), (2, '2'), (3, '3'), (4, '4'), (5, '5')], verbose_name='Оценка')),
+                ('text', models.TextField(blank=True, verbose_name='Текст отзыва')),
+                ('status', models.CharField(choices=[('pending', 'На модерации'), ('approved', 'Одобрен'), ('rejected', 'Отклонен')], db_index=True, default='pending', max_length=20, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата создания')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='store.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Отзыв',
+                'verbose_name_plural': 'Отзывы',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['product', 'status', '-created_at'], name='store_produ_product_40cff6_idx')],
+            },
+        ),
+        migrations.RunPython(seed_rating_total, migrations.RunPython.noop),
+    ]
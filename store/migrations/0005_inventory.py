@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_is_available(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Product.objects.filter(is_active=True, stock__gt=0).update(is_available=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_productreview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField(verbose_name='Изменение')),
+                ('stock_after', models.IntegerField(verbose_name='Остаток после')),
+                ('reason', models.CharField(choices=[('checkout', 'Оформление заказа'), ('admin', 'Корректировка в админ-панели'), ('import', 'Импорт')], db_index=True, max_length=20, verbose_name='Причина')),
+                ('comment', models.CharField(blank=True, max_length=255, verbose_name='Комментарий')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата')),
+            ],
+            options={
+                'verbose_name': 'Движение остатков',
+                'verbose_name_plural': 'Движения остатков',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='is_available',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='Доступен для покупки'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_available', '-created_at'], name='store_produ_is_avai_44f824_idx'),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='store.order', verbose_name='Заказ'),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='store.product', verbose_name='Товар'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', '-created_at'], name='store_stock_product_e003b4_idx'),
+        ),
+        migrations.RunPython(fill_is_available, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_default_region(apps, schema_editor):
+    PriceRegion = apps.get_model('store', 'PriceRegion')
+    PriceRegion.objects.get_or_create(
+        code='UZ',
+        defaults={'name': 'Узбекистан', 'currency': 'UZS', 'currency_label': 'сум', 'rate': 1, 'is_default': True},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_inventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceRegion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(help_text='Например: UZ, RU, KZ', max_length=8, unique=True, verbose_name='Код')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('currency', models.CharField(default='UZS', max_length=3, verbose_name='Валюта (ISO 4217)')),
+                ('currency_label', models.CharField(default='сум', max_length=10, verbose_name='Обозначение валюты')),
+                ('rate', models.DecimalField(decimal_places=8, default=1, help_text='Сколько единиц валюты региона стоит 1 сум', max_digits=18, verbose_name='Курс')),
+                ('decimal_places', models.PositiveSmallIntegerField(default=2, verbose_name='Знаков после запятой')),
+                ('is_default', models.BooleanField(default=False, verbose_name='Регион по умолчанию')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активен')),
+            ],
+            options={
+                'verbose_name': 'Регион цен',
+                'verbose_name_plural': 'Регионы цен',
+                'ordering': ['-is_default', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='currency',
+            field=models.CharField(default='UZS', max_length=3, verbose_name='Валюта'),
+        ),
+        migrations.CreateModel(
+            name='RegionalPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Цена')),
+                ('old_price', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True, verbose_name='Старая цена')),
+                ('is_manual', models.BooleanField(default=False, help_text='Цена задана вручную и не пересчитывается по курсу', verbose_name='Из прайс-листа')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='regional_prices', to='store.product', verbose_name='Товар')),
+                ('region', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prices', to='store.priceregion', verbose_name='Регион')),
+            ],
+            options={
+                'verbose_name': 'Цена в регионе',
+                'verbose_name_plural': 'Цены в регионах',
+                'indexes': [models.Index(fields=['region', 'price'], name='store_regio_region__59af14_idx')],
+                'unique_together': {('region', 'product')},
+            },
+        ),
+        migrations.RunPython(create_default_region, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_region_pricing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='Номер заказа')),
+                ('session_key', models.CharField(max_length=40, verbose_name='Ключ сессии')),
+                ('first_name', models.CharField(max_length=100, verbose_name='Имя')),
+                ('last_name', models.CharField(max_length=100, verbose_name='Фамилия')),
+                ('email', models.EmailField(db_index=True, max_length=254, verbose_name='Email')),
+                ('phone', models.CharField(db_index=True, max_length=20, verbose_name='Телефон')),
+                ('address', models.TextField(verbose_name='Адрес')),
+                ('city', models.CharField(max_length=100, verbose_name='Город')),
+                ('postal_code', models.CharField(blank=True, max_length=20, verbose_name='Почтовый индекс')),
+                ('comment', models.TextField(blank=True, verbose_name='Комментарий к заказу')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает обработки'), ('processing', 'В обработке'), ('shipped', 'Отправлен'), ('delivered', 'Доставлен'), ('cancelled', 'Отменен')], db_index=True, max_length=20, verbose_name='Статус')),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Общая сумма')),
+                ('currency', models.CharField(default='UZS', max_length=3, verbose_name='Валюта')),
+                ('created_at', models.DateTimeField(db_index=True, verbose_name='Дата создания')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')),
+            ],
+            options={
+                'verbose_name': 'Архивный заказ',
+                'verbose_name_plural': 'Архив заказов',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('product_name', models.CharField(max_length=300, verbose_name='Название товара')),
+                ('quantity', models.IntegerField(verbose_name='Количество')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='store.archivedorder', verbose_name='Заказ')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='store.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Товар в архивном заказе',
+                'verbose_name_plural': 'Товары в архивных заказах',
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_order_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCitySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('city', models.CharField(max_length=100, verbose_name='Город')),
+                ('currency', models.CharField(max_length=3, verbose_name='Валюта')),
+                ('orders', models.IntegerField(default=0, verbose_name='Заказов')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выручка')),
+            ],
+            options={
+                'verbose_name': 'Продажи по городу за день',
+                'verbose_name_plural': 'Продажи по городам и дням',
+                'unique_together': {('date', 'city', 'currency')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCategorySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('currency', models.CharField(max_length=3, verbose_name='Валюта')),
+                ('orders', models.IntegerField(default=0, verbose_name='Заказов')),
+                ('quantity', models.IntegerField(default=0, verbose_name='Продано, шт.')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выручка')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='store.category', verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': 'Продажи категории за день',
+                'verbose_name_plural': 'Продажи категорий по дням',
+                'unique_together': {('date', 'category', 'currency')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('currency', models.CharField(max_length=3, verbose_name='Валюта')),
+                ('orders', models.IntegerField(default=0, verbose_name='Заказов')),
+                ('quantity', models.IntegerField(default=0, verbose_name='Продано, шт.')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выручка')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='store.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Продажи товара за день',
+                'verbose_name_plural': 'Продажи товаров по дням',
+                'indexes': [models.Index(fields=['product', 'date'], name='store_daily_product_dfa4df_idx')],
+                'unique_together': {('date', 'product', 'currency')},
+            },
+        ),
+    ]
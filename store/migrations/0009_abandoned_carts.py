@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAbandonedCarts',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Дата')),
+                ('carts', models.IntegerField(default=0, verbose_name='Корзин')),
+                ('quantity', models.IntegerField(default=0, verbose_name='Товаров, шт.')),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Сумма')),
+            ],
+            options={
+                'verbose_name': 'Брошенные корзины за день',
+                'verbose_name_plural': 'Брошенные корзины по дням',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyAbandonedProducts',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('carts', models.IntegerField(default=0, verbose_name='Корзин')),
+                ('quantity', models.IntegerField(default=0, verbose_name='Количество, шт.')),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Сумма')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='store.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Брошенный товар за день',
+                'verbose_name_plural': 'Брошенные товары по дням',
+                'unique_together': {('date', 'product')},
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_attributes_data(apps, schema_editor):
+    """Заполняет attributes_data существующих товаров (как ProductAttribute.compile)"""
+    Product = apps.get_model('store', 'Product')
+    ProductAttribute = apps.get_model('store', 'ProductAttribute')
+
+    def translated(attribute, field, language):
+        return getattr(attribute, f'{field}_{language}', '') or getattr(attribute, f'{field}_ru')
+
+    by_product = {}
+    for attribute in ProductAttribute.objects.order_by('product_id', 'order', 'name_ru').iterator():
+        by_product.setdefault(attribute.product_id, []).append(attribute)
+    products = [
+        Product(pk=product_id, attributes_data={
+            language: [
+                [translated(attribute, 'name', language), translated(attribute, 'value', language)]
+                for attribute in attributes
+            ]
+            for language, _name in settings.LANGUAGES
+        })
+        for product_id, attributes in by_product.items()
+    ]
+    Product.objects.bulk_update(products, ['attributes_data'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_abandoned_carts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='attributes_data',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Характеристики по языкам'),
+        ),
+        migrations.RunPython(fill_attributes_data, migrations.RunPython.noop),
+    ]
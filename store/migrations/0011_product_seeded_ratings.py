@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:24
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_seeded_ratings(apps, schema_editor):
+    """
+    Начальные оценки - то, что в агрегатах товара не объясняется одобренными
+    отзывами (рейтинги, сохранённые миграцией 0004).
+    """
+    Product = apps.get_model('store', 'Product')
+    ProductReview = apps.get_model('store', 'ProductReview')
+    approved = {
+        row['product_id']: row
+        for row in ProductReview.objects.filter(status='approved').values('product_id')
+        .annotate(count=Count('id'), total=Sum('rating')).order_by()
+    }
+    products = []
+    for product in Product.objects.filter(reviews_count__gt=0).only('reviews_count', 'rating_total').iterator():
+        row = approved.get(product.pk, {'count': 0, 'total': 0})
+        product.seeded_reviews_count = max(product.reviews_count - row['count'], 0)
+        product.seeded_rating_total = max(product.rating_total - row['total'], 0) if product.seeded_reviews_count else 0
+        products.append(product)
+    Product.objects.bulk_update(products, ['seeded_reviews_count', 'seeded_rating_total'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_product_attributes_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='seeded_rating_total',
+            field=models.PositiveIntegerField(default=0, verbose_name='Начальная сумма оценок'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='seeded_reviews_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Начальное количество отзывов'),
+        ),
+        migrations.RunPython(fill_seeded_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_product_seeded_ratings'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='store_produ_sales_3_e403cf_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-sales_30d', '-sales_90d', '-id'], name='store_produ_sales_3_71ea5f_idx'),
+        ),
+    ]
@@ -1,7 +1,12 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
+from django.db.models.lookups import GreaterThan
 from django.utils.text import slugify
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
 
 
 class SlugMixin:
@@ -93,12 +98,34 @@ class Product(SlugMixin, MultilingualMixin, models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products', verbose_name='Категория', db_index=True)
     image = models.ImageField(upload_to='products/', verbose_name='Основное изображение')
     stock = models.IntegerField(default=0, verbose_name='Остаток на складе', db_index=True)
+    # rating и reviews_count - агрегаты по одобренным отзывам (ProductReview) плюс
+    # начальные оценки seeded_*, поддерживаются инкрементально вместе с rating_total
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0, verbose_name='Рейтинг', db_index=True)
     reviews_count = models.IntegerField(default=0, verbose_name='Количество отзывов')
+    rating_total = models.PositiveIntegerField(default=0, verbose_name='Сумма оценок')
+    # Оценки, полученные не через ProductReview (рейтинги, введённые до появления
+    # отзывов, тестовые данные): входят в rating/reviews_count и при пересчёте
+    seeded_reviews_count = models.PositiveIntegerField(default=0, verbose_name='Начальное количество отзывов')
+    seeded_rating_total = models.PositiveIntegerField(default=0, verbose_name='Начальная сумма оценок')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания', db_index=True)
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
     featured = models.BooleanField(default=False, verbose_name='Рекомендуемый', db_index=True)
     is_active = models.BooleanField(default=True, verbose_name='Активен', db_index=True, help_text='Неактивные товары не отображаются на сайте')
+    # Доступность на витрине: is_active и stock > 0. Пересчитывается при сохранении
+    # и при каждом движении остатков (см. inventory.py), витрина фильтрует только по нему.
+    is_available = models.BooleanField(default=False, verbose_name='Доступен для покупки', db_index=True, editable=False)
+    
+    # Счётчики продаж за скользящие окна (см. sales_rank.py).
+    # Увеличиваются при оформлении заказа и пересчитываются командой rebuild_sales_rank.
+    sales_7d = models.PositiveIntegerField(default=0, verbose_name='Продано за 7 дней')
+    sales_30d = models.PositiveIntegerField(default=0, verbose_name='Продано за 30 дней')
+    sales_90d = models.PositiveIntegerField(default=0, verbose_name='Продано за 90 дней')
+    
+    # Характеристики (ProductAttribute), уже переведённые на каждый язык:
+    # {"ru": [["Материал", "Дуб"], ...], "en": [...]}. Страница товара выводит их
+    # без запроса к ProductAttribute. Пересобирается при сохранении/удалении
+    # характеристики (сигналы), целиком - командой rebuild_product_attributes.
+    attributes_data = models.JSONField(default=dict, blank=True, editable=False, verbose_name='Характеристики по языкам')
     
     class Meta:
         verbose_name = 'Товар'
@@ -111,6 +138,8 @@ class Product(SlugMixin, MultilingualMixin, models.Model):
             models.Index(fields=['-created_at']),
             models.Index(fields=['stock']),
             models.Index(fields=['is_active']),
+            models.Index(fields=['is_available', '-created_at']),
+            models.Index(fields=['-sales_30d', '-sales_90d', '-id']),
         ]
     
     def __str__(self):
@@ -139,12 +168,45 @@ class Product(SlugMixin, MultilingualMixin, models.Model):
             base_slug = slugify(self.name_ru)
             self.slug = self.generate_unique_slug(base_slug, Product)
         
-        # Автоматически устанавливаем is_active = False, если товара нет на складе
-        if self.stock <= 0:
-            self.is_active = False
+        # Доступность выводится из is_active и остатка; is_active остаётся ручным флагом,
+        # поэтому после пополнения склада товар снова появляется на витрине
+        self.is_available = self.is_active and self.stock > 0
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'stock', 'is_active'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'is_available'}
         
         super().save(*args, **kwargs)
     
+    def get_attributes(self, language=None):
+        """Пары (название, значение) характеристик на указанном или текущем языке"""
+        if language is None:
+            from django.utils.translation import get_language
+            language = get_language() or 'ru'
+        return self.attributes_data.get(language) or self.attributes_data.get('ru', [])
+    
+    @classmethod
+    def rebuild_attributes_data(cls, product_ids=None, batch_size=1000):
+        """
+        Пересобирает attributes_data товаров product_ids (None - всех).
+        Возвращает количество товаров.
+        """
+        attributes = ProductAttribute.objects.order_by('product_id', 'order', 'name_ru')
+        products = cls.objects.order_by('pk')
+        if product_ids is not None:
+            attributes = attributes.filter(product_id__in=product_ids)
+            products = products.filter(pk__in=product_ids)
+        by_product = {}
+        for attribute in attributes.iterator():
+            by_product.setdefault(attribute.product_id, []).append(attribute)
+        
+        updated = [
+            cls(pk=pk, attributes_data=ProductAttribute.compile(by_product.get(pk, [])))
+            for pk in products.values_list('pk', flat=True)
+        ]
+        # bulk_update: без сигналов сохранения товара (индекс поиска, региональные цены)
+        cls.objects.bulk_update(updated, ['attributes_data'], batch_size=batch_size)
+        return len(updated)
+    
     @property
     def discount_percent(self):
         if self.old_price and self.old_price > self.price:
@@ -157,6 +219,111 @@ class Product(SlugMixin, MultilingualMixin, models.Model):
         return self.stock > 0
 
 
+class StockMovement(models.Model):
+    """
+    Журнал движений остатков (только добавление записей).
+    Product.stock - кэш текущего остатка, изменяемый атомарно вместе с записью в журнал.
+    """
+    REASON_CHOICES = [
+        ('checkout', 'Оформление заказа'),
+        ('admin', 'Корректировка в админ-панели'),
+        ('import', 'Импорт'),
+    ]
+    
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements', verbose_name='Товар')
+    delta = models.IntegerField(verbose_name='Изменение')
+    stock_after = models.IntegerField(verbose_name='Остаток после')
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, verbose_name='Причина', db_index=True)
+    order = models.ForeignKey('Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements', verbose_name='Заказ')
+    comment = models.CharField(max_length=255, blank=True, verbose_name='Комментарий')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата', db_index=True)
+    
+    class Meta:
+        verbose_name = 'Движение остатков'
+        verbose_name_plural = 'Движения остатков'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['product', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f'{self.product.name_ru}: {self.delta:+d} ({self.get_reason_display()})'
+
+
+class PriceRegion(models.Model):
+    """
+    Регион продаж со своей валютой. Цены региона - это Product.price,
+    пересчитанная по курсу rate, или цены из прайс-листа (RegionalPrice.is_manual).
+    Регион по умолчанию работает с Product.price напрямую.
+    """
+    code = models.CharField(max_length=8, unique=True, verbose_name='Код', help_text='Например: UZ, RU, KZ')
+    name = models.CharField(max_length=100, verbose_name='Название')
+    currency = models.CharField(max_length=3, default='UZS', verbose_name='Валюта (ISO 4217)')
+    currency_label = models.CharField(max_length=10, default='сум', verbose_name='Обозначение валюты')
+    rate = models.DecimalField(
+        max_digits=18,
+        decimal_places=8,
+        default=1,
+        verbose_name='Курс',
+        help_text='Сколько единиц валюты региона стоит 1 сум',
+    )
+    decimal_places = models.PositiveSmallIntegerField(default=2, verbose_name='Знаков после запятой')
+    is_default = models.BooleanField(default=False, verbose_name='Регион по умолчанию')
+    is_active = models.BooleanField(default=True, verbose_name='Активен')
+    
+    class Meta:
+        verbose_name = 'Регион цен'
+        verbose_name_plural = 'Регионы цен'
+        ordering = ['-is_default', 'name']
+    
+    def __str__(self):
+        return f'{self.name} ({self.currency})'
+    
+    def save(self, *args, **kwargs):
+        # Регион по умолчанию может быть только один
+        with transaction.atomic():
+            if self.is_default:
+                PriceRegion.objects.filter(is_default=True).exclude(pk=self.pk).update(is_default=False)
+            super().save(*args, **kwargs)
+    
+    def convert(self, amount):
+        """Пересчёт суммы в сумах в валюту региона с округлением"""
+        if amount is None:
+            return None
+        if self.is_default:
+            return amount
+        return (amount * self.rate).quantize(Decimal(1).scaleb(-self.decimal_places))
+
+
+class RegionalPrice(models.Model):
+    """
+    Предрассчитанная цена товара в регионе (см. pricing.py).
+    Витрина присоединяет её одним JOIN по уникальному индексу (region, product),
+    поэтому сортировка и фильтр по цене остаются одним запросом.
+    """
+    region = models.ForeignKey(PriceRegion, on_delete=models.CASCADE, related_name='prices', verbose_name='Регион')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='regional_prices', verbose_name='Товар')
+    price = models.DecimalField(max_digits=14, decimal_places=2, verbose_name='Цена')
+    old_price = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True, verbose_name='Старая цена')
+    is_manual = models.BooleanField(
+        default=False,
+        verbose_name='Из прайс-листа',
+        help_text='Цена задана вручную и не пересчитывается по курсу',
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
+    
+    class Meta:
+        verbose_name = 'Цена в регионе'
+        verbose_name_plural = 'Цены в регионах'
+        unique_together = [['region', 'product']]
+        indexes = [
+            models.Index(fields=['region', 'price']),
+        ]
+    
+    def __str__(self):
+        return f'{self.product.name_ru} - {self.region.code}: {self.price}'
+
+
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images', verbose_name='Товар', db_index=True)
     image = models.ImageField(upload_to='products/', verbose_name='Изображение')
@@ -207,12 +374,12 @@ class Cart(models.Model):
     
     @classmethod
     def cleanup_old_carts(cls, days=30):
-        """Удаляет корзины, которые не обновлялись более указанного количества дней"""
-        expiration_date = timezone.now() - timedelta(days=days)
-        old_carts = cls.objects.filter(updated_at__lt=expiration_date)
-        count = old_carts.count()
-        old_carts.delete()
-        return count
+        """
+        Удаляет корзины, которые не обновлялись более указанного количества дней.
+        Перед удалением их содержимое добавляется в статистику брошенных корзин.
+        """
+        from .abandoned_carts import reap_carts
+        return reap_carts(days)
 
 
 class CartItem(models.Model):
@@ -257,6 +424,7 @@ class Order(models.Model):
     comment = models.TextField(blank=True, verbose_name='Комментарий к заказу')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='Статус', db_index=True)
     total_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Общая сумма')
+    currency = models.CharField(max_length=3, default='UZS', verbose_name='Валюта')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания', db_index=True)
     
     class Meta:
@@ -306,6 +474,161 @@ class OrderItem(models.Model):
         return self.price * self.quantity
 
 
+class ArchivedOrder(models.Model):
+    """
+    Архив заказов (см. archive.py): доставленные и отменённые заказы старше
+    ORDER_ARCHIVE_AFTER_DAYS переносятся сюда из Order с тем же номером,
+    чтобы рабочие таблицы Order/OrderItem оставались небольшими.
+    Записи только для чтения.
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name='Номер заказа')
+    session_key = models.CharField(max_length=40, verbose_name='Ключ сессии')
+    first_name = models.CharField(max_length=100, verbose_name='Имя')
+    last_name = models.CharField(max_length=100, verbose_name='Фамилия')
+    email = models.EmailField(verbose_name='Email', db_index=True)
+    phone = models.CharField(max_length=20, verbose_name='Телефон', db_index=True)
+    address = models.TextField(verbose_name='Адрес')
+    city = models.CharField(max_length=100, verbose_name='Город')
+    postal_code = models.CharField(max_length=20, verbose_name='Почтовый индекс', blank=True)
+    comment = models.TextField(blank=True, verbose_name='Комментарий к заказу')
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, verbose_name='Статус', db_index=True)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Общая сумма')
+    currency = models.CharField(max_length=3, default='UZS', verbose_name='Валюта')
+    created_at = models.DateTimeField(verbose_name='Дата создания', db_index=True)
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')
+    
+    class Meta:
+        verbose_name = 'Архивный заказ'
+        verbose_name_plural = 'Архив заказов'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f'Заказ #{self.id} - {self.first_name} {self.last_name} (архив)'
+    
+    @property
+    def full_name(self):
+        """Полное имя клиента"""
+        return f'{self.first_name} {self.last_name}'
+
+
+class ArchivedOrderItem(models.Model):
+    """Позиция архивного заказа; название товара сохраняется на момент архивации"""
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items', verbose_name='Заказ')
+    # В отличие от OrderItem архив не запрещает удалять товары из каталога
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='Товар')
+    product_name = models.CharField(max_length=300, verbose_name='Название товара')
+    quantity = models.IntegerField(verbose_name='Количество')
+    price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Цена')
+    
+    class Meta:
+        verbose_name = 'Товар в архивном заказе'
+        verbose_name_plural = 'Товары в архивных заказах'
+    
+    def __str__(self):
+        return f'{self.product_name} x{self.quantity}'
+    
+    @property
+    def total_price(self):
+        """Общая стоимость позиции"""
+        return self.price * self.quantity
+
+
+class DailyProductSales(models.Model):
+    """
+    Продажи товара за день (см. sales_rollups.py). Отменённые заказы не учитываются.
+    Поддерживаются при оформлении и смене статуса заказа,
+    пересчитываются командой rebuild_sales_rollups.
+    """
+    date = models.DateField(verbose_name='Дата')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+', verbose_name='Товар')
+    currency = models.CharField(max_length=3, verbose_name='Валюта')
+    orders = models.IntegerField(default=0, verbose_name='Заказов')
+    quantity = models.IntegerField(default=0, verbose_name='Продано, шт.')
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Выручка')
+    
+    class Meta:
+        verbose_name = 'Продажи товара за день'
+        verbose_name_plural = 'Продажи товаров по дням'
+        unique_together = [['date', 'product', 'currency']]
+        indexes = [
+            models.Index(fields=['product', 'date']),
+        ]
+    
+    def __str__(self):
+        return f'{self.date}: товар #{self.product_id} - {self.quantity} шт.'
+
+
+class DailyCategorySales(models.Model):
+    """Продажи категории за день (по категории товара)"""
+    date = models.DateField(verbose_name='Дата')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+', verbose_name='Категория')
+    currency = models.CharField(max_length=3, verbose_name='Валюта')
+    orders = models.IntegerField(default=0, verbose_name='Заказов')
+    quantity = models.IntegerField(default=0, verbose_name='Продано, шт.')
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Выручка')
+    
+    class Meta:
+        verbose_name = 'Продажи категории за день'
+        verbose_name_plural = 'Продажи категорий по дням'
+        unique_together = [['date', 'category', 'currency']]
+    
+    def __str__(self):
+        return f'{self.date}: категория #{self.category_id} - {self.revenue}'
+
+
+class DailyCitySales(models.Model):
+    """Заказы и выручка по городу доставки за день"""
+    date = models.DateField(verbose_name='Дата')
+    city = models.CharField(max_length=100, verbose_name='Город')
+    currency = models.CharField(max_length=3, verbose_name='Валюта')
+    orders = models.IntegerField(default=0, verbose_name='Заказов')
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Выручка')
+    
+    class Meta:
+        verbose_name = 'Продажи по городу за день'
+        verbose_name_plural = 'Продажи по городам и дням'
+        unique_together = [['date', 'city', 'currency']]
+    
+    def __str__(self):
+        return f'{self.date}: {self.city} - {self.revenue}'
+
+
+class DailyAbandonedCarts(models.Model):
+    """
+    Брошенные корзины за день (по дате последнего изменения корзины).
+    Заполняется при удалении устаревших корзин, см. abandoned_carts.py.
+    """
+    date = models.DateField(unique=True, verbose_name='Дата')
+    carts = models.IntegerField(default=0, verbose_name='Корзин')
+    quantity = models.IntegerField(default=0, verbose_name='Товаров, шт.')
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Сумма')
+    
+    class Meta:
+        verbose_name = 'Брошенные корзины за день'
+        verbose_name_plural = 'Брошенные корзины по дням'
+    
+    def __str__(self):
+        return f'{self.date}: {self.carts} корзин'
+
+
+class DailyAbandonedProducts(models.Model):
+    """Сколько брошенных корзин за день содержали товар и в каком количестве"""
+    date = models.DateField(verbose_name='Дата')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+', verbose_name='Товар')
+    carts = models.IntegerField(default=0, verbose_name='Корзин')
+    quantity = models.IntegerField(default=0, verbose_name='Количество, шт.')
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Сумма')
+    
+    class Meta:
+        verbose_name = 'Брошенный товар за день'
+        verbose_name_plural = 'Брошенные товары по дням'
+        unique_together = [['date', 'product']]
+    
+    def __str__(self):
+        return f'{self.date}: товар #{self.product_id} - {self.carts} корзин'
+
+
 class ProductAttribute(MultilingualMixin, models.Model):
     """Характеристики товара с поддержкой многоязычности"""
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='attributes', verbose_name='Товар', db_index=True)
@@ -346,6 +669,149 @@ class ProductAttribute(MultilingualMixin, models.Model):
     def value(self):
         """Свойство для обратной совместимости"""
         return self.get_value()
+    
+    @staticmethod
+    def compile(attributes):
+        """Содержимое Product.attributes_data для упорядоченного списка характеристик"""
+        if not attributes:
+            return {}
+        return {
+            language: [[attribute.get_name(language), attribute.get_value(language)] for attribute in attributes]
+            for language, _name in settings.LANGUAGES
+        }
+
+
+class ProductReview(models.Model):
+    """
+    Отзывы о товарах с модерацией.
+    Рейтинг и количество отзывов товара пересчитываются инкрементально
+    в той же транзакции, что и изменение отзыва (учитываются только одобренные).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'На модерации'),
+        ('approved', 'Одобрен'),
+        ('rejected', 'Отклонен'),
+    ]
+    RATING_CHOICES = [(i, str(i)) for i in range(1, 6)]
+    
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews', verbose_name='Товар')
+    name = models.CharField(max_length=100, verbose_name='Имя')
+    rating = models.PositiveSmallIntegerField(choices=RATING_CHOICES, verbose_name='Оценка')
+    text = models.TextField(blank=True, verbose_name='Текст отзыва')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='Статус', db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания', db_index=True)
+    
+    class Meta:
+        verbose_name = 'Отзыв'
+        verbose_name_plural = 'Отзывы'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['product', 'status', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f'{self.product.name_ru} - {self.name} ({self.rating})'
+    
+    @property
+    def is_approved(self):
+        return self.status == 'approved'
+    
+    def _counted_rating(self):
+        """Оценка, которую отзыв вносит в агрегаты товара (None, если не учитывается)"""
+        return self.rating if self.is_approved else None
+    
+    @staticmethod
+    def _apply_delta(product_id, count_delta, rating_delta):
+        """Атомарно изменяет агрегаты товара одним UPDATE без чтения отзывов"""
+        if not count_delta and not rating_delta:
+            return
+        new_count = F('reviews_count') + count_delta
+        new_total = F('rating_total') + rating_delta
+        Product.objects.filter(pk=product_id).update(
+            reviews_count=new_count,
+            rating_total=new_total,
+            rating=Case(
+                When(reviews_count__lte=-count_delta, then=Value(0)),
+                default=Round(Cast(new_total, models.FloatField()) / new_count, 2),
+                output_field=models.DecimalField(max_digits=3, decimal_places=2),
+            ),
+        )
+    
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = (
+                    ProductReview.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values('product_id', 'rating', 'status')
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            
+            if previous and previous['status'] == 'approved':
+                self._apply_delta(previous['product_id'], -1, -previous['rating'])
+            if self.is_approved:
+                self._apply_delta(self.product_id, 1, self.rating)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            counted = (
+                ProductReview.objects.select_for_update()
+                .filter(pk=self.pk, status='approved')
+                .values_list('product_id', 'rating')
+                .first()
+            )
+            result = super().delete(*args, **kwargs)
+            if counted:
+                self._apply_delta(counted[0], -1, -counted[1])
+        return result
+    
+    @classmethod
+    def rebuild_product_ratings(cls):
+        """
+        Пересчитывает rating/reviews_count/rating_total всех товаров как
+        начальные оценки (seeded_*) плюс одобренные отзывы - одним UPDATE
+        (восстановление согласованности). Товары без одобренных отзывов
+        возвращаются к начальным оценкам.
+        Возвращает количество товаров.
+        """
+        approved = cls.objects.filter(product=OuterRef('pk'), status='approved').order_by().values('product')
+        new_count = F('seeded_reviews_count') + Coalesce(Subquery(approved.annotate(count=Count('id')).values('count')), 0)
+        new_total = F('seeded_rating_total') + Coalesce(Subquery(approved.annotate(total=Sum('rating')).values('total')), 0)
+        return Product.objects.update(
+            reviews_count=new_count,
+            rating_total=new_total,
+            rating=Case(
+                When(GreaterThan(new_count, 0), then=Round(Cast(new_total, models.FloatField()) / new_count, 2)),
+                default=Value(0),
+                output_field=models.DecimalField(max_digits=3, decimal_places=2),
+            ),
+        )
+
+
+class ProductRecommendation(models.Model):
+    """
+    Предрассчитанные "похожие товары" (top-K соседей для каждого товара).
+    Заполняется командой build_recommendations по совместным покупкам
+    и общим характеристикам товаров.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommendations', verbose_name='Товар')
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommended_for', verbose_name='Рекомендуемый товар')
+    score = models.FloatField(default=0, verbose_name='Степень похожести')
+    rank = models.PositiveSmallIntegerField(default=0, verbose_name='Позиция')
+
+    class Meta:
+        verbose_name = 'Рекомендация товара'
+        verbose_name_plural = 'Рекомендации товаров'
+        ordering = ['product', 'rank']
+        unique_together = [['product', 'recommended']]
+        indexes = [
+            models.Index(fields=['product', 'rank']),
+        ]
+
+    def __str__(self):
+        return f'{self.product.name_ru} -> {self.recommended.name_ru} ({self.score:.3f})'
 
 
 class Banner(MultilingualMixin, models.Model):
@@ -0,0 +1,171 @@
+"""
+Региональные цены.
+
+Регион посетителя хранится в cookie (см. set_region) и определяет валюту.
+Цены региона предрассчитаны в таблице RegionalPrice: либо Product.price,
+пересчитанная по курсу PriceRegion.rate, либо цена из прайс-листа
+(is_manual=True, по курсу не пересчитывается). Витрина присоединяет цену
+одним JOIN - with_prices() для querysets (фильтр и сортировка по
+RegionalPrice.price по индексу (region, price)) и attach_prices() для уже
+загруженных списков товаров (один запрос на список).
+
+Таблица поддерживается полной: строки создаются и пересчитываются сигналами
+(сохранение товара, сохранение региона) и командой rebuild_region_prices.
+Регион по умолчанию работает с Product.price напрямую и строк в таблице не
+имеет. Если строки всё же нет, attach_prices и шаблонные теги пересчитывают
+цену по курсу с тем же округлением (PriceRegion.convert).
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils.translation import gettext as _
+
+from . import metrics
+from .models import PriceRegion, Product, RegionalPrice
+
+REGION_COOKIE_NAME = getattr(settings, 'REGION_COOKIE_NAME', 'region')
+# Список регионов кэшируется; изменения в админ-панели сбрасывают кэш
+REGIONS_CACHE_KEY = 'store_price_regions'
+REGIONS_CACHE_TIMEOUT = 60
+
+# Регион, если в БД не настроено ни одного
+BASE_REGION = PriceRegion(
+    code='UZ',
+    name='Узбекистан',
+    currency='UZS',
+    currency_label='сум',
+    rate=Decimal(1),
+    is_default=True,
+)
+
+
+def get_regions():
+    regions = cache.get(REGIONS_CACHE_KEY)
+    metrics.inc('store_cache_requests_total', cache='price_regions', result='miss' if regions is None else 'hit')
+    if regions is None:
+        regions = list(PriceRegion.objects.filter(is_active=True))
+        cache.set(REGIONS_CACHE_KEY, regions, REGIONS_CACHE_TIMEOUT)
+    return regions
+
+
+def invalidate_regions():
+    cache.delete(REGIONS_CACHE_KEY)
+
+
+def default_region(regions=None):
+    regions = get_regions() if regions is None else regions
+    return next((region for region in regions if region.is_default), BASE_REGION)
+
+
+def get_region(request):
+    """Регион текущего запроса (из cookie, иначе регион по умолчанию)"""
+    region = getattr(request, '_price_region', None)
+    if region is None:
+        regions = get_regions()
+        code = request.COOKIES.get(REGION_COOKIE_NAME)
+        region = next((r for r in regions if r.code == code), None) or default_region(regions)
+        request._price_region = region
+    return region
+
+
+def with_prices(queryset, region):
+    """
+    Добавляет к queryset товаров region_price и region_old_price.
+    Цена берётся прямо из RegionalPrice (INNER JOIN), поэтому фильтр и
+    сортировка по region_price обслуживаются индексом (region, price).
+    Товар без строки в регионе в выборку не попадает - таблица держится
+    полной сигналами и rebuild_region_prices.
+    """
+    if region.is_default:
+        return queryset.annotate(region_price=F('price'), region_old_price=F('old_price'))
+    return queryset.filter(regional_prices__region=region.pk).annotate(
+        region_price=F('regional_prices__price'),
+        region_old_price=F('regional_prices__old_price'),
+    )
+
+
+def attach_prices(products, region):
+    """Проставляет region_price/region_old_price списку товаров одним запросом"""
+    missing = [product for product in products if not hasattr(product, 'region_price')]
+    if not missing:
+        return products
+    rows = {}
+    if not region.is_default:
+        rows = {
+            product_id: (price, old_price)
+            for product_id, price, old_price in RegionalPrice.objects.filter(
+                region=region,
+                product_id__in={product.pk for product in missing},
+            ).values_list('product_id', 'price', 'old_price')
+        }
+    for product in missing:
+        if product.pk in rows:
+            product.region_price, product.region_old_price = rows[product.pk]
+        else:
+            product.region_price = region.convert(product.price)
+            product.region_old_price = region.convert(product.old_price)
+    return products
+
+
+def unit_price(product):
+    """Цена товара в регионе, если она проставлена, иначе базовая"""
+    return getattr(product, 'region_price', product.price)
+
+
+def format_money(amount, region):
+    if region.currency == 'UZS':
+        return _('%(price)s сум') % {'price': amount}
+    return f'{amount} {region.currency_label}'
+
+
+def rebuild_region_prices(region, batch_size=2000):
+    """
+    Пересчитывает по курсу все цены региона, кроме заданных вручную.
+    Возвращает количество пересчитанных товаров.
+    """
+    if region.is_default:
+        RegionalPrice.objects.filter(region=region, is_manual=False).delete()
+        return 0
+
+    manual = set(
+        RegionalPrice.objects.filter(region=region, is_manual=True).values_list('product_id', flat=True)
+    )
+    rows = Product.objects.order_by().values_list('id', 'price', 'old_price').iterator(chunk_size=batch_size)
+
+    count = 0
+    batch = []
+    with transaction.atomic():
+        RegionalPrice.objects.filter(region=region, is_manual=False).delete()
+        for product_id, price, old_price in rows:
+            if product_id in manual:
+                continue
+            batch.append(RegionalPrice(
+                region=region,
+                product_id=product_id,
+                price=region.convert(price),
+                old_price=region.convert(old_price),
+            ))
+            if len(batch) >= batch_size:
+                RegionalPrice.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        RegionalPrice.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+def update_product_prices(product):
+    """Пересчитывает цены одного товара во всех регионах (кроме прайс-листов)"""
+    for region in get_regions():
+        if region.is_default:
+            continue
+        values = {
+            'price': region.convert(product.price),
+            'old_price': region.convert(product.old_price),
+        }
+        updated = RegionalPrice.objects.filter(region=region, product=product, is_manual=False).update(**values)
+        if not updated and not RegionalPrice.objects.filter(region=region, product=product).exists():
+            RegionalPrice.objects.create(region=region, product=product, **values)
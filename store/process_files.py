@@ -0,0 +1,157 @@
+"""
+Файлы данных процессов сайта в общем каталоге.
+
+Каждый процесс (воркер gunicorn) периодически сохраняет накопленные данные -
+счётчики metrics.py, гистограммы instrumentation.py - в свой файл
+<prefix><pid>.json, а читатель объединяет файлы всех процессов.
+
+Файлы завершившихся процессов (перезапуск, max_requests gunicorn) не
+копятся: при чтении их данные под файловой блокировкой прибавляются к общему
+файлу завершившихся процессов, а сами файлы удаляются. Так же поступает
+процесс, получивший PID завершившегося, перед первой записью своего файла -
+иначе os.replace затёр бы чужие итоги. Суммы при этом не меняются. Чтение
+идёт под разделяемой блокировкой, чтобы не застать объединение на середине.
+Без fcntl (Windows) файлы не объединяются, а только читаются.
+"""
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LOCK_FILE = '.process-files.lock'
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Процесс есть, но принадлежит другому пользователю
+        return True
+    return True
+
+
+def write_json(path, payload):
+    """Атомарная замена файла"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    with os.fdopen(fd, 'w') as tmp:
+        tmp.write(payload)
+    os.replace(tmp_path, path)
+
+
+class ProcessFiles:
+    """
+    Файлы <prefix><pid>.json в directory и общий файл dead_name.
+    merge(total, data) прибавляет данные файла data к total (None - пусто)
+    и возвращает результат в том же формате.
+    """
+
+    def __init__(self, directory, prefix, dead_name, merge):
+        self.directory = directory
+        self.prefix = prefix
+        self.dead_name = dead_name
+        self.merge = merge
+        self.owned = False
+
+    def _pid(self, path):
+        return int(path.stem[len(self.prefix):])
+
+    @contextmanager
+    def _lock(self, exclusive):
+        if fcntl is None:
+            yield
+            return
+        try:
+            lock = open(self.directory / LOCK_FILE, 'a')
+        except OSError:
+            # Каталог только для чтения - файлы и не объединяются
+            yield
+            return
+        with lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def write(self, payload):
+        """Сохраняет данные текущего процесса"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f'{self.prefix}{os.getpid()}.json'
+        if not self.owned:
+            # Файл с нашим PID оставил завершившийся процесс - сначала объединяем его
+            if path.exists():
+                self.merge_dead([path])
+            self.owned = True
+        write_json(path, payload)
+
+    def merge_dead(self, paths):
+        """Прибавляет данные файлов paths к общему файлу и удаляет эти файлы"""
+        if fcntl is None:
+            return
+        with self._lock(exclusive=True):
+            dead_path = self.directory / self.dead_name
+            try:
+                total = json.loads(dead_path.read_text())
+            except (OSError, ValueError):
+                total = None
+            merged = []
+            for path in paths:
+                try:
+                    data = json.loads(path.read_text())
+                except (OSError, ValueError):
+                    # Уже объединён другим процессом или повреждён
+                    continue
+                total = self.merge(total, data)
+                merged.append(path)
+            if not merged:
+                return
+            write_json(dead_path, json.dumps(total))
+            for path in merged:
+                path.unlink(missing_ok=True)
+
+    def merge_dead_processes(self):
+        dead = []
+        for path in self.directory.glob(f'{self.prefix}*.json'):
+            try:
+                pid = self._pid(path)
+            except ValueError:
+                continue
+            if pid != os.getpid() and not alive(pid):
+                dead.append(path)
+        if dead:
+            try:
+                self.merge_dead(dead)
+            except OSError:
+                pass
+
+    def read(self):
+        """
+        (данные завершившихся процессов или None, {pid: данные}) -
+        после объединения файлов завершившихся процессов
+        """
+        files = {}
+        if not self.directory.is_dir():
+            return None, files
+        self.merge_dead_processes()
+        with self._lock(exclusive=False):
+            try:
+                dead = json.loads((self.directory / self.dead_name).read_text())
+            except (OSError, ValueError):
+                dead = None
+            for path in sorted(self.directory.glob(f'{self.prefix}*.json')):
+                try:
+                    files[self._pid(path)] = json.loads(path.read_text())
+                except (OSError, ValueError):
+                    continue
+        return dead, files
+
+    def reset(self):
+        """Удаляет все файлы, включая общий"""
+        with self._lock(exclusive=True):
+            for path in self.directory.glob(f'{self.prefix}*.json'):
+                path.unlink(missing_ok=True)
+            (self.directory / self.dead_name).unlink(missing_ok=True)
@@ -0,0 +1,206 @@
+"""
+Журнал медленных и повторяющихся SQL-запросов.
+
+Работает внутри замеров instrumentation.py (на тех же выборочных запросах):
+каждый SQL-запрос проходит через QueryCollector.record. В журнал попадают
+
+- медленные запросы: дольше SLOW_QUERY_MS;
+- повторы: один и тот же SQL (с точностью до параметров) выполнен за запрос
+  больше DUPLICATE_QUERY_THRESHOLD раз - типичный N+1, например ленивая
+  загрузка item.product в цикле по корзине.
+
+Для каждой записи сохраняется укороченный стек: только кадры проекта
+(store/, shop/, без Django и библиотек) и строка шаблона, при отрисовке которой
+выполнен запрос. Записи в формате JSON Lines пишутся в SLOW_QUERY_LOG;
+страница "Медленные запросы" в админ-панели группирует их и показывает самые
+затратные места.
+
+В файл пишут все воркеры gunicorn, поэтому журнал не ротируется изнутри
+процесса (RotatingFileHandler каждого воркера переименовывал бы файл сам, и
+записи других воркеров терялись бы). Ротацию выполняет внешний logrotate, а
+WatchedFileHandler замечает переименование и открывает новый файл. Каждая
+запись - одна короткая строка, дописываемая в режиме O_APPEND, и строки
+разных процессов не перемешиваются. Отчёт читает текущий файл и
+SLOW_QUERY_LOG_BACKUPS последних несжатых ротированных (.1, .2, ...).
+"""
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from logging.handlers import WatchedFileHandler
+from pathlib import Path
+
+from django.conf import settings
+
+QUERY_LOG_ENABLED = getattr(settings, 'QUERY_LOG_ENABLED', True)
+SLOW_QUERY_MS = getattr(settings, 'SLOW_QUERY_MS', 100)
+DUPLICATE_QUERY_THRESHOLD = getattr(settings, 'DUPLICATE_QUERY_THRESHOLD', 5)
+SLOW_QUERY_LOG = Path(getattr(settings, 'SLOW_QUERY_LOG', Path(settings.BASE_DIR) / 'logs' / 'slow_queries.log'))
+SLOW_QUERY_LOG_BACKUPS = getattr(settings, 'SLOW_QUERY_LOG_BACKUPS', 3)
+
+# Сколько кадров проекта сохранять в стеке
+STACK_DEPTH = 8
+
+_PROJECT_ROOT = str(Path(settings.BASE_DIR).resolve())
+_SKIP_FILES = ('query_log.py', 'instrumentation.py')
+# Списки параметров разной длины - это один и тот же запрос
+_PLACEHOLDER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+
+logger = logging.getLogger('store.queries')
+logger.propagate = False
+_handler_lock = threading.Lock()
+
+
+def fingerprint(sql):
+    return _PLACEHOLDER_LIST.sub('(...)', sql)
+
+
+def _project_frame(filename):
+    return filename.startswith(_PROJECT_ROOT) and 'site-packages' not in filename and not filename.endswith(_SKIP_FILES)
+
+
+def capture_stack():
+    """Кадры проекта (от ближайшего к запросу) и строка шаблона, если запрос из шаблона"""
+    frames = []
+    template = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if template is None and code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template = f'{origin.template_name or origin.name}:{token.lineno}'
+        if len(frames) < STACK_DEPTH and _project_frame(code.co_filename):
+            path = code.co_filename[len(_PROJECT_ROOT):].lstrip('/\\')
+            frames.append(f'{path}:{frame.f_lineno} in {code.co_name}')
+        frame = frame.f_back
+    return frames, template
+
+
+class QueryCollector:
+    """SQL-запросы одного HTTP-запроса"""
+
+    __slots__ = ('slow', 'seen')
+
+    def __init__(self):
+        self.slow = []
+        # fingerprint -> [количество, суммарное время, стек при превышении порога]
+        self.seen = {}
+
+    def record(self, sql, duration):
+        key = fingerprint(sql)
+        entry = self.seen.get(key)
+        if entry is None:
+            entry = self.seen[key] = [0, 0.0, None]
+        entry[0] += 1
+        entry[1] += duration
+        if entry[0] == DUPLICATE_QUERY_THRESHOLD + 1:
+            entry[2] = capture_stack()
+        if duration * 1000 >= SLOW_QUERY_MS:
+            self.slow.append((key, duration, capture_stack()))
+
+    def entries(self, request, view_name):
+        base = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'view': view_name,
+            'method': request.method,
+            'path': request.path,
+        }
+        for sql, duration, (stack, template) in self.slow:
+            yield dict(
+                base, kind='slow', sql=sql, count=1, duration_ms=round(duration * 1000, 2),
+                stack=stack, template=template,
+            )
+        for sql, (count, total, captured) in self.seen.items():
+            if captured is not None:
+                stack, template = captured
+                yield dict(
+                    base, kind='duplicate', sql=sql, count=count, duration_ms=round(total * 1000, 2),
+                    stack=stack, template=template,
+                )
+
+    def flush(self, request, view_name):
+        entries = list(self.entries(request, view_name))
+        if not entries:
+            return
+        _ensure_handler()
+        for entry in entries:
+            logger.warning(json.dumps(entry, ensure_ascii=False))
+
+
+def _ensure_handler():
+    if logger.handlers:
+        return
+    with _handler_lock:
+        if logger.handlers:
+            return
+        try:
+            SLOW_QUERY_LOG.parent.mkdir(parents=True, exist_ok=True)
+            handler = WatchedFileHandler(SLOW_QUERY_LOG, encoding='utf-8')
+        except OSError:
+            handler = logging.NullHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+
+
+def read_entries():
+    """Все записи журнала, включая ротированные файлы"""
+    paths = [SLOW_QUERY_LOG.with_name(f'{SLOW_QUERY_LOG.name}.{index}') for index in range(SLOW_QUERY_LOG_BACKUPS, 0, -1)]
+    paths.append(SLOW_QUERY_LOG)
+    for path in paths:
+        try:
+            with open(path, encoding='utf-8') as log_file:
+                for line in log_file:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+
+
+def worst_offenders(limit=50):
+    """
+    Записи, сгруппированные по типу, SQL и месту в коде, по убыванию
+    суммарного времени.
+    """
+    groups = {}
+    for entry in read_entries():
+        location = entry.get('template') or (entry['stack'][0] if entry.get('stack') else '')
+        key = (entry['kind'], entry['sql'], location)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                'kind': entry['kind'],
+                'sql': entry['sql'],
+                'location': location,
+                'occurrences': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'max_count': 0,
+                'views': set(),
+            }
+        group['occurrences'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        group['max_count'] = max(group['max_count'], entry['count'])
+        group['views'].add(entry['view'])
+        group['last_seen'] = entry['time']
+        group['stack'] = entry.get('stack') or []
+        group['template'] = entry.get('template')
+    rows = sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)[:limit]
+    for row in rows:
+        row['views'] = ', '.join(sorted(row['views']))
+    return rows
+
+
+def clear_log():
+    for index in range(1, SLOW_QUERY_LOG_BACKUPS + 1):
+        SLOW_QUERY_LOG.with_name(f'{SLOW_QUERY_LOG.name}.{index}').unlink(missing_ok=True)
+    # Файл журнала может быть открыт воркерами - обрезаем его, а не удаляем
+    if SLOW_QUERY_LOG.exists():
+        open(SLOW_QUERY_LOG, 'w').close()
@@ -0,0 +1,178 @@
+"""
+Ограничение частоты запросов (token bucket).
+
+Каждое ограничение - это бакет на rate запросов за период с запасом burst,
+ключ бакета - IP посетителя или его сессия. Состояние хранится в общем кэше
+(settings.RATE_LIMIT_CACHE, в продакшене - Redis, см. REDIS_URL), поэтому лимит
+общий для всех процессов. Бакет реализован как GCRA: в кэше лежит одно число -
+"теоретическое время прихода" следующего запроса, и меняется оно только
+атомарными incr/decr, без чтения-изменения-записи.
+
+Подключение к представлению:
+
+    @rate_limit('contact', '5/10m', burst=3)
+    def contact(request): ...
+
+Лимиты переопределяются в settings.RATE_LIMITS ({'contact': '10/h'}), выключаются
+RATE_LIMIT_ENABLED=False. При превышении лимита возвращается 429 с Retry-After.
+Счётчики пропущенных и отклонённых запросов: stats() и команда rate_limit_stats.
+"""
+import math
+import re
+import time
+from collections import namedtuple
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+from django.utils.translation import gettext as _
+
+RATE_LIMIT_ENABLED = getattr(settings, 'RATE_LIMIT_ENABLED', True)
+RATE_LIMIT_CACHE = getattr(settings, 'RATE_LIMIT_CACHE', 'default')
+# Переопределение лимитов по имени: {'contact': '10/h', 'cart': '120/m'}
+RATE_LIMITS = getattr(settings, 'RATE_LIMITS', {})
+# Заголовок с IP клиента за обратным прокси (например, 'HTTP_X_REAL_IP'); по умолчанию REMOTE_ADDR
+RATE_LIMIT_IP_HEADER = getattr(settings, 'RATE_LIMIT_IP_HEADER', '')
+
+_KEY_PREFIX = 'ratelimit'
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+_RATE_RE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+
+Limit = namedtuple('Limit', ['rate', 'period', 'burst'])
+
+# Все ограничения, объявленные декоратором (для статистики)
+registry = {}
+
+
+def parse_rate(value, burst=None):
+    """'5/10m' -> Limit(rate=5, period=600, burst=5)"""
+    match = _RATE_RE.match(value.replace(' ', ''))
+    if not match:
+        raise ValueError(f'Invalid rate {value!r}, expected e.g. "5/m" or "10/15m"')
+    rate = int(match.group(1))
+    period = int(match.group(2) or 1) * _PERIODS[match.group(3)]
+    return Limit(rate, period, burst or rate)
+
+
+def client_ip(request):
+    if RATE_LIMIT_IP_HEADER:
+        forwarded = request.META.get(RATE_LIMIT_IP_HEADER, '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def request_key(request, key):
+    """Ключ бакета: 'ip' или 'session' (сессия, если она уже есть, иначе IP)"""
+    if key == 'session' and request.session.session_key:
+        return f's:{request.session.session_key}'
+    return f'ip:{client_ip(request)}'
+
+
+def _incr(cache, key, delta, now, timeout):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Ключ истёк между add и incr - бакет снова полный
+        cache.add(key, now, timeout)
+        return cache.incr(key, delta)
+
+
+def hit(name, ident, limit):
+    """
+    Забирает один токен из бакета. Возвращает (разрешено, через сколько секунд
+    появится следующий токен).
+    """
+    cache = caches[RATE_LIMIT_CACHE]
+    key = f'{_KEY_PREFIX}:{name}:{ident}'
+    now = int(time.time() * 1000)
+    interval = limit.period * 1000 // limit.rate
+    tolerance = limit.burst * interval
+    timeout = math.ceil(tolerance / 1000) + 1
+
+    cache.add(key, now, timeout)
+    tat = _incr(cache, key, interval, now, timeout)
+    if tat - interval < now:
+        # Бакет простаивал: отсчёт идёт от текущего момента, а не от прошлого запроса
+        tat = _incr(cache, key, now + interval - tat, now, timeout)
+
+    if tat - now > tolerance:
+        cache.decr(key, interval)
+        return False, max(1, math.ceil((tat - now - tolerance) / 1000))
+
+    # Ключ живёт, пока бакет не наполнится снова
+    cache.touch(key, math.ceil((tat - now) / 1000) + 1)
+    return True, 0
+
+
+def _count(name, outcome):
+    cache = caches[RATE_LIMIT_CACHE]
+    key = f'{_KEY_PREFIX}:stats:{name}:{outcome}'
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def stats():
+    """{'contact': {'allowed': 10, 'blocked': 2}, ...} по всем объявленным ограничениям"""
+    cache = caches[RATE_LIMIT_CACHE]
+    keys = {
+        (name, outcome): f'{_KEY_PREFIX}:stats:{name}:{outcome}'
+        for name in sorted(registry)
+        for outcome in ('allowed', 'blocked')
+    }
+    values = cache.get_many(keys.values())
+    result = {name: {'allowed': 0, 'blocked': 0} for name in sorted(registry)}
+    for (name, outcome), key in keys.items():
+        result[name][outcome] = values.get(key, 0)
+    return result
+
+
+def reset_stats():
+    caches[RATE_LIMIT_CACHE].delete_many([
+        f'{_KEY_PREFIX}:stats:{name}:{outcome}'
+        for name in registry
+        for outcome in ('allowed', 'blocked')
+    ])
+
+
+def _too_many_requests(request, retry_after, as_json):
+    message = _('Слишком много запросов. Повторите попытку через %(seconds)s с.') % {'seconds': retry_after}
+    if as_json:
+        response = JsonResponse({'success': False, 'message': message}, status=429)
+    else:
+        response = HttpResponse(message, status=429, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(name, rate, burst=None, key='ip', methods=('POST',), as_json=False):
+    """
+    Декоратор представления: не больше rate запросов (с запасом burst) на ключ.
+    Запросы с методами не из methods не ограничиваются (например, показ формы).
+    Несколько представлений с одним name делят общий бакет.
+    """
+    limit = parse_rate(RATE_LIMITS.get(name, rate), burst)
+    registry[name] = limit
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not RATE_LIMIT_ENABLED or request.method not in methods:
+                return view(request, *args, **kwargs)
+            try:
+                allowed, retry_after = hit(name, request_key(request, key), limit)
+                _count(name, 'allowed' if allowed else 'blocked')
+            except Exception:
+                # Недоступный кэш не должен ронять сайт - пропускаем запрос
+                allowed = True
+            if not allowed:
+                return _too_many_requests(request, retry_after, as_json)
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
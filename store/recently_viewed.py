@@ -0,0 +1,62 @@
+"""
+Недавно просмотренные товары.
+
+Последние RECENTLY_VIEWED_SIZE просмотренных товаров хранятся в подписанной
+cookie как строка id через точку, новые - первыми: "17.4.230:<подпись>".
+Просмотр страницы товара в БД ничего не пишет. При переполнении самый
+старый id вытесняется, повторный просмотр переносит товар в начало.
+
+Блок "Вы смотрели" загружает все товары одним запросом in_bulk с фильтром
+is_available - неактивные и закончившиеся товары просто не возвращаются,
+порядок берётся из cookie.
+"""
+from django.conf import settings
+from django.core import signing
+
+from .models import Product
+from .pricing import with_prices
+
+RECENTLY_VIEWED_COOKIE_NAME = getattr(settings, 'RECENTLY_VIEWED_COOKIE_NAME', 'viewed')
+RECENTLY_VIEWED_SIZE = getattr(settings, 'RECENTLY_VIEWED_SIZE', 12)
+RECENTLY_VIEWED_COOKIE_DAYS = 90
+
+_signer = signing.Signer(salt='store.recently_viewed')
+
+
+def get_viewed_ids(request):
+    """id просмотренных товаров, последний просмотренный - первым"""
+    value = request.COOKIES.get(RECENTLY_VIEWED_COOKIE_NAME)
+    if not value:
+        return []
+    try:
+        product_ids = [int(product_id) for product_id in _signer.unsign(value).split('.')]
+    except (signing.BadSignature, ValueError):
+        # Подделанная или повреждённая cookie - история пуста
+        return []
+    return list(dict.fromkeys(product_ids))[:RECENTLY_VIEWED_SIZE]
+
+
+def remember_view(request, response, product_id):
+    """Записывает просмотр товара в cookie ответа (если порядок изменился)"""
+    product_ids = get_viewed_ids(request)
+    if product_ids[:1] == [product_id]:
+        return response
+    product_ids = [product_id, *(pk for pk in product_ids if pk != product_id)][:RECENTLY_VIEWED_SIZE]
+    response.set_cookie(
+        RECENTLY_VIEWED_COOKIE_NAME,
+        _signer.sign('.'.join(map(str, product_ids))),
+        max_age=RECENTLY_VIEWED_COOKIE_DAYS * 86400,
+        httponly=True,
+        samesite='Lax',
+        secure=getattr(settings, 'SESSION_COOKIE_SECURE', False),
+    )
+    return response
+
+
+def get_viewed_products(request, region, exclude=None, limit=None):
+    """Недавно просмотренные товары с ценами региона - одним запросом"""
+    product_ids = [pk for pk in get_viewed_ids(request) if pk != exclude][:limit]
+    if not product_ids:
+        return []
+    products = with_prices(Product.objects.filter(is_available=True).exclude(slug=''), region).in_bulk(product_ids)
+    return [products[pk] for pk in product_ids if pk in products]
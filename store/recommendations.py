@@ -0,0 +1,199 @@
+"""
+Рекомендации "Похожие товары" для product_detail.
+
+Похожесть считается офлайн (команда build_recommendations) из двух источников:
+- совместные покупки: товары, встречающиеся в одних и тех же заказах
+  (OrderItem и архив ArchivedOrderItem);
+- общие характеристики: совпадающие пары (название, значение) в ProductAttribute.
+
+Совместные покупки - разреженная матрица: словарь счётчиков
+{product_id: {other_id: count}}. Попарную матрицу характеристик на больших
+каталогах в памяти не держим: строится обратный индекс "характеристика ->
+товары", и соседи по характеристикам считаются для одного товара за раз.
+Нормировка в обоих случаях косинусная. Для каждого товара сохраняются top-K
+соседей в ProductRecommendation (записываются пачками по мере расчёта), и
+страница товара читает их одним индексированным запросом.
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import chain
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import ArchivedOrderItem, OrderItem, Product, ProductAttribute, ProductRecommendation
+
+# Количество соседей, сохраняемых для каждого товара
+DEFAULT_TOP_K = 12
+# Вес совместных покупок относительно совпадения характеристик
+COPURCHASE_WEIGHT = 0.7
+ATTRIBUTE_WEIGHT = 0.3
+# Характеристики, встречающиеся у большего числа товаров, не различают товары
+# (например, "Гарантия: 12 месяцев"); время расчёта растёт пропорционально этому порогу
+MAX_PRODUCTS_PER_ATTRIBUTE = getattr(settings, 'RECOMMENDATIONS_MAX_PRODUCTS_PER_ATTRIBUTE', 500)
+
+
+def _cosine(pair_counts, totals):
+    """Нормирует попарные счётчики: w(i, j) / sqrt(n_i * n_j)"""
+    similarity = defaultdict(dict)
+    for i, neighbours in pair_counts.items():
+        for j, count in neighbours.items():
+            similarity[i][j] = count / math.sqrt(totals[i] * totals[j])
+    return similarity
+
+
+def copurchase_similarity():
+    """Косинусная похожесть товаров по совместным покупкам (отменённые заказы не учитываются)"""
+    # Архивные заказы (archive.py) тоже история покупок; номера заказов в таблицах не пересекаются
+    items = chain(*(
+        model.objects.exclude(order__status='cancelled')
+        .filter(product__isnull=False)
+        .order_by('order_id')
+        .values_list('order_id', 'product_id')
+        .iterator(chunk_size=5000)
+        for model in (OrderItem, ArchivedOrderItem)
+    ))
+    pair_counts = defaultdict(Counter)
+    totals = Counter()
+
+    def flush(basket):
+        for i in basket:
+            totals[i] += 1
+            for j in basket:
+                if i != j:
+                    pair_counts[i][j] += 1
+
+    current_order, basket = None, set()
+    for order_id, product_id in items:
+        if order_id != current_order:
+            flush(basket)
+            current_order, basket = order_id, set()
+        basket.add(product_id)
+    flush(basket)
+
+    return _cosine(pair_counts, totals)
+
+
+class AttributeIndex:
+    """
+    Обратный индекс совпадающих характеристик с IDF-весами.
+    Память - O(строк ProductAttribute), а не O(пар товаров).
+    """
+
+    def __init__(self, max_products=None):
+        max_products = max_products or MAX_PRODUCTS_PER_ATTRIBUTE
+        rows = (
+            ProductAttribute.objects.order_by()
+            .values_list('product_id', 'name_ru', 'value_ru')
+            .iterator(chunk_size=5000)
+        )
+        products_by_feature = defaultdict(set)
+        for product_id, name, value in rows:
+            feature = (name.strip().casefold(), value.strip().casefold())
+            products_by_feature[feature].add(product_id)
+
+        product_count = Product.objects.count() or 1
+        weights = {}
+        self.features = defaultdict(list)
+        norms = Counter()
+        for feature, products in products_by_feature.items():
+            if len(products) < 2 or len(products) > max_products:
+                continue
+            idf = math.log(1 + product_count / len(products))
+            weights[feature] = idf * idf
+            for product_id in products:
+                self.features[product_id].append(feature)
+                norms[product_id] += weights[feature]
+        self.inverse_norms = {product_id: 1 / math.sqrt(norm) for product_id, norm in norms.items()}
+
+        # Для признака - товары и их вклады weight / sqrt(n_j): нормировка по соседу
+        # делается один раз здесь, а не для каждой пары
+        self.products = {}
+        for feature, weight in weights.items():
+            products = tuple(products_by_feature[feature])
+            self.products[feature] = (
+                products, tuple(weight * self.inverse_norms[product_id] for product_id in products)
+            )
+
+    def similar(self, product_id):
+        """
+        (scale, {other_id: вклад}) для одного товара;
+        косинусная похожесть с other_id равна scale * вклад
+        """
+        # Самый горячий цикл расчёта: dict.get заметно быстрее Counter
+        scores = {}
+        get = scores.get
+        for feature in self.features.get(product_id, ()):
+            for other_id, value in zip(*self.products[feature]):
+                scores[other_id] = get(other_id, 0.0) + value
+        scores.pop(product_id, None)
+        return self.inverse_norms.get(product_id, 1.0), scores
+
+
+def _top(scores, top_k):
+    """top_k пар (id, оценка) по убыванию оценки, при равенстве - меньший id"""
+    items = scores.items()
+    if len(scores) > top_k:
+        # Порог по одним значениям дешевле, чем ключ-функция для тысяч кандидатов
+        threshold = heapq.nlargest(top_k, scores.values())[-1]
+        items = [item for item in items if item[1] >= threshold]
+    return heapq.nlargest(top_k, items, key=lambda item: (item[1], -item[0]))
+
+
+def build_recommendations(top_k=DEFAULT_TOP_K, batch_size=1000, max_products_per_attribute=None):
+    """
+    Пересчитывает таблицу ProductRecommendation целиком.
+    Товары обрабатываются по одному: в памяти - матрица совместных покупок,
+    индекс характеристик и не больше batch_size товаров с их top-K.
+    Возвращает количество товаров, для которых найдены соседи.
+    """
+    copurchase = copurchase_similarity()
+    attributes = AttributeIndex(max_products_per_attribute)
+
+    product_ids = sorted(set(copurchase) | set(attributes.features))
+    products_count = 0
+    with transaction.atomic():
+        ProductRecommendation.objects.all().delete()
+        for offset in range(0, len(product_ids), batch_size):
+            rows = []
+            for product_id in product_ids[offset:offset + batch_size]:
+                # Оценки считаются в масштабе вкладов характеристик и приводятся к итоговым только для top-K
+                scale, scores = attributes.similar(product_id)
+                scale *= ATTRIBUTE_WEIGHT
+                for j, value in copurchase.get(product_id, {}).items():
+                    scores[j] = scores.get(j, 0.0) + COPURCHASE_WEIGHT * value / scale
+                best = _top(scores, top_k)
+                products_count += bool(best)
+                rows.extend(
+                    ProductRecommendation(
+                        product_id=product_id, recommended_id=recommended_id, score=score * scale, rank=rank
+                    )
+                    for rank, (recommended_id, score) in enumerate(best)
+                )
+            ProductRecommendation.objects.bulk_create(rows, batch_size=batch_size)
+
+    return products_count
+
+
+def get_related_products(product, limit=8):
+    """
+    Похожие товары для страницы товара: предрассчитанные соседи одним запросом
+    по индексу (product, rank), а для товаров без истории ("холодный старт") -
+    товары той же категории, как раньше.
+    """
+    related = list(
+        Product.objects.filter(
+            recommended_for__product=product,
+            is_available=True,
+        )
+        .exclude(slug='')
+        .order_by('recommended_for__rank')[:limit]
+    )
+    if related:
+        return related
+    return list(
+        Product.objects.filter(category=product.category, is_available=True)
+        .exclude(id=product.id)
+        .exclude(slug='')[:limit]
+    )
@@ -0,0 +1,99 @@
+"""
+Рейтинг продаж (блок "Хиты продаж" на главной).
+
+Product.sales_7d / sales_30d / sales_90d хранят проданное количество за
+скользящие окна. При оформлении заказа счётчики увеличиваются атомарно
+через F(), при отмене заказа уменьшаются (и снова увеличиваются при возврате
+из отмены - через sales_rollups.status_changed), а окна "сдвигаются"
+командой rebuild_sales_rank, которая
+пересчитывает их из OrderItem одним агрегирующим запросом
+(отменённые заказы не учитываются). Команду достаточно запускать раз в сутки.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import OrderItem, Product
+
+SALES_WINDOWS = {
+    'sales_7d': 7,
+    'sales_30d': 30,
+    'sales_90d': 90,
+}
+
+
+def bestsellers_queryset():
+    """Хиты продаж: один запрос по индексу (-sales_30d, -sales_90d, -id) без сортировки в памяти"""
+    return (
+        Product.objects.filter(is_available=True)
+        .exclude(slug='')
+        .order_by('-sales_30d', '-sales_90d', '-pk')
+    )
+
+
+def record_sale(quantities):
+    """
+    Увеличивает счётчики продаж при оформлении заказа.
+    quantities - словарь {product_id: количество}.
+    """
+    for product_id, quantity in quantities.items():
+        Product.objects.filter(pk=product_id).update(
+            **{field: F(field) + quantity for field in SALES_WINDOWS}
+        )
+
+
+def order_status_changed(order, sign):
+    """
+    Убирает отменённый заказ из счётчиков (sign=-1) или возвращает его (sign=1).
+    Меняются только окна, в которые заказ ещё попадает; счётчики не опускаются ниже нуля.
+    """
+    age = timezone.now() - order.created_at
+    fields = [field for field, days in SALES_WINDOWS.items() if age <= timedelta(days=days)]
+    if not fields:
+        return
+    rows = OrderItem.objects.filter(order=order).values('product_id').annotate(quantity=Sum('quantity')).order_by()
+    for row in rows:
+        Product.objects.filter(pk=row['product_id']).update(
+            **{field: Greatest(F(field) + sign * row['quantity'], 0) for field in fields}
+        )
+
+
+def rebuild_sales_counters(batch_size=1000):
+    """
+    Пересчитывает счётчики всех товаров из истории заказов.
+    Возвращает количество товаров с ненулевыми продажами.
+    """
+    now = timezone.now()
+    longest = max(SALES_WINDOWS.values())
+    aggregates = {
+        field: Sum('quantity', filter=Q(order__created_at__gte=now - timedelta(days=days)))
+        for field, days in SALES_WINDOWS.items()
+    }
+    rows = (
+        OrderItem.objects.filter(order__created_at__gte=now - timedelta(days=longest))
+        .exclude(order__status='cancelled')
+        .values('product_id')
+        .annotate(**aggregates)
+        .order_by()
+    )
+    counters = {row['product_id']: {field: row[field] or 0 for field in SALES_WINDOWS} for row in rows}
+
+    with transaction.atomic():
+        # Сначала обнуляем все ненулевые счётчики, затем записываем актуальные
+        stale = Q()
+        for field in SALES_WINDOWS:
+            stale |= Q(**{f'{field}__gt': 0})
+        Product.objects.filter(stale).update(**{field: 0 for field in SALES_WINDOWS})
+
+        products = []
+        for product_id, values in counters.items():
+            product = Product(pk=product_id)
+            for field in SALES_WINDOWS:
+                setattr(product, field, values[field])
+            products.append(product)
+        Product.objects.bulk_update(products, list(SALES_WINDOWS), batch_size=batch_size)
+
+    return len(counters)
@@ -0,0 +1,227 @@
+"""
+Дневные сводки продаж для аналитики.
+
+Три таблицы: продажи за день по товару (DailyProductSales), по категории
+(DailyCategorySales) и по городу доставки (DailyCitySales), отдельно по
+каждой валюте заказа. Отменённые заказы не учитываются.
+
+Сводки поддерживаются инкрементально: при оформлении заказа (record_order)
+значения увеличиваются через F(), при отмене заказа уменьшаются, при
+возврате из отмены снова увеличиваются (сигналы Order и действия
+админ-панели через update_status). Архивирование заказов (archive.py) сводки
+не затрагивает. Команда rebuild_sales_rollups пересчитывает их за период
+из Order и ArchivedOrder - для заполнения истории и после массовых изменений
+в обход ORM (bulk_create, queryset.update()).
+
+Отчёт "Продажи" в админ-панели читает только сводки, поэтому его стоимость
+зависит от количества дней в периоде, а не от количества заказов.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import sales_rank
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, DailyCategorySales, DailyCitySales, DailyProductSales,
+    Order, OrderItem,
+)
+
+# Заказы с этим статусом не входят в продажи
+EXCLUDED_STATUS = 'cancelled'
+
+ROLLUP_MODELS = (DailyProductSales, DailyCategorySales, DailyCitySales)
+
+
+def is_counted(status):
+    return status != EXCLUDED_STATUS
+
+
+def normalize_city(city):
+    """' ташкент ' и 'Ташкент' - один город"""
+    return ' '.join((city or '').split()).title()[:100] or '-'
+
+
+def _add(model, keys, values):
+    """Прибавляет values к строке сводки с ключом keys, создавая её при необходимости"""
+    increments = {field: F(field) + value for field, value in values.items()}
+    if model.objects.filter(**keys).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **values)
+    except IntegrityError:
+        # Строку успел создать параллельный заказ
+        model.objects.filter(**keys).update(**increments)
+
+
+def apply_order(order, sign=1):
+    """Добавляет заказ в сводки (sign=1) или убирает из них (sign=-1)"""
+    day = timezone.localdate(order.created_at)
+    products = defaultdict(lambda: [0, Decimal(0)])
+    categories = defaultdict(lambda: [0, Decimal(0)])
+    items = OrderItem.objects.filter(order=order).values_list('product_id', 'product__category_id', 'quantity', 'price')
+    for product_id, category_id, quantity, price in items:
+        for totals in (products[product_id], categories[category_id]):
+            totals[0] += quantity
+            totals[1] += price * quantity
+
+    with transaction.atomic():
+        for product_id, (quantity, revenue) in products.items():
+            _add(
+                DailyProductSales,
+                {'date': day, 'product_id': product_id, 'currency': order.currency},
+                {'orders': sign, 'quantity': sign * quantity, 'revenue': sign * revenue},
+            )
+        for category_id, (quantity, revenue) in categories.items():
+            _add(
+                DailyCategorySales,
+                {'date': day, 'category_id': category_id, 'currency': order.currency},
+                {'orders': sign, 'quantity': sign * quantity, 'revenue': sign * revenue},
+            )
+        _add(
+            DailyCitySales,
+            {'date': day, 'city': normalize_city(order.city), 'currency': order.currency},
+            {'orders': sign, 'revenue': sign * order.total_price},
+        )
+
+
+def record_order(order):
+    """Новый заказ: вызывается при оформлении после создания позиций"""
+    if is_counted(order.status):
+        apply_order(order, 1)
+
+
+def status_changed(order, previous_status):
+    """Учитывает смену статуса в отмену и из отмены - в сводках и в рейтинге продаж"""
+    if is_counted(previous_status) != is_counted(order.status):
+        sign = 1 if is_counted(order.status) else -1
+        apply_order(order, sign)
+        sales_rank.order_status_changed(order, sign)
+
+
+def update_status(queryset, status):
+    """
+    queryset.update(status=...) с обновлением сводок (для действий админ-панели).
+    Возвращает количество заказов.
+    """
+    with transaction.atomic():
+        orders = list(queryset.select_for_update())
+        queryset.model.objects.filter(pk__in=[order.pk for order in orders]).update(status=status)
+        for order in orders:
+            previous_status, order.status = order.status, status
+            status_changed(order, previous_status)
+    return len(orders)
+
+
+def _bounds(date_from, date_to):
+    """Границы периода в текущем часовом поясе (как у TruncDate и localdate)"""
+    bounds = {}
+    if date_from:
+        bounds['created_at__gte'] = timezone.make_aware(datetime.combine(date_from, time.min))
+    if date_to:
+        bounds['created_at__lt'] = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    return bounds
+
+
+def _item_rows(item_model, bounds, group_by):
+    revenue = ExpressionWrapper(F('price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    return (
+        item_model.objects.filter(**{f'order__{key}': value for key, value in bounds.items()})
+        .exclude(order__status=EXCLUDED_STATUS)
+        .filter(product__isnull=False)
+        .annotate(day=TruncDate('order__created_at'))
+        .values('day', group_by, 'order__currency')
+        # revenue раньше quantity: иначе F('quantity') ссылается на агрегат, а не на поле
+        .annotate(revenue=Sum(revenue), orders=Count('order', distinct=True), quantity=Sum('quantity'))
+        .order_by()
+    )
+
+
+def rebuild_rollups(date_from=None, date_to=None, batch_size=2000):
+    """
+    Пересчитывает сводки за период (даты включительно, None - без границы)
+    из рабочих и архивных заказов. Возвращает количество строк по таблицам.
+    """
+    bounds = _bounds(date_from, date_to)
+    # Один день может быть частично в архиве: строки из обоих источников суммируются
+    products = defaultdict(lambda: [0, 0, Decimal(0)])
+    categories = defaultdict(lambda: [0, 0, Decimal(0)])
+    cities = defaultdict(lambda: [0, Decimal(0)])
+    for order_model, item_model in ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem)):
+        for rollup, group_by in ((products, 'product_id'), (categories, 'product__category_id')):
+            for row in _item_rows(item_model, bounds, group_by):
+                totals = rollup[(row['day'], row[group_by], row['order__currency'])]
+                totals[0] += row['orders']
+                totals[1] += row['quantity']
+                totals[2] += row['revenue']
+        order_rows = (
+            order_model.objects.filter(**bounds)
+            .exclude(status=EXCLUDED_STATUS)
+            .annotate(day=TruncDate('created_at'))
+            .values('day', 'city', 'currency')
+            .annotate(orders=Count('id'), revenue=Sum('total_price'))
+            .order_by()
+        )
+        for row in order_rows:
+            totals = cities[(row['day'], normalize_city(row['city']), row['currency'])]
+            totals[0] += row['orders']
+            totals[1] += row['revenue']
+
+    date_filter = {}
+    if date_from:
+        date_filter['date__gte'] = date_from
+    if date_to:
+        date_filter['date__lte'] = date_to
+    with transaction.atomic():
+        for model in ROLLUP_MODELS:
+            model.objects.filter(**date_filter).delete()
+        DailyProductSales.objects.bulk_create([
+            DailyProductSales(date=day, product_id=product_id, currency=currency, orders=orders, quantity=quantity, revenue=revenue)
+            for (day, product_id, currency), (orders, quantity, revenue) in products.items()
+        ], batch_size=batch_size)
+        DailyCategorySales.objects.bulk_create([
+            DailyCategorySales(date=day, category_id=category_id, currency=currency, orders=orders, quantity=quantity, revenue=revenue)
+            for (day, category_id, currency), (orders, quantity, revenue) in categories.items()
+        ], batch_size=batch_size)
+        DailyCitySales.objects.bulk_create([
+            DailyCitySales(date=day, city=city, currency=currency, orders=orders, revenue=revenue)
+            for (day, city, currency), (orders, revenue) in cities.items()
+        ], batch_size=batch_size)
+    return {'products': len(products), 'categories': len(categories), 'cities': len(cities)}
+
+
+def sales_report(date_from, date_to, currency, limit=20):
+    """Данные отчёта "Продажи" за период - только из сводок"""
+    period = {'date__gte': date_from, 'date__lte': date_to, 'currency': currency}
+    totals = {'orders': Sum('orders'), 'revenue': Sum('revenue')}
+    by_day = list(
+        DailyCitySales.objects.filter(**period).values('date').annotate(**totals).order_by('date')
+    )
+    return {
+        'by_day': by_day,
+        'total_orders': sum(row['orders'] for row in by_day),
+        'total_revenue': sum((row['revenue'] for row in by_day), Decimal(0)),
+        'categories': list(
+            DailyCategorySales.objects.filter(**period)
+            .values('category_id', 'category__name_ru')
+            .annotate(quantity=Sum('quantity'), **totals)
+            .order_by('-revenue')[:limit]
+        ),
+        'products': list(
+            DailyProductSales.objects.filter(**period)
+            .values('product_id', 'product__name_ru')
+            .annotate(quantity=Sum('quantity'), **totals)
+            .order_by('-revenue')[:limit]
+        ),
+        'cities': list(
+            DailyCitySales.objects.filter(**period)
+            .values('city')
+            .annotate(**totals)
+            .order_by('-revenue')[:limit]
+        ),
+    }
@@ -0,0 +1,277 @@
+"""
+In-memory префиксный индекс для автодополнения поиска.
+
+Индекс строится один раз на воркер из названий товаров и категорий
+(name_ru/en/uz) и хранится в отсортированных массивах по каждому языку.
+Поиск по префиксу - это bisect + короткий линейный проход, без запросов к БД.
+Изменения товаров и категорий применяются инкрементально через сигналы
+(см. signals.py), а полная перестройка раз в SEARCH_INDEX_TTL секунд
+подтягивает изменения, сделанные в других воркерах или через queryset.update().
+
+Перестройка идёт без блокировки индекса: её выполняет один поток, остальные
+в это время ищут по старому индексу (ждут только самую первую сборку).
+Изменения, пришедшие во время сборки, запоминаются и применяются к новому
+индексу при подмене.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.urls import reverse
+
+# Время жизни индекса в секундах, после которого он перестраивается целиком
+SEARCH_INDEX_TTL = getattr(settings, 'SEARCH_INDEX_TTL', 600)
+# Максимальное количество подсказок в ответе
+AUTOCOMPLETE_MAX_RESULTS = getattr(settings, 'AUTOCOMPLETE_MAX_RESULTS', 10)
+
+KIND_CATEGORY = 'category'
+KIND_PRODUCT = 'product'
+
+
+def normalize(text):
+    """Приводит строку к виду, в котором она хранится в индексе"""
+    return ' '.join((text or '').casefold().replace('ё', 'е').split())
+
+
+def _terms(name):
+    """
+    Ключи индекса для названия: полное название и все его "хвосты",
+    начинающиеся с каждого слова ("кухонный стол" -> "кухонный стол", "стол").
+    """
+    words = normalize(name).split(' ')
+    return {' '.join(words[i:]) for i in range(len(words)) if words[i]}
+
+
+def _languages():
+    return [code for code, _name in settings.LANGUAGES]
+
+
+def _localized(row, language):
+    """Название на языке с fallback на русский, как в MultilingualMixin"""
+    return row.get(f'name_{language}') or row.get('name_ru') or ''
+
+
+class PrefixIndex:
+    """
+    Отсортированные массивы пар (term, pk) - отдельно для каждого языка и вида
+    (категории и товары), чтобы подсказки каждого вида набирались независимо.
+
+    Документы (название на каждом языке и slug) лежат отдельно в self._docs,
+    чтобы массивы ключей оставались компактными. Массивы меняются на месте
+    (insort/del), поэтому и поиск, и изменения идут под self._lock.
+    """
+
+    _KINDS = (KIND_CATEGORY, KIND_PRODUCT)
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Перестраивает индекс только один поток
+        self._build_lock = threading.Lock()
+        self._entries = {}
+        self._docs = {}
+        self._built_at = None
+        # Изменения во время перестройки: [(kind, row, indexable)]
+        self._pending = None
+
+    def _is_stale(self):
+        return self._built_at is None or time.monotonic() - self._built_at > SEARCH_INDEX_TTL
+
+    def _rows(self):
+        from .models import Category, Product
+
+        fields = ['id', 'slug'] + [f'name_{code}' for code in _languages()]
+        categories = (
+            Category.objects.exclude(slug='')
+            .values(*fields)
+            .iterator(chunk_size=2000)
+        )
+        for row in categories:
+            yield KIND_CATEGORY, row
+        products = (
+            Product.objects.filter(is_available=True)
+            .exclude(slug='')
+            .values(*fields)
+            .iterator(chunk_size=2000)
+        )
+        for row in products:
+            yield KIND_PRODUCT, row
+
+    def rebuild(self):
+        """Полностью перестраивает индекс из БД; поиск в это время идёт по старому"""
+        with self._build_lock:
+            self._rebuild()
+
+    def _rebuild(self):
+        with self._lock:
+            self._pending = []
+        try:
+            entries = {(code, kind): [] for code in _languages() for kind in self._KINDS}
+            docs = {}
+            for kind, row in self._rows():
+                key = (kind, row['id'])
+                docs[key] = self._make_doc(row)
+                for code in _languages():
+                    entries[(code, kind)].extend(self._doc_entries(row['id'], docs[key], code))
+            for array in entries.values():
+                array.sort()
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._entries = entries
+            self._docs = docs
+            self._built_at = time.monotonic()
+            # Изменения, которые могли не попасть в выборку
+            for kind, row, indexable in pending:
+                self._update_locked(kind, row, indexable)
+
+    def _ensure_built(self):
+        if not self._is_stale():
+            return
+        if self._built_at is None:
+            # Индекса ещё нет - ждём первую сборку
+            with self._build_lock:
+                if self._is_stale():
+                    self._rebuild()
+        elif self._build_lock.acquire(blocking=False):
+            # Индекс устарел: перестраивает один поток, остальные ищут по старому
+            try:
+                if self._is_stale():
+                    self._rebuild()
+            finally:
+                self._build_lock.release()
+
+    @staticmethod
+    def _make_doc(row):
+        doc = {'slug': row['slug']}
+        for code in _languages():
+            doc[code] = _localized(row, code)
+        return doc
+
+    @staticmethod
+    def _doc_entries(pk, doc, language):
+        return [(term, pk) for term in _terms(doc[language])]
+
+    def _remove_locked(self, kind, pk):
+        doc = self._docs.pop((kind, pk), None)
+        if doc is None:
+            return
+        for code in _languages():
+            entries = self._entries.get((code, kind), [])
+            for entry in self._doc_entries(pk, doc, code):
+                i = bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry:
+                    del entries[i]
+
+    def update(self, kind, row, indexable=True):
+        """
+        Инкрементально обновляет один документ.
+        row - словарь с id, slug и name_<lang>; indexable=False только удаляет его.
+        Если индекс ещё не построен, ничего не делает: он соберётся при первом поиске.
+        """
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((kind, row, indexable))
+            if self._built_at is None:
+                return
+            self._update_locked(kind, row, indexable)
+
+    def _update_locked(self, kind, row, indexable):
+        self._remove_locked(kind, row['id'])
+        if not indexable or not row.get('slug'):
+            return
+        doc = self._make_doc(row)
+        self._docs[(kind, row['id'])] = doc
+        for code in _languages():
+            entries = self._entries.get((code, kind))
+            if entries is None:
+                continue
+            for entry in self._doc_entries(row['id'], doc, code):
+                insort(entries, entry)
+
+    def remove(self, kind, pk):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((kind, {'id': pk}, False))
+            self._remove_locked(kind, pk)
+
+    def search(self, query, language, limit=AUTOCOMPLETE_MAX_RESULTS):
+        """
+        Возвращает до limit подсказок [(kind, pk, name, slug)] для префикса query.
+        Категории идут первыми, внутри одного вида - в алфавитном порядке.
+        """
+        prefix = normalize(query)
+        if not prefix or limit <= 0:
+            return []
+        self._ensure_built()
+        if (language, KIND_CATEGORY) not in self._entries:
+            language = 'ru'
+
+        found = []
+        with self._lock:
+            # Категории и товары набираются независимо, не больше limit каждого вида
+            for kind in self._KINDS:
+                found.extend(self._scan_locked(kind, prefix, language, limit - len(found)))
+                if len(found) >= limit:
+                    break
+        return found
+
+    def _scan_locked(self, kind, prefix, language, limit):
+        entries = self._entries.get((language, kind), [])
+        found = []
+        seen = set()
+        i = bisect_left(entries, (prefix,))
+        while i < len(entries) and len(found) < limit:
+            term, pk = entries[i]
+            if not term.startswith(prefix):
+                break
+            i += 1
+            if pk in seen:
+                continue
+            doc = self._docs.get((kind, pk))
+            if doc is None:
+                continue
+            seen.add(pk)
+            found.append((kind, pk, doc.get(language) or doc['ru'], doc['slug']))
+        return found
+
+
+_index = PrefixIndex()
+
+
+def autocomplete(query, language, limit=AUTOCOMPLETE_MAX_RESULTS):
+    """Подсказки для поисковой строки в формате, готовом для JsonResponse"""
+    results = []
+    for kind, pk, name, slug in _index.search(query, language, limit):
+        if kind == KIND_CATEGORY:
+            url = reverse('product_list', args=[slug])
+        else:
+            url = reverse('product_detail', args=[slug])
+        results.append({'type': kind, 'id': pk, 'name': name, 'url': url})
+    return results
+
+
+def _row_from_instance(instance):
+    row = {'id': instance.pk, 'slug': instance.slug}
+    for code in _languages():
+        row[f'name_{code}'] = getattr(instance, f'name_{code}', '')
+    return row
+
+
+def index_category(instance):
+    _index.update(KIND_CATEGORY, _row_from_instance(instance))
+
+
+def index_product(instance):
+    _index.update(KIND_PRODUCT, _row_from_instance(instance), indexable=instance.is_available)
+
+
+def unindex_category(pk):
+    _index.remove(KIND_CATEGORY, pk)
+
+
+def unindex_product(pk):
+    _index.remove(KIND_PRODUCT, pk)
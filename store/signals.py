@@ -1,9 +1,18 @@
-from django.db.models.signals import post_save
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.utils.html import escape
 
-from .models import Order, ContactMessage
+from .models import Order, ContactMessage, Product, ProductAttribute, Category, PriceRegion, FAQ, FAQCategory
 from .telegram_notify import send_telegram_message_bg
+from . import search_index
+from . import inventory
+from . import pricing
+from . import sales_rollups
+from . import compare
+from . import faq
 
 
 def _money(v) -> str:
@@ -58,3 +67,113 @@ def notify_contact_message(sender, instance: ContactMessage, created: bool, **kw
     send_telegram_message_bg(text)
 
 
+# Инкрементальное обновление индекса автодополнения (search_index.py)
+@receiver(post_save, sender=Product)
+def reindex_product(sender, instance: Product, **kwargs):
+    search_index.index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance: Product, **kwargs):
+    search_index.unindex_product(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category(sender, instance: Category, **kwargs):
+    search_index.index_category(instance)
+
+
+@receiver(post_delete, sender=Category)
+def unindex_category(sender, instance: Category, **kwargs):
+    search_index.unindex_category(instance.pk)
+
+
+# Предрассчитанные цены регионов (pricing.py)
+@receiver(post_save, sender=Product)
+def update_regional_prices(sender, instance: Product, update_fields=None, **kwargs):
+    # Обновление остатков и счётчиков не трогает цены
+    if update_fields is not None and not {'price', 'old_price'} & set(update_fields):
+        return
+    pricing.update_product_prices(instance)
+
+
+@receiver(post_save, sender=PriceRegion)
+def rebuild_regional_prices(sender, instance: PriceRegion, **kwargs):
+    pricing.invalidate_regions()
+    if instance.is_active:
+        pricing.rebuild_region_prices(instance)
+
+
+@receiver(post_delete, sender=PriceRegion)
+def forget_price_region(sender, instance: PriceRegion, **kwargs):
+    pricing.invalidate_regions()
+
+
+# Характеристики товара для страницы товара (Product.attributes_data) и таблиц сравнения (compare.py).
+# Пересборка откладывается до конца транзакции: при сохранении товара с инлайнами
+# в админ-панели все изменённые характеристики пересобираются одним проходом.
+_pending_attributes = threading.local()
+
+
+def _rebuild_pending_attributes():
+    product_ids = getattr(_pending_attributes, 'product_ids', None)
+    if not product_ids:
+        # Уже пересобрано предыдущим обработчиком этой транзакции
+        return
+    _pending_attributes.product_ids = set()
+    Product.rebuild_attributes_data(product_ids)
+    compare.invalidate_matrices()
+
+
+@receiver(post_save, sender=ProductAttribute)
+@receiver(post_delete, sender=ProductAttribute)
+def rebuild_product_attributes(sender, instance: ProductAttribute, raw=False, **kwargs):
+    if raw:
+        return
+    _pending_attributes.__dict__.setdefault('product_ids', set()).add(instance.product_id)
+    transaction.on_commit(_rebuild_pending_attributes)
+
+
+# Кэш страницы FAQ (faq.py)
+@receiver(post_save, sender=FAQ)
+@receiver(post_delete, sender=FAQ)
+@receiver(post_save, sender=FAQCategory)
+@receiver(post_delete, sender=FAQCategory)
+def invalidate_faq_cache(sender, instance, **kwargs):
+    faq.invalidate_faq()
+
+
+# Дневные сводки продаж (sales_rollups.py): отмена заказа и возврат из отмены.
+# Новые заказы добавляются в сводки при оформлении, когда уже созданы позиции.
+@receiver(pre_save, sender=Order)
+def remember_order_status(sender, instance: Order, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None or (update_fields is not None and 'status' not in update_fields):
+        return
+    instance._previous_status = Order.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=Order)
+def update_sales_rollups(sender, instance: Order, created: bool, **kwargs):
+    previous_status = instance.__dict__.pop('_previous_status', None)
+    if not created and previous_status is not None:
+        sales_rollups.status_changed(instance, previous_status)
+
+
+# Уведомления о низком остатке и отсутствии товара (inventory.py)
+@receiver(inventory.stock_level_changed)
+def notify_stock_level(sender, product_id, event, stock_before, stock_after, **kwargs):
+    titles = {
+        inventory.EVENT_LOW_STOCK: "⚠️ <b>Заканчивается товар</b>",
+        inventory.EVENT_OUT_OF_STOCK: "⛔️ <b>Товар закончился</b>",
+        inventory.EVENT_BACK_IN_STOCK: "✅ <b>Товар снова в наличии</b>",
+    }
+    name = Product.objects.filter(pk=product_id).values_list('name_ru', flat=True).first()
+    if name is None:
+        return
+
+    text = (
+        f"{titles[event]}\n\n"
+        f"📦 {escape(name)}\n"
+        f"Остаток: <b>{escape(str(stock_before))} → {escape(str(stock_after))}</b>"
+    )
+    send_telegram_message_bg(text)
@@ -4,6 +4,8 @@ from typing import Optional
 
 from django.conf import settings
 
+from . import metrics
+
 try:
     from telebot.async_telebot import AsyncTeleBot
 except Exception:  # pragma: no cover
@@ -77,12 +79,22 @@ def send_telegram_message_bg(text: str) -> None:
     запускает отдельный поток и внутри выполняет asyncio.run(...)
     """
 
+    if not _get_chat_id() or not getattr(settings, "TELEGRAM_BOT_TOKEN", ""):
+        metrics.inc("store_telegram_notifications_total", result="skipped")
+        return
+
     def runner() -> None:
+        ok = False
         try:
-            asyncio.run(send_telegram_message(text))
+            ok = asyncio.run(send_telegram_message(text))
         except Exception:
             pass
+        finally:
+            metrics.gauge_add("store_telegram_queue_depth", -1)
+            metrics.inc("store_telegram_notifications_total", result="sent" if ok else "failed")
 
+    # Очередь - это потоки отправки, ещё не получившие ответ от Telegram
+    metrics.gauge_add("store_telegram_queue_depth", 1)
     t = threading.Thread(target=runner, daemon=True)
     t.start()
 
@@ -0,0 +1,40 @@
+"""
+Вывод цен в валюте региона посетителя.
+
+{% price product %}        - цена товара в регионе
+{% price product 'old' %}  - старая цена товара в регионе
+{% money amount %}         - сумма (уже в валюте региона) с обозначением валюты
+"""
+from django import template
+
+from ..pricing import format_money, get_region, unit_price
+
+register = template.Library()
+
+
+def _region(context):
+    region = context.get('price_region')
+    if region is None:
+        region = get_region(context.request)
+    return region
+
+
+@register.simple_tag(takes_context=True)
+def price(context, product, kind='price'):
+    region = _region(context)
+    if kind == 'old':
+        amount = getattr(product, 'region_old_price', None) if hasattr(product, 'region_price') else region.convert(product.old_price)
+    elif hasattr(product, 'region_price'):
+        amount = unit_price(product)
+    else:
+        # Товар загружен без with_prices/attach_prices - пересчёт по курсу
+        amount = region.convert(product.price)
+    if amount is None:
+        # В прайс-листе региона старая цена не задана
+        return ''
+    return format_money(amount, region)
+
+
+@register.simple_tag(takes_context=True)
+def money(context, amount):
+    return format_money(amount, _region(context))
@@ -5,8 +5,14 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('category/<slug:category_slug>/', views.product_list, name='product_list'),
     path('products/', views.product_list, name='product_list_all'),
+    path('search/autocomplete/', views.search_autocomplete, name='search_autocomplete'),
     path('product/<slug:slug>/', views.product_detail, name='product_detail'),
+    path('product/<slug:slug>/review/', views.add_review, name='add_review'),
+    path('compare/', views.compare_view, name='compare'),
+    path('compare/add/<int:product_id>/', views.compare_add, name='compare_add'),
+    path('compare/remove/<int:product_id>/', views.compare_remove, name='compare_remove'),
     path('cart/', views.cart_view, name='cart'),
+    path('cart/batch/', views.cart_batch, name='cart_batch'),
     path('cart/add/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
     path('cart/update/<int:item_id>/', views.update_cart_item, name='update_cart_item'),
     path('cart/remove/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
@@ -17,5 +23,7 @@ urlpatterns = [
     path('faq/', views.faq_page, name='faq'),
     path('set-language/', views.set_language, name='set_language'),
     path('set-region/', views.set_region, name='set_region'),
+    path('robots.txt', views.robots_txt, name='robots_txt'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
 
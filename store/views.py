@@ -1,51 +1,53 @@
+import json
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.views.decorators.http import require_POST
+from django.db import transaction
 from django.db.models import Q
 from django.utils.translation import activate, get_language, gettext as _
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.urls import translate_url
 from django.core.mail import send_mail
 from django.conf import settings
 from django.contrib import messages
 from .models import (
-    Category, Product, Cart, CartItem, Order, OrderItem,
-    Banner, Sponsor, FAQ, FAQCategory, CompanyInfo, Advantage, ContactMessage
+    Category, Product, Order, OrderItem,
+    Banner, Sponsor, CompanyInfo, Advantage, ContactMessage, ProductReview
 )
-
-
-def get_or_create_cart(request):
-    if not request.session.session_key:
-        request.session.create()
-    
-    # Проверяем существующую корзину и удаляем, если она истекла
-    try:
-        existing_cart = Cart.objects.get(session_key=request.session.session_key)
-        if existing_cart.is_expired():
-            existing_cart.delete()
-            cart, created = Cart.objects.get_or_create(session_key=request.session.session_key)
-        else:
-            cart = existing_cart
-    except Cart.DoesNotExist:
-        cart, created = Cart.objects.get_or_create(session_key=request.session.session_key)
-    
-    return cart
-
-
+from . import compare, faq, metrics, search_index
+from .recommendations import get_related_products
+from .recently_viewed import get_viewed_products, remember_view
+from .sales_rank import bestsellers_queryset, record_sale
+from .sales_rollups import record_order
+from .inventory import InsufficientStock, apply_movement
+from .cart import CartOperationError, get_cart
+from .pricing import attach_prices, format_money, get_region, get_regions, REGION_COOKIE_NAME, with_prices
+from .db_router import replica_reads
+from .ratelimit import rate_limit
+from .feeds import SITEMAP_INDEX, feed_url
+
+
+@replica_reads
 def home(request):
+    region = get_region(request)
     categories = Category.objects.filter(parent=None).exclude(slug='')[:8]
-    featured_products = Product.objects.filter(featured=True, is_active=True, stock__gt=0).exclude(slug='')[:12]
-    latest_products = Product.objects.filter(is_active=True, stock__gt=0).exclude(slug='')[:20]
-    # Хиты продаж - товары с наибольшим рейтингом
-    bestsellers = Product.objects.filter(is_active=True, stock__gt=0).exclude(slug='').order_by('-rating', '-reviews_count')[:12]
+    featured_products = with_prices(Product.objects.filter(featured=True, is_available=True).exclude(slug=''), region)[:12]
+    latest_products = with_prices(Product.objects.filter(is_available=True).exclude(slug=''), region)[:20]
+    # Хиты продаж - по количеству продаж за последние 30 дней
+    bestsellers = with_prices(bestsellers_queryset(), region)[:12]
     banners = Banner.objects.filter(is_active=True)
     sponsors = Sponsor.objects.filter(is_active=True)
     advantages = Advantage.objects.filter(is_active=True)
-    faqs = FAQ.objects.filter(is_active=True)[:6]  # Показываем первые 6 на главной
+    faqs = faq.get_faq(get_language() or 'ru')['items'][:6]  # Показываем первые 6 на главной (из кэша FAQ)
+    # Недавно просмотренные - из cookie, одним запросом
+    recently_viewed = get_viewed_products(request, region, limit=6)
     
     context = {
         'categories': categories,
         'featured_products': featured_products,
         'latest_products': latest_products,
         'bestsellers': bestsellers,
+        'recently_viewed': recently_viewed,
         'banners': banners,
         'sponsors': sponsors,
         'advantages': advantages,
@@ -54,9 +56,11 @@ def home(request):
     return render(request, 'store/home.html', context)
 
 
+@replica_reads
 def product_list(request, category_slug=None):
     category = None
-    products = Product.objects.filter(is_active=True, stock__gt=0).exclude(slug='')
+    # Цена региона присоединяется в том же запросе: фильтр и сортировка идут по ней
+    products = with_prices(Product.objects.filter(is_available=True).exclude(slug=''), get_region(request))
     
     if category_slug:
         category = get_object_or_404(Category, slug=category_slug)
@@ -86,21 +90,21 @@ def product_list(request, category_slug=None):
     price_max = request.GET.get('price_max', '')
     if price_min:
         try:
-            products = products.filter(price__gte=float(price_min))
+            products = products.filter(region_price__gte=float(price_min))
         except ValueError:
             pass
     if price_max:
         try:
-            products = products.filter(price__lte=float(price_max))
+            products = products.filter(region_price__lte=float(price_max))
         except ValueError:
             pass
     
     # Сортировка
     sort_by = request.GET.get('sort', 'newest')
     if sort_by == 'price_low':
-        products = products.order_by('price')
+        products = products.order_by('region_price')
     elif sort_by == 'price_high':
-        products = products.order_by('-price')
+        products = products.order_by('-region_price')
     elif sort_by == 'rating':
         products = products.order_by('-rating')
     else:
@@ -121,134 +125,257 @@ def product_list(request, category_slug=None):
     return render(request, 'store/product_list.html', context)
 
 
+def search_autocomplete(request):
+    """Подсказки для строки поиска из in-memory индекса (без запросов к БД)"""
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = int(request.GET.get('limit', search_index.AUTOCOMPLETE_MAX_RESULTS))
+    except ValueError:
+        limit = search_index.AUTOCOMPLETE_MAX_RESULTS
+    limit = max(1, min(limit, search_index.AUTOCOMPLETE_MAX_RESULTS))
+    
+    results = search_index.autocomplete(query, get_language() or 'ru', limit) if query else []
+    return JsonResponse({'query': query, 'results': results})
+
+
+@replica_reads
 def product_detail(request, slug):
-    product = get_object_or_404(Product, slug=slug, is_active=True, stock__gt=0)
-    related_products = Product.objects.filter(category=product.category, is_active=True, stock__gt=0).exclude(id=product.id).exclude(slug='')[:8]
-    attributes = product.attributes.all()
+    product = get_object_or_404(Product, slug=slug, is_available=True)
+    region = get_region(request)
+    related_products = get_related_products(product, limit=8)
+    attach_prices([product, *related_products], region)
+    recently_viewed = get_viewed_products(request, region, exclude=product.pk, limit=6)
+    # Уже переведённые характеристики из Product.attributes_data - без запроса
+    attributes = product.get_attributes()
+    reviews = product.reviews.filter(status='approved')[:10]
     
     context = {
         'product': product,
         'related_products': related_products,
         'attributes': attributes,
+        'reviews': reviews,
+        'recently_viewed': recently_viewed,
     }
-    return render(request, 'store/product_detail.html', context)
+    # Просмотр запоминается в cookie, без записи в БД
+    return remember_view(request, render(request, 'store/product_detail.html', context), product.pk)
+
+
+@require_POST
+@rate_limit('review', '5/h', burst=3)
+def add_review(request, slug):
+    """Добавление отзыва (публикуется после модерации)"""
+    product = get_object_or_404(Product, slug=slug, is_available=True)
+    name = request.POST.get('name', '').strip()
+    text = request.POST.get('text', '').strip()
+    try:
+        rating = int(request.POST.get('rating', 0))
+    except ValueError:
+        rating = 0
+    
+    if not name or rating not in range(1, 6):
+        messages.error(request, _('Укажите имя и оценку от 1 до 5'))
+        return redirect('product_detail', slug=product.slug)
+    
+    ProductReview.objects.create(
+        product=product,
+        name=name[:100],
+        rating=rating,
+        text=text,
+    )
+    messages.success(request, _('Спасибо! Ваш отзыв появится после проверки модератором.'))
+    return redirect('product_detail', slug=product.slug)
+
+
+def compare_view(request):
+    """Сравнение товаров: товары - одним запросом, таблица характеристик - из кэша или вторым"""
+    product_ids = compare.get_compare_ids(request)
+    products = with_prices(Product.objects.filter(pk__in=product_ids, is_available=True).exclude(slug=''), get_region(request)).in_bulk()
+    # Порядок добавления; удалённые и недоступные товары пропускаются, как в каталоге
+    product_ids = [product_id for product_id in product_ids if product_id in products]
+    context = {
+        'products': [products[product_id] for product_id in product_ids],
+        'matrix': compare.get_matrix(product_ids, get_language() or 'ru') if product_ids else [],
+        'max_products': compare.COMPARE_MAX_PRODUCTS,
+    }
+    return render(request, 'store/compare.html', context)
+
+
+def _compare_redirect(request):
+    next_url = request.POST.get('next', '')
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()):
+        next_url = 'compare'
+    return redirect(next_url)
+
+
+@require_POST
+def compare_add(request, product_id):
+    product = get_object_or_404(Product, pk=product_id, is_available=True)
+    product_ids = compare.get_compare_ids(request)
+    response = _compare_redirect(request)
+    if product.pk in product_ids:
+        return response
+    if len(product_ids) >= compare.COMPARE_MAX_PRODUCTS:
+        messages.warning(request, _('Сравнивать можно не больше %(count)s товаров') % {'count': compare.COMPARE_MAX_PRODUCTS})
+        return response
+    messages.success(request, _('Товар добавлен к сравнению'))
+    return compare.save_compare_ids(response, product_ids + [product.pk])
+
+
+@require_POST
+def compare_remove(request, product_id):
+    product_ids = compare.get_compare_ids(request)
+    response = _compare_redirect(request)
+    return compare.save_compare_ids(response, [pk for pk in product_ids if pk != product_id])
 
 
 def cart_view(request):
-    cart = get_or_create_cart(request)
+    cart = get_cart(request)
     context = {
         'cart': cart,
     }
     return render(request, 'store/cart.html', context)
 
 
+def _cart_json(cart, data, status=200):
+    """JSON-ответ корзины; cookie-хранилище дописывает в него обновлённую cookie"""
+    if 'cart_total' in data:
+        # Суммы - в валюте региона покупателя
+        data['currency_label'] = cart.region.currency_label
+    return cart.save(JsonResponse(data, status=status))
+
+
+def _cart_error(error):
+    metrics.inc('store_cart_errors_total', status=str(error.status))
+    data = {'success': False, 'message': error.message}
+    if error.index is not None:
+        data['index'] = error.index
+    if error.max_quantity is not None:
+        data['max_quantity'] = error.max_quantity
+    return JsonResponse(data, status=error.status)
+
+
+def _apply_single(request, operation):
+    """Применяет одну операцию через пакетный API; отсутствующая позиция - 404, как раньше"""
+    cart = get_cart(request)
+    try:
+        cart.apply([operation])
+    except CartOperationError as error:
+        if error.status == 404:
+            metrics.inc('store_cart_errors_total', status='404')
+            raise Http404(error.message)
+        return cart, _cart_error(error)
+    return cart, None
+
+
+# Общий лимит для всех изменений корзины
+cart_rate_limit = rate_limit('cart', '60/m', burst=30, key='session', as_json=True)
+
+
+@cart_rate_limit
 @require_POST
-def add_to_cart(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
+def cart_batch(request):
+    """
+    Пакетное изменение корзины: {"operations": [{"op": "add"|"set"|"remove", ...}]}.
+    Все операции применяются в одной транзакции, итоги считаются один раз.
+    """
+    try:
+        payload = json.loads(request.body or b'{}')
+        operations = payload['operations']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'message': _('Неверный формат запроса')}, status=400)
     
-    # Проверяем наличие товара на складе
-    if product.stock <= 0:
-        return JsonResponse({
-            'success': False,
-            'message': _('Товар отсутствует на складе')
-        }, status=400)
+    cart = get_cart(request)
+    try:
+        cart.apply(operations)
+    except CartOperationError as error:
+        return _cart_error(error)
     
+    return _cart_json(cart, {
+        'success': True,
+        'cart_items_count': cart.total_items,
+        'cart_total': float(cart.total_price),
+        'items': [
+            {
+                'item_id': line.id,
+                'product_id': line.product_id,
+                'quantity': line.quantity,
+                'item_total': float(line.total_price),
+                'max_quantity': line.product.stock,
+            }
+            for line in cart.lines
+        ],
+    })
+
+
+@cart_rate_limit
+@require_POST
+def add_to_cart(request, product_id):
     # Получаем количество из POST (если передано, иначе 1)
     requested_quantity = int(request.POST.get('quantity', 1))
     if requested_quantity <= 0:
         requested_quantity = 1
     
-    cart = get_or_create_cart(request)
-    
-    cart_item, created = CartItem.objects.get_or_create(
-        cart=cart,
-        product=product,
-        defaults={'quantity': requested_quantity}
-    )
-    
-    if not created:
-        # Проверяем, не превышает ли новое количество остаток на складе
-        new_quantity = cart_item.quantity + requested_quantity
-        if new_quantity > product.stock:
-            return JsonResponse({
-                'success': False,
-                'message': _('На складе доступно только %(stock)s шт. этого товара. В корзине уже %(quantity)s шт.') % {
-                    'stock': product.stock,
-                    'quantity': cart_item.quantity
-                }
-            }, status=400)
-        cart_item.quantity = new_quantity
-        cart_item.save()
-    else:
-        # Если товар только что добавлен, проверяем запрошенное количество
-        if requested_quantity > product.stock:
-            cart_item.delete()  # Удаляем, если количество превышает stock
-            return JsonResponse({
-                'success': False,
-                'message': _('На складе доступно только %(stock)s шт. этого товара') % {'stock': product.stock}
-            }, status=400)
+    cart, error_response = _apply_single(request, {
+        'op': 'add',
+        'product_id': product_id,
+        'quantity': requested_quantity,
+    })
+    if error_response:
+        return error_response
     
-    return JsonResponse({
+    return _cart_json(cart, {
         'success': True,
         'cart_items_count': cart.total_items,
         'message': _('Товар добавлен в корзину')
     })
 
 
+@cart_rate_limit
 @require_POST
 def update_cart_item(request, item_id):
-    cart_item = get_object_or_404(CartItem, id=item_id)
     quantity = int(request.POST.get('quantity', 1))
+    cart, error_response = _apply_single(request, {
+        'op': 'set',
+        'item_id': item_id,
+        'quantity': quantity,
+    })
+    if error_response:
+        return error_response
     
-    if quantity <= 0:
-        cart_item.delete()
-        cart = cart_item.cart
-        return JsonResponse({
-            'success': True,
-            'cart_items_count': cart.total_items,
-            'cart_total': float(cart.total_price),
-            'item_total': 0
-        })
-    
-    # Проверяем, не превышает ли количество остаток на складе
-    if quantity > cart_item.product.stock:
-        return JsonResponse({
-            'success': False,
-            'message': _('На складе доступно только %(stock)s шт. этого товара') % {'stock': cart_item.product.stock},
-            'max_quantity': cart_item.product.stock
-        }, status=400)
-    
-    cart_item.quantity = quantity
-    cart_item.save()
-    
-    cart = cart_item.cart
-    return JsonResponse({
+    data = {
         'success': True,
         'cart_items_count': cart.total_items,
         'cart_total': float(cart.total_price),
-        'item_total': float(cart_item.total_price),
-        'max_quantity': cart_item.product.stock
-    })
+        'item_total': 0
+    }
+    cart_item = cart.get_line(item_id)
+    if cart_item is not None:
+        data['item_total'] = float(cart_item.total_price)
+        data['max_quantity'] = cart_item.product.stock
+    return _cart_json(cart, data)
 
 
+@cart_rate_limit
 @require_POST
 def remove_from_cart(request, item_id):
-    cart_item = get_object_or_404(CartItem, id=item_id)
-    cart = cart_item.cart
-    cart_item.delete()
+    cart, error_response = _apply_single(request, {'op': 'remove', 'item_id': item_id})
+    if error_response:
+        return error_response
     
-    return JsonResponse({
+    return _cart_json(cart, {
         'success': True,
         'cart_items_count': cart.total_items,
         'cart_total': float(cart.total_price)
     })
 
 
+# Оформление заказа и форма обратной связи отправляют письма и уведомления в Telegram
+@rate_limit('checkout', '10/h', burst=5)
 def checkout(request):
-    cart = get_or_create_cart(request)
+    cart = get_cart(request)
     company_info = CompanyInfo.load()
     
-    if cart.items.count() == 0:
+    if cart.is_empty():
         return redirect('cart')
     
     if request.method == 'POST':
@@ -270,35 +397,57 @@ def checkout(request):
                     'requested': item['requested'],
                     'available': item['available']
                 } + '\n'
+            metrics.inc('store_checkout_total', result='unavailable')
             messages.error(request, error_message)
             return redirect('cart')
         
-        order = Order.objects.create(
-            session_key=request.session.session_key,
-            first_name=request.POST.get('first_name'),
-            last_name=request.POST.get('last_name'),
-            email=request.POST.get('email'),
-            phone=request.POST.get('phone'),
-            address=request.POST.get('address'),
-            city=request.POST.get('city'),
-            postal_code=request.POST.get('postal_code'),
-            comment=request.POST.get('comment', ''),
-            total_price=cart.total_price
-        )
+        try:
+            with transaction.atomic():
+                # Позиции cookie-корзины попадают в БД только здесь (и откатываются вместе с заказом)
+                cart_model = cart.materialize()
+                order = Order.objects.create(
+                    session_key=request.session.session_key or '',
+                    first_name=request.POST.get('first_name'),
+                    last_name=request.POST.get('last_name'),
+                    email=request.POST.get('email'),
+                    phone=request.POST.get('phone'),
+                    address=request.POST.get('address'),
+                    city=request.POST.get('city'),
+                    postal_code=request.POST.get('postal_code'),
+                    comment=request.POST.get('comment', ''),
+                    total_price=cart.total_price,
+                    currency=cart.region.currency
+                )
+                
+                order_items_text = []
+                sold_quantities = {}
+                # Цены позиций - в регионе покупателя, как они были показаны в корзине
+                for cart_item in cart.lines:
+                    OrderItem.objects.create(
+                        order=order,
+                        product=cart_item.product,
+                        quantity=cart_item.quantity,
+                        price=cart_item.unit_price
+                    )
+                    order_items_text.append(f"{cart_item.product.get_name()} x{cart_item.quantity} - {format_money(cart_item.unit_price, cart.region)}")
+                    sold_quantities[cart_item.product_id] = cart_item.quantity
+                    
+                    # Списываем остаток через журнал движений (с проверкой остатка в том же UPDATE)
+                    apply_movement(cart_item.product_id, -cart_item.quantity, 'checkout', order=order)
+                
+                # Обновляем счётчики продаж для блока "Хиты продаж"
+                record_sale(sold_quantities)
+                # И дневные сводки продаж для отчётов
+                record_order(order)
+        except InsufficientStock:
+            # Остаток успел измениться между проверкой и списанием - заказ откатывается целиком
+            metrics.inc('store_checkout_total', result='out_of_stock')
+            messages.error(request, _('Остаток товара изменился во время оформления заказа. Проверьте корзину.'))
+            return redirect('cart')
         
-        order_items_text = []
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price
-            )
-            order_items_text.append(f"{cart_item.product.get_name()} x{cart_item.quantity} - {cart_item.product.price} сум")
-            
-            # Уменьшаем остаток на складе
-            cart_item.product.stock -= cart_item.quantity
-            cart_item.product.save(update_fields=['stock'])
+        metrics.inc('store_checkout_total', result='success')
+        metrics.inc('store_orders_total')
+        metrics.inc('store_order_value_total', float(order.total_price), currency=order.currency)
         
         # Отправка email уведомления
         try:
@@ -317,7 +466,7 @@ Email: {order.email}
 Товары:
 {chr(10).join(order_items_text)}
 
-Общая сумма: {order.total_price} сум
+Общая сумма: {format_money(order.total_price, cart.region)}
 """
             recipient_email = company_info.email if company_info else 'noreply@shopeexpress.com'
             send_mail(
@@ -351,7 +500,7 @@ Email: {order.email}
 {chr(10).join(order_items_text)}
 {comment_text}
 
-💰 Сумма: {order.total_price} сум
+💰 Сумма: {format_money(order.total_price, cart.region)}
 """
                 requests.post(
                     f'https://api.telegram.org/bot{telegram_bot_token}/sendMessage',
@@ -361,12 +510,14 @@ Email: {order.email}
                         'parse_mode': 'HTML'
                     },
                     timeout=5
-                )
+                ).raise_for_status()
+                metrics.inc('store_telegram_notifications_total', result='sent')
         except Exception:
-            pass
+            metrics.inc('store_telegram_notifications_total', result='failed')
         
-        cart.delete()
-        return redirect('order_success', order_id=order.id)
+        cart_model.delete()
+        cart.clear()
+        return cart.save(redirect('order_success', order_id=order.id))
     
     context = {
         'cart': cart,
@@ -380,44 +531,60 @@ def order_success(request, order_id):
 
 
 def set_language(request):
-    """Переключение языка с использованием стандартного Django подхода"""
-    from django.utils import translation
+    """
+    Переключение языка. Выбор хранится только в cookie: сессия не создаётся,
+    а LocaleMiddleware определяет язык по префиксу URL или по этой cookie.
+    """
+    next_url = request.POST.get('next', request.META.get('HTTP_REFERER', '/'))
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()):
+        next_url = '/'
     
     if request.method == 'POST':
         language = request.POST.get('language', 'ru')
         # Проверяем, что язык поддерживается
         if language in [lang[0] for lang in settings.LANGUAGES]:
-            # Активируем язык для текущего запроса
-            translation.activate(language)
-            # Сохраняем язык в сессии (стандартный ключ для LocaleMiddleware)
-            request.session['django_language'] = language
-            # Создаем ответ с редиректом
-            next_url = request.POST.get('next', request.META.get('HTTP_REFERER', '/'))
-            response = redirect(next_url)
-            # Устанавливаем cookie с языком
+            # При включённых языковых префиксах URL (I18N_URL_PREFIX) возвращаемся на ту же страницу на новом языке
+            response = redirect(translate_url(next_url, language))
             response.set_cookie(
                 settings.LANGUAGE_COOKIE_NAME, 
                 language, 
                 max_age=365*24*60*60,  # 1 год
                 path=settings.LANGUAGE_COOKIE_PATH,
+                secure=settings.LANGUAGE_COOKIE_SECURE,
+                httponly=settings.LANGUAGE_COOKIE_HTTPONLY,
                 samesite=settings.LANGUAGE_COOKIE_SAMESITE
             )
             return response
-    return redirect(request.META.get('HTTP_REFERER', '/'))
+    return redirect(next_url)
 
 
 def set_region(request):
+    """Выбор региона цен (валюты). Как и язык, хранится только в cookie"""
+    next_url = request.POST.get('next', request.META.get('HTTP_REFERER', '/'))
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()):
+        next_url = '/'
+    
+    response = redirect(next_url)
     if request.method == 'POST':
-        region = request.POST.get('region', 'RU')
-        request.session['region'] = region
-    return redirect(request.META.get('HTTP_REFERER', '/'))
+        code = request.POST.get('region', '')
+        if any(region.code == code for region in get_regions()):
+            response.set_cookie(
+                REGION_COOKIE_NAME,
+                code,
+                max_age=365*24*60*60,  # 1 год
+                secure=settings.SESSION_COOKIE_SECURE,
+                samesite='Lax'
+            )
+    return response
 
 
+@replica_reads
 def about(request):
     company_info = CompanyInfo.load()
     return render(request, 'store/about.html', {'company_info': company_info})
 
 
+@rate_limit('contact', '5/10m', burst=3)
 def contact(request):
     company_info = CompanyInfo.load()
     
@@ -464,17 +631,48 @@ def contact(request):
     return render(request, 'store/contact.html', context)
 
 
+@replica_reads
 def faq_page(request):
-    categories = FAQCategory.objects.all()
-    faqs = FAQ.objects.filter(is_active=True)
-    category_id = request.GET.get('category')
-    
-    if category_id:
-        faqs = faqs.filter(category_id=category_id)
+    """
+    Все активные вопросы из кэша (см. faq.py). Выбранная категория только скрывает
+    остальные вопросы - переключение категорий и поиск работают в браузере.
+    """
+    data = faq.get_faq(get_language() or 'ru')
+    category_ids = {category['id'] for category in data['categories']}
+    try:
+        selected_category = int(request.GET.get('category', ''))
+    except ValueError:
+        selected_category = None
+    if selected_category not in category_ids:
+        selected_category = None
     
     context = {
-        'categories': categories,
-        'faqs': faqs,
-        'selected_category': int(category_id) if category_id else None,
+        'categories': data['categories'],
+        'faqs': data['items'],
+        'faq_index': faq.search_index(data),
+        'selected_category': selected_category,
     }
     return render(request, 'store/faq.html', context)
+
+
+def robots_txt(request):
+    """robots.txt: карта сайта вместо обхода каталога со всеми фильтрами и сортировками"""
+    lines = [
+        'User-agent: *',
+        'Disallow: /admin/',
+        'Disallow: /cart/',
+        'Disallow: /checkout/',
+        'Disallow: /*?*sort=',
+        'Disallow: /*?*price_min=',
+        'Disallow: /*?*price_max=',
+        'Disallow: /*?*q=',
+        f'Sitemap: {feed_url(SITEMAP_INDEX)}',
+    ]
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain')
+
+
+def metrics_view(request):
+    """Метрики в формате Prometheus (доступ по METRICS_TOKEN или METRICS_ALLOWED_IPS)"""
+    if not metrics.is_authorized(request):
+        raise Http404
+    return HttpResponse(metrics.render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')